@@ -0,0 +1,86 @@
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi import status as http_status
+from fastapi.responses import FileResponse
+
+from app import profiling
+from app.deps import get_redis_queue, get_tier_manager
+from app.services.llm.cache import get_llm_cache
+from app.telemetry import ProfiledRoute
+from app.workers.scheduling import queue_stats
+
+
+def _authorised(
+    token: str | None = Header(default=None, alias=profiling.PROFILE_HEADER),
+) -> None:
+    """Admin routes expose code paths, queue contents and collections, or change state."""
+    if not profiling.authorised(token):
+        raise HTTPException(http_status.HTTP_403_FORBIDDEN, "Missing or invalid x-profile-token")
+
+
+router = APIRouter(
+    prefix="/v1/admin",
+    tags=["admin"],
+    route_class=ProfiledRoute,
+    dependencies=[Depends(_authorised)],
+)
+
+
+@router.get("/llm-cache")
+def llm_cache_stats() -> dict:
+    return get_llm_cache().stats()
+
+
+@router.delete("/llm-cache")
+def clear_llm_cache() -> dict:
+    get_llm_cache().clear()
+    return {"status": "cleared"}
+
+
+@router.get("/queues")
+def ingest_queue_stats() -> dict:
+    return queue_stats(get_redis_queue().connection)
+
+
+def _tier_manager():
+    manager = get_tier_manager()
+    if manager is None:
+        raise HTTPException(http_status.HTTP_404_NOT_FOUND, "Tiering is disabled")
+    return manager
+
+
+@router.get("/tiers")
+def vector_tier_stats() -> dict:
+    return _tier_manager().stats()
+
+
+@router.post("/tiers/sweep")
+def sweep_vector_tiers() -> dict:
+    return _tier_manager().sweep()
+
+
+@router.get("/profiles")
+def list_profiles(limit: int = Query(default=50, ge=1, le=500)) -> list[dict]:
+    return profiling.list_profiles(limit)
+
+
+def _profile_files(profile_id: str) -> dict:
+    files = {path.suffix: path for path in profiling.profile_files(profile_id)}
+    if ".json" not in files:
+        raise HTTPException(http_status.HTTP_404_NOT_FOUND, "Profile not found")
+    return files
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str) -> dict:
+    """Profile summary: wall time, peak traced memory and the top functions or frames."""
+    return json.loads(_profile_files(profile_id)[".json"].read_text(encoding="utf-8"))
+
+
+@router.get("/profiles/{profile_id}/download")
+def download_profile(profile_id: str) -> FileResponse:
+    """The raw profile: pstats (``.prof``, for snakeviz) or collapsed stacks (``.folded``)."""
+    files = _profile_files(profile_id)
+    path = files.get(".prof") or files.get(".folded") or files[".json"]
+    return FileResponse(path, filename=path.name, media_type="application/octet-stream")
@@ -1,33 +1,45 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fastapi import APIRouter, Header, HTTPException
 from fastapi import status as http_status
+from fastapi.responses import StreamingResponse
 
-from app.api.schemas.answers import AnswerRequest, AnswerResponse, Citation, Snippet
+from app.api.schemas.answers import (
+    AnswerRequest,
+    AnswerResponse,
+    BatchAnswerItem,
+    BatchAnswerRequest,
+    Citation,
+    Snippet,
+)
+from app import deadline, metrics
 from app.core.config import settings
 from app.services.answerer.answerer import Answer, generate_answer
+from app.services.answerer.compress import compress_context
 from app.services.answerer.prompt import build_context, build_system_prompt
-from app.deps import get_embedder, get_vectorstore, sanitize_namespace
-from app.services.retriever.retriever import Retriever
+from app.deps import get_embedder, get_redis, get_reranker, get_vectorstore, sanitize_namespace
+from app.services.llm import ratelimit
+from app.services.retriever.retriever import RetrievalResult, Retriever, rerank_hits
+from app.services.singleflight import LEADER, SingleFlight, make_key
+from app.telemetry import ProfiledRoute
 
-router = APIRouter(prefix="/v1/answers", tags=["answers"])
+router = APIRouter(prefix="/v1/answers", tags=["answers"], route_class=ProfiledRoute)
 
+# Identical questions asked at the same time (a link shared in chat) are answered once
+_answers: SingleFlight[AnswerResponse] = SingleFlight(
+    "answers",
+    encode=lambda response: response.model_dump_json(),
+    decode=AnswerResponse.model_validate_json,
+    connection=get_redis,
+)
 
-@router.post("")
-def create_answer(req: AnswerRequest) -> AnswerResponse:
-    if not req.docIds or len(req.docIds) != 1:
-        raise HTTPException(http_status.HTTP_400_BAD_REQUEST, "Provide exactly one docId for MVP")
-
-    embedder = get_embedder()
-    vs = get_vectorstore()
-    retriever = Retriever(embedder=embedder, vectorstore=vs)
-
-    # Sanitize the namespace for Qdrant (remove invalid characters)
-    doc_id = str(req.docIds[0])  # Convert UUID to string
-    namespace = sanitize_namespace(doc_id)
-    top_k = req.topK or settings.top_k
-    results = retriever.search(req.question, namespace=namespace, k=top_k, k_final=settings.top_k_final)
 
+def _answer_from_results(
+    question: str, results: RetrievalResult, quote_mode: bool
+) -> AnswerResponse:
     # Confidence gating
     if (
         results.metrics.get("maxSim", 0.0) < settings.sim_threshold_max
@@ -44,25 +56,36 @@ def create_answer(req: AnswerRequest) -> AnswerResponse:
 
     # Optional reranking
     if settings.enable_rerank:
-        from app.services.reranker.llm_score import LLMReranker
-        reranker = LLMReranker()
-        chunk_texts = [h.chunk.get("text", "") for h in results.hits]
-        scores = reranker.score(req.question, chunk_texts)
-        
-        # Reorder hits based on reranker scores
-        scored_hits = list(zip(results.hits, scores))
-        scored_hits.sort(key=lambda x: x[1], reverse=True)
-        results.hits = [hit for hit, _ in scored_hits[:settings.top_k_final]]
-
-    context_text, used_chunks = build_context(results.hits, max_tokens=settings.max_context_tokens)
+        deadline.check("rerank")
+        rerank_hits(question, results, get_reranker(), settings.top_k_final)
+
+    with metrics.stage("query", "context"):
+        context_text, used_chunks = build_context(
+            results.hits, max_tokens=settings.max_context_tokens
+        )
+    if settings.enable_context_compression:
+        deadline.check("compress")
+        with metrics.stage("query", "compress"):
+            context_text, used_chunks, compression = compress_context(
+                question,
+                used_chunks,
+                max_tokens=settings.compression_max_tokens,
+                query_vector=results.query_vector,
+                embedder=get_embedder() if settings.compression_use_embeddings else None,
+            )
+        results.metrics["compression"] = compression
+
     system_prompt = build_system_prompt()
+    deadline.check("generate")
+    start = time.perf_counter()
     answer: Answer = generate_answer(
-        question=req.question,
+        question=question,
         system_prompt=system_prompt,
         context=context_text,
         top_chunks=used_chunks,
-        quote_mode=req.quoteMode,
+        quote_mode=quote_mode,
     )
+    results.metrics["generationMs"] = round((time.perf_counter() - start) * 1000, 2)
 
     return AnswerResponse(
         answer=answer.text,
@@ -75,3 +98,119 @@ def create_answer(req: AnswerRequest) -> AnswerResponse:
     )
 
 
+@router.post("")
+def create_answer(
+    req: AnswerRequest,
+    timeout_ms: int | None = Header(default=None, alias=deadline.TIMEOUT_HEADER),
+) -> AnswerResponse:
+    """
+    Answer one question. The request gets ``answer_timeout_s`` (or less with
+    ``X-Timeout-Ms``): every stage checks the time left and upstream calls are bounded by
+    it, and a request out of time fails with 504.
+    """
+    if not req.docIds or len(req.docIds) != 1:
+        raise HTTPException(http_status.HTTP_400_BAD_REQUEST, "Provide exactly one docId for MVP")
+
+    budget_s = settings.answer_timeout_s
+    if timeout_ms is not None and timeout_ms > 0:
+        budget_s = min(budget_s, timeout_ms / 1000) if budget_s > 0 else timeout_ms / 1000
+    with deadline.scope(budget_s), ratelimit.priority(ratelimit.INTERACTIVE):
+        return _create_answer(req)
+
+
+def _create_answer(req: AnswerRequest) -> AnswerResponse:
+    top_k = req.topK or settings.top_k
+    if not settings.singleflight_enabled:
+        return _answer(req.question, str(req.docIds[0]), top_k, req.quoteMode)
+
+    key = make_key(
+        " ".join(req.question.split()).casefold(),
+        sorted(str(d) for d in req.docIds),
+        top_k,
+        req.quoteMode,
+    )
+    response, role = _answers.do(
+        key, lambda: _answer(req.question, str(req.docIds[0]), top_k, req.quoteMode)
+    )
+    if role == LEADER:
+        return response
+    shared = response.model_copy(deep=True)
+    shared.metrics["singleFlight"] = role
+    return shared
+
+
+def _answer(question: str, doc_id: str, top_k: int, quote_mode: bool) -> AnswerResponse:
+    embedder = get_embedder()
+    vs = get_vectorstore()
+    retriever = Retriever(embedder=embedder, vectorstore=vs)
+
+    # Sanitize the namespace for Qdrant (remove invalid characters)
+    namespace = sanitize_namespace(doc_id)
+    results = retriever.search(question, namespace=namespace, k=top_k, k_final=settings.top_k_final)
+
+    return _answer_from_results(question, results, quote_mode)
+
+
+@router.post("/batch")
+def create_answers_batch(req: BatchAnswerRequest) -> StreamingResponse:
+    """
+    Answer many questions against one document.
+
+    All questions are embedded in one call and searched in one batch search; answers are
+    generated concurrently and streamed back as JSON lines in completion order. Retrieval
+    and each answer get ``answer_timeout_s``; an answer out of time is streamed as an error.
+    """
+    if not req.docIds or len(req.docIds) != 1:
+        raise HTTPException(http_status.HTTP_400_BAD_REQUEST, "Provide exactly one docId for MVP")
+    if not req.questions:
+        raise HTTPException(http_status.HTTP_400_BAD_REQUEST, "Provide at least one question")
+    if len(req.questions) > settings.batch_answer_max_questions:
+        raise HTTPException(
+            http_status.HTTP_400_BAD_REQUEST,
+            f"Too many questions (max {settings.batch_answer_max_questions})",
+        )
+
+    embedder = get_embedder()
+    vs = get_vectorstore()
+    retriever = Retriever(embedder=embedder, vectorstore=vs)
+
+    namespace = sanitize_namespace(str(req.docIds[0]))
+    top_k = req.topK or settings.top_k
+    start = time.perf_counter()
+    with deadline.scope(settings.answer_timeout_s), ratelimit.priority(ratelimit.INTERACTIVE):
+        all_results = retriever.search_batch(
+            req.questions, namespace=namespace, k=top_k, k_final=settings.top_k_final
+        )
+    # Retrieval is shared across the batch, so each question reports the amortized cost
+    retrieval_ms = (time.perf_counter() - start) * 1000 / len(req.questions)
+
+    def _run(question: str, results: RetrievalResult) -> tuple[AnswerResponse, float]:
+        t0 = time.perf_counter()
+        with deadline.scope(settings.answer_timeout_s), ratelimit.priority(ratelimit.INTERACTIVE):
+            response = _answer_from_results(question, results, req.quoteMode)
+        return response, (time.perf_counter() - t0) * 1000
+
+    def _stream():
+        workers = max(1, min(settings.batch_answer_concurrency, len(req.questions)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_run, q, r): i
+                for i, (q, r) in enumerate(zip(req.questions, all_results, strict=True))
+            }
+            for fut in as_completed(futures):
+                index = futures[fut]
+                timings = {"retrievalMs": round(retrieval_ms, 2)}
+                try:
+                    response, answer_ms = fut.result()
+                    timings["answerMs"] = round(answer_ms, 2)
+                    timings["totalMs"] = round(retrieval_ms + answer_ms, 2)
+                    item = BatchAnswerItem(
+                        index=index, question=req.questions[index], result=response, timings=timings
+                    )
+                except Exception as e:
+                    item = BatchAnswerItem(
+                        index=index, question=req.questions[index], error=str(e), timings=timings
+                    )
+                yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
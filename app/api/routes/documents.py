@@ -1,21 +1,65 @@
 from __future__ import annotations
 
+import asyncio
+import base64
 import hashlib
+import io
+import json
+import logging
 import os
-from typing import Optional
-from uuid import UUID
+import shutil
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Annotated, Optional
+from uuid import UUID, uuid4
 
 import httpx
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
 from fastapi import status as http_status
+from fastapi.responses import StreamingResponse
 
-from app.api.schemas.documents import CreateDocumentResponse, DocumentOut
+from app import profiling
+from app.api.schemas.documents import (
+    BatchStatusResponse,
+    BulkCreateDocumentsResponse,
+    BulkItemError,
+    CreateDocumentResponse,
+    DocumentOut,
+)
 from app.core.config import settings
 from app.db import repo
 from app.db.models import Document
-from app.deps import blob_path, chunks_path, get_redis_queue, get_vectorstore, parsed_path
+from app.deps import (
+    blob_path,
+    canonical_namespace,
+    chunks_path,
+    get_event_hub,
+    get_redis,
+    get_redis_queue,
+    get_vectorstore,
+    parsed_path,
+    sanitize_namespace,
+    vectors_path,
+)
+from app.telemetry import ProfiledRoute
+from app.workers import events
+from app.workers.scheduling import queue_for, size_class
 
-router = APIRouter(prefix="/v1/documents", tags=["documents"])
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/v1/documents", tags=["documents"], route_class=ProfiledRoute)
 
 
 async def _download(url: str) -> bytes:
@@ -43,43 +87,183 @@ async def _download(url: str) -> bytes:
             
             return r.content
             
-    except httpx.TimeoutException:
+    except httpx.TimeoutException as e:
         raise HTTPException(
             http_status.HTTP_408_REQUEST_TIMEOUT,
             "Download timeout - URL may be slow or unavailable"
-        )
+        ) from e
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(
                 http_status.HTTP_400_BAD_REQUEST,
                 "URL not found - check if the document exists"
-            )
+            ) from e
         elif e.response.status_code >= 500:
             raise HTTPException(
                 http_status.HTTP_502_BAD_GATEWAY,
                 "Remote server error - try again later"
-            )
+            ) from e
         else:
             raise HTTPException(
                 http_status.HTTP_400_BAD_REQUEST,
                 f"Download failed with status {e.response.status_code}"
-            )
+            ) from e
     except Exception as e:
         raise HTTPException(
             http_status.HTTP_400_BAD_REQUEST,
             f"Download failed: {str(e)}"
-        )
+        ) from e
 
 
 def _sha256_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
+def _count_pages(data: bytes) -> int | None:
+    """Page count from the PDF xref (no text extraction); None if it can't be opened."""
+    try:
+        import fitz  # PyMuPDF
+
+        with fitz.open(stream=data, filetype="pdf") as pdf:
+            return len(pdf)
+    except Exception:
+        return None
+
+
+def _ingest_queue_name(content: bytes) -> str:
+    return queue_for(size_class(len(content), _count_pages(content)))
+
+
+def _write_blob(doc_id: str, content: bytes) -> None:
+    with open(blob_path(doc_id), "wb") as f:
+        f.write(content)
+
+
+def _read_archive(data: bytes) -> list[tuple[str, bytes]]:
+    """PDF entries of a zip archive, guarding entry count and uncompressed size."""
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as e:
+        raise HTTPException(
+            http_status.HTTP_400_BAD_REQUEST, "Archive is not a valid zip file"
+        ) from e
+
+    entries = [
+        info
+        for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(".pdf")
+        and not info.filename.startswith("__MACOSX/")
+    ]
+    if len(entries) > settings.bulk_max_documents:
+        raise HTTPException(
+            http_status.HTTP_400_BAD_REQUEST,
+            f"Too many documents (max {settings.bulk_max_documents})",
+        )
+    if sum(info.file_size for info in entries) > settings.bulk_max_archive_mb * 1024 * 1024:
+        raise HTTPException(
+            http_status.HTTP_400_BAD_REQUEST,
+            f"Archive too large (max {settings.bulk_max_archive_mb}MB uncompressed)",
+        )
+    return [(os.path.basename(info.filename), archive.read(info)) for info in entries]
+
+
+def _enqueue_ingest_many(jobs: list[tuple[str, str]]) -> None:
+    """Enqueue (doc_id, queue_name) ingest jobs in a single Redis pipeline."""
+    from rq import Queue
+
+    by_queue: dict[str, list[str]] = defaultdict(list)
+    for doc_id, queue_name in jobs:
+        by_queue[queue_name].append(doc_id)
+
+    pipe = get_redis().pipeline()
+    for queue_name, doc_ids in by_queue.items():
+        q = get_redis_queue(queue_name)
+        q.enqueue_many(
+            [Queue.prepare_data("app.workers.jobs.ingest", (doc_id,)) for doc_id in doc_ids],
+            pipeline=pipe,
+        )
+    pipe.execute()
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    if not os.path.exists(src):
+        return
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _dedupe_upload(sha: str, name: str) -> CreateDocumentResponse | None:
+    """Apply ``settings.dedupe_policy`` to an upload; None when it should be ingested."""
+    existing = repo.find_ready_by_sha256(sha)
+    if existing is None:
+        return None
+    if settings.dedupe_policy == "existing":
+        return CreateDocumentResponse(docId=existing.id, status=existing.status)
+    alias = _create_alias(existing, name)
+    if alias is not None:
+        return CreateDocumentResponse(docId=alias.id, status=alias.status)
+    return None
+
+
+def _create_alias(source: Document, name: str) -> Document | None:
+    """
+    Create a ready document reusing ``source``'s blob, artifacts and vectors.
+
+    Returns None if the alias could not be set up, in which case the caller ingests normally.
+    """
+    doc = repo.create_alias(source, name=name)
+    if not _link_alias(source, str(doc.id)):
+        repo.delete_document(doc.id)
+        canonical_namespace.cache_clear()
+        return None
+    canonical_namespace.cache_clear()
+    return doc
+
+
+def _link_alias(source: Document, doc_id: str) -> bool:
+    """
+    Point ``doc_id``'s vector namespace and files at ``source``'s; False if that failed.
+
+    Files are hard-linked (copied across filesystems) and the vector namespace becomes a
+    vector store alias of the source collection, so no parsing or embedding happens.
+    """
+    # Vectors live in the canonical collection; files are linked from the matched document,
+    # whose own paths survive deletion of the canonical row
+    canonical_id = str(source.source_id or source.id)
+    paths = (blob_path, parsed_path, chunks_path, vectors_path)
+    try:
+        get_vectorstore().alias_namespace(
+            sanitize_namespace(doc_id), target=sanitize_namespace(canonical_id)
+        )
+        for path_fn in paths:
+            _link_or_copy(path_fn(str(source.id)), path_fn(doc_id))
+    except Exception as e:
+        logger.warning(f"Dedupe alias for {source.id} failed, ingesting normally: {e}")
+        _unlink_alias(doc_id)
+        return False
+    return True
+
+
+def _unlink_alias(doc_id: str) -> None:
+    """Undo ``_link_alias`` as far as it got."""
+    try:
+        get_vectorstore().delete_namespace(sanitize_namespace(doc_id))  # drops the alias only
+    except Exception as e:
+        logger.warning(f"Removing dedupe alias {doc_id} failed: {e}")
+    for path_fn in (blob_path, parsed_path, chunks_path, vectors_path):
+        if os.path.exists(path_fn(doc_id)):
+            os.remove(path_fn(doc_id))
+
+
 @router.post("", response_model=CreateDocumentResponse)
 async def create_document(
     background: BackgroundTasks,
-    file: Optional[UploadFile] = File(default=None),
+    file: Annotated[UploadFile | None, File()] = None,
     url: Optional[str] = None,
+    profile_token: str | None = Header(default=None, alias=profiling.PROFILE_HEADER),
 ):
     if file is None and not url:
         raise HTTPException(http_status.HTTP_400_BAD_REQUEST, "Provide file or url")
@@ -97,31 +281,299 @@ async def create_document(
         raise HTTPException(http_status.HTTP_400_BAD_REQUEST, "Empty document")
 
     sha = _sha256_bytes(content)
+    if settings.dedupe_policy != "off":
+        # The lookup and aliasing go to SQLite, the vector store and the disk
+        deduped = await asyncio.to_thread(_dedupe_upload, sha, name)
+        if deduped is not None:
+            return deduped
+
     doc: Document = repo.create_document(name=name, sha256=sha, bytes=len(content))
 
     # Save blob
-    blob = blob_path(str(doc.id))
-    with open(blob, "wb") as f:
-        f.write(content)
+    _write_blob(str(doc.id), content)
 
-    # Enqueue ingest job
-    q = get_redis_queue()
-    q.enqueue("app.workers.jobs.ingest", str(doc.id))
+    # Enqueue ingest job on the queue for its size class (counting pages opens the PDF)
+    q = get_redis_queue(await asyncio.to_thread(_ingest_queue_name, content))
+    if profiling.requested(profile_token, 0.0):
+        # The worker profiles every stage job of this document (see jobs.ingest)
+        q.enqueue("app.workers.jobs.ingest", str(doc.id), meta={"profile": True})
+    else:
+        q.enqueue("app.workers.jobs.ingest", str(doc.id))
 
     return CreateDocumentResponse(docId=doc.id, status=doc.status)
 
 
+@router.post("/bulk", response_model=BulkCreateDocumentsResponse)
+async def create_documents_bulk(
+    files: Annotated[list[UploadFile] | None, File()] = None,
+    archive: Annotated[UploadFile | None, File()] = None,
+    urls: Annotated[list[str] | None, Form()] = None,
+):
+    """
+    Ingest many documents at once from uploaded files, a zip archive and/or URLs.
+
+    All new rows (aliases included) are inserted in one transaction, blobs are written
+    concurrently and the ingest jobs are enqueued in one Redis pipeline. Poll
+    ``/v1/documents/batches/{batchId}`` for aggregate progress.
+    """
+    items = [(f.filename or "document.pdf", await f.read()) for f in files or []]
+    archive_data = await archive.read() if archive is not None else None
+    errors: list[BulkItemError] = []
+    if urls:
+        items.extend(await _download_all(urls, errors))
+    # Unzipping, hashing, page counts and the inserts block; keep them off the event loop
+    return await asyncio.to_thread(_create_bulk, items, archive_data, errors)
+
+
+async def _download_all(urls: list[str], errors: list[BulkItemError]) -> list[tuple[str, bytes]]:
+    """Download URLs concurrently; failures are appended to ``errors``."""
+    items: list[tuple[str, bytes]] = []
+    downloads = await asyncio.gather(*(_download(u) for u in urls), return_exceptions=True)
+    for u, result in zip(urls, downloads, strict=True):
+        if isinstance(result, HTTPException):
+            errors.append(BulkItemError(name=u, message=str(result.detail)))
+        elif isinstance(result, Exception):
+            errors.append(BulkItemError(name=u, message=str(result)))
+        else:
+            items.append((u.split("/")[-1] or "document.pdf", result))
+    return items
+
+
+def _create_bulk(
+    items: list[tuple[str, bytes]], archive_data: bytes | None, errors: list[BulkItemError]
+) -> BulkCreateDocumentsResponse:
+    if archive_data is not None:
+        items = items + _read_archive(archive_data)
+    if not items and not errors:
+        raise HTTPException(http_status.HTTP_400_BAD_REQUEST, "Provide files, archive or urls")
+    if len(items) > settings.bulk_max_documents:
+        raise HTTPException(
+            http_status.HTTP_400_BAD_REQUEST,
+            f"Too many documents (max {settings.bulk_max_documents})",
+        )
+
+    prepared: list[tuple[str, bytes, str]] = []
+    for name, content in items:
+        if not content:
+            errors.append(BulkItemError(name=name, message="Empty document"))
+            continue
+        prepared.append((name, content, _sha256_bytes(content)))
+
+    batch_id = uuid4()
+    rows, fresh, documents = _plan_bulk(prepared)
+    if rows:
+        _insert_bulk(rows, batch_id)
+    if fresh:
+        with ThreadPoolExecutor(max_workers=min(8, len(fresh))) as pool:
+            list(pool.map(lambda item: _write_blob(*item), fresh))
+        _enqueue_ingest_many([(doc_id, _ingest_queue_name(c)) for doc_id, c in fresh])
+    return BulkCreateDocumentsResponse(batchId=batch_id, documents=documents, errors=errors)
+
+
+def _insert_bulk(rows: list[dict], batch_id: UUID) -> None:
+    try:
+        repo.create_documents(rows, batch_id=batch_id)
+    except Exception:
+        # Aliases were linked up front; without their rows nothing would remove them
+        for row in rows:
+            if row.get("source_id") is not None:
+                _unlink_alias(str(row["id"]))
+        raise
+    canonical_namespace.cache_clear()
+
+
+def _plan_bulk(
+    prepared: list[tuple[str, bytes, str]],
+) -> tuple[list[dict], list[tuple[str, bytes]], list[CreateDocumentResponse]]:
+    """
+    Decide what each (name, content, sha256) item becomes.
+
+    Returns the rows to insert, the (doc_id, content) pairs to store and ingest, and one
+    response per item. With dedupe on, items matching a ready document follow
+    ``settings.dedupe_policy`` and repeats of a file within the upload share its document.
+    """
+    dedupe = settings.dedupe_policy != "off"
+    existing = repo.find_ready_by_sha256s([sha for _, _, sha in prepared]) if dedupe else {}
+    rows: list[dict] = []
+    fresh: list[tuple[str, bytes]] = []
+    documents: list[CreateDocumentResponse] = []
+    seen: dict[str, CreateDocumentResponse] = {}
+    for name, content, sha in prepared:
+        response = seen.get(sha) if dedupe else None
+        if response is None and sha in existing:
+            response = _bulk_alias(existing[sha], name, rows)
+        if response is None:
+            doc_id = uuid4()
+            rows.append({"id": doc_id, "name": name, "sha256": sha, "bytes": len(content)})
+            fresh.append((str(doc_id), content))
+            response = CreateDocumentResponse(docId=doc_id, status="queued")
+        seen[sha] = response
+        documents.append(response)
+    return rows, fresh, documents
+
+
+def _bulk_alias(
+    source: Document, name: str, rows: list[dict]
+) -> CreateDocumentResponse | None:
+    """Bulk counterpart of ``_dedupe_upload``; alias rows are added to ``rows``."""
+    if settings.dedupe_policy == "existing":
+        return CreateDocumentResponse(docId=source.id, status=source.status)
+    doc_id = uuid4()
+    if not _link_alias(source, str(doc_id)):
+        return None
+    rows.append({"id": doc_id, **repo.alias_fields(source, name)})
+    return CreateDocumentResponse(docId=doc_id, status="ready")
+
+
+@router.get("/batches/{batch_id}", response_model=BatchStatusResponse)
+def get_batch(batch_id: UUID):
+    counts = repo.batch_status_counts(batch_id)
+    if not counts:
+        raise HTTPException(http_status.HTTP_404_NOT_FOUND, "Not found")
+    total = sum(counts.values())
+    finished = counts.get("ready", 0) + counts.get("failed", 0)
+    return BatchStatusResponse(batchId=batch_id, total=total, counts=counts, done=finished == total)
+
+
 @router.get("/{doc_id}", response_model=DocumentOut)
-def get_document(doc_id: UUID):
+def get_document(doc_id: UUID, background: BackgroundTasks):
     doc = repo.get_document(doc_id)
     if doc is None:
         raise HTTPException(http_status.HTTP_404_NOT_FOUND, "Not found")
+    if settings.tiering_enabled and doc.status == "ready":
+        # A lookup usually precedes questions; start promoting the collection now
+        background.add_task(_prefetch_vectors, sanitize_namespace(str(doc_id)))
     return DocumentOut.model_validate(doc)
 
 
+async def _next_event(queue: asyncio.Queue, after_seq: int, timeout: float) -> dict | None:
+    """First event newer than ``after_seq`` within ``timeout`` seconds, or None."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while (remaining := deadline - loop.time()) > 0:
+        try:
+            event = await asyncio.wait_for(queue.get(), remaining)
+        except TimeoutError:
+            return None
+        if event["seq"] > after_seq:
+            return event
+    return None
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+
+@router.get("/{doc_id}/events")
+async def document_events(
+    doc_id: UUID,
+    since: int = Query(default=0, ge=0),
+    wait: float | None = Query(default=None, gt=0),
+    last_event_id: int | None = Header(default=None),
+):
+    """
+    Ingest progress pushed from the workers instead of polled from the database.
+
+    Streams Server-Sent Events (``processing``, ``parsed``, ``chunked``, ``embedding``,
+    ``retrying``, then ``ready`` or ``failed``) and closes after the terminal event. With
+    ``wait`` it long-polls instead: it returns, as JSON, the first event newer than ``since``
+    (an event ``seq``), waiting up to ``wait`` seconds, or the latest known event on timeout.
+    """
+    key = str(doc_id)
+    since = max(since, last_event_id or 0)
+    # Subscribe before reading the latest event so nothing published in between is lost.
+    # All streams share the process' one Redis subscription
+    hub = get_event_hub()
+    queue = await hub.subscribe(key)
+    try:
+        latest = await hub.latest(key)
+        if latest is None:
+            # No event yet (queued, or finished before its events expired): one DB read
+            doc = await asyncio.to_thread(repo.get_document, doc_id)
+            if doc is None:
+                raise HTTPException(http_status.HTTP_404_NOT_FOUND, "Not found")
+            latest = {
+                "docId": key,
+                "seq": 0,
+                "stage": doc.status,
+                "pages": doc.pages,
+                "chunks": doc.chunks,
+                "error": doc.error,
+            }
+    except BaseException:
+        await hub.unsubscribe(key, queue)
+        raise
+
+    timeout = settings.events_max_wait_s
+    if wait is not None:
+        try:
+            if latest["seq"] > since or latest["stage"] in events.TERMINAL_STAGES:
+                return latest
+            return await _next_event(queue, since, min(wait, timeout)) or latest
+        finally:
+            await hub.unsubscribe(key, queue)
+
+    async def _stream():
+        try:
+            event: dict = latest
+            terminal = event["stage"] in events.TERMINAL_STAGES
+            if event["seq"] > since or event["seq"] == 0 or terminal:
+                yield _sse(event)
+            last_seq = max(since, event["seq"])
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while event["stage"] not in events.TERMINAL_STAGES and loop.time() < deadline:
+                # Comment lines keep proxies from closing an idle stream
+                next_event = await _next_event(queue, last_seq, 15.0)
+                if next_event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event = next_event
+                last_seq = event["seq"]
+                yield _sse(event)
+        finally:
+            await hub.unsubscribe(key, queue)
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _prefetch_vectors(namespace: str) -> None:
+    try:
+        get_vectorstore().prefetch(namespace)
+    except Exception as e:
+        logger.warning(f"Vector prefetch for {namespace} failed: {e}")
+
+
+def _encode_cursor(doc: Document) -> str:
+    raw = f"{doc.created_at.isoformat()}|{doc.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, doc_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(doc_id)
+    except ValueError as e:
+        raise HTTPException(http_status.HTTP_400_BAD_REQUEST, "Invalid cursor") from e
+
+
 @router.get("", response_model=list[DocumentOut])
-def list_documents(limit: int = Query(default=50, le=200), status: Optional[str] = None):
-    docs = repo.list_documents(limit=limit, status=status)
+def list_documents(
+    response: Response,
+    limit: int = Query(default=50, le=200),
+    status: str | None = None,
+    cursor: str | None = None,
+):
+    """Newest first. When more may follow, ``X-Next-Cursor`` holds the cursor of the next page."""
+    after = _decode_cursor(cursor) if cursor else None
+    docs = repo.list_documents(limit=limit, status=status, after=after)
+    if len(docs) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(docs[-1])
     return [DocumentOut.model_validate(d) for d in docs]
 
 
@@ -131,13 +583,18 @@ def delete_document(doc_id: UUID) -> dict:
     if doc is None:
         raise HTTPException(http_status.HTTP_404_NOT_FOUND, "Not found")
 
-    # purge vector namespace
+    # purge vector namespace; collections shared with dedupe aliases outlive their source row
     vs = get_vectorstore()
-    namespace = sanitize_namespace(doc_id)
-    vs.delete_namespace(namespace)
+    if doc.source_id is not None:
+        vs.delete_namespace(sanitize_namespace(str(doc_id)))  # drops the alias only
+        if repo.get_document(doc.source_id) is None and repo.count_aliases(doc.source_id) <= 1:
+            vs.delete_namespace(sanitize_namespace(str(doc.source_id)))
+    elif repo.count_aliases(doc_id) == 0:
+        vs.delete_namespace(sanitize_namespace(str(doc_id)))
 
     # remove files
-    for p in [blob_path(str(doc_id)), parsed_path(str(doc_id)), chunks_path(str(doc_id))]:
+    for path_fn in (blob_path, parsed_path, chunks_path, vectors_path):
+        p = path_fn(str(doc_id))
         try:
             if os.path.exists(p):
                 os.remove(p)
@@ -145,6 +602,7 @@ def delete_document(doc_id: UUID) -> dict:
             pass
 
     repo.delete_document(doc_id)
+    canonical_namespace.cache_clear()
     return {"status": "deleted"}
 
 
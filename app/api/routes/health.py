@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 
-router = APIRouter(prefix="/v1", tags=["health"])
+from app.telemetry import ProfiledRoute
+
+router = APIRouter(prefix="/v1", tags=["health"], route_class=ProfiledRoute)
 
 
 @router.get("/health")
@@ -29,3 +29,18 @@ class AnswerResponse(BaseModel):
     metrics: dict[str, Any]
 
 
+
+
+class BatchAnswerRequest(BaseModel):
+    questions: list[str]
+    docIds: list[UUID]
+    topK: int | None = None
+    quoteMode: bool = False
+
+
+class BatchAnswerItem(BaseModel):
+    index: int
+    question: str
+    result: AnswerResponse | None = None
+    error: str | None = None
+    timings: dict[str, float]
@@ -14,6 +14,7 @@ class DocumentOut(BaseModel):
     sha256: str
     status: str
     error: Optional[str] = None
+    source_id: UUID | None = Field(default=None, alias="sourceId")
     created_at: datetime = Field(alias="createdAt")
     updated_at: datetime = Field(alias="updatedAt")
 
@@ -27,3 +28,21 @@ class CreateDocumentResponse(BaseModel):
     status: str
 
 
+
+
+class BulkItemError(BaseModel):
+    name: str
+    message: str
+
+
+class BulkCreateDocumentsResponse(BaseModel):
+    batchId: UUID
+    documents: list[CreateDocumentResponse]
+    errors: list[BulkItemError] = []
+
+
+class BatchStatusResponse(BaseModel):
+    batchId: UUID
+    total: int
+    counts: dict[str, int]
+    done: bool
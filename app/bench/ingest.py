@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+
+from app.bench.stubs import StubEmbedder, StubVectorStore
+from app.bench.synthetic import PdfSpec, make_pdf
+from app.services.chunker.chunker import chunk_pages
+from app.services.parser.pdf_pymupdf import parse_pdf_pymupdf
+from app.services.vectorstore.points import chunk_points
+
+logger = logging.getLogger(__name__)
+
+# Rates compared against a baseline; higher is better for all of them
+RATE_KEYS = ("parsePagesPerS", "chunkChunksPerS", "embedVectorsPerS", "upsertVectorsPerS")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(spec: PdfSpec, batch_size: int, dim: int, workdir: str) -> dict[str, Any]:
+    """Generate one synthetic PDF and time parse, chunk, embed and upsert on it."""
+    path = make_pdf(os.path.join(workdir, f"{spec.name}-{spec.seed}.pdf"), spec)
+    embedder, store = StubEmbedder(dim), StubVectorStore()
+    doc_id = f"bench-{spec.name}"
+
+    t0 = time.perf_counter()
+    pages, _ = parse_pdf_pymupdf(path)
+    t1 = time.perf_counter()
+    chunks, stats = chunk_pages(doc_id, pages)
+    t2 = time.perf_counter()
+    embed_s = upsert_s = 0.0
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start : start + batch_size]
+        e0 = time.perf_counter()
+        vectors = embedder.embed_texts([c.text for c in batch])
+        e1 = time.perf_counter()
+        store.upsert(doc_id, chunk_points(batch, vectors))
+        upsert_s += time.perf_counter() - e1
+        embed_s += e1 - e0
+    wall = time.perf_counter() - t0
+    assert store.count(doc_id) == len(chunks)
+
+    def rate(n: int, seconds: float) -> float:
+        return round(n / seconds, 1) if seconds > 0 else 0.0
+
+    return {
+        "case": spec.name,
+        "spec": spec.__dict__,
+        "bytes": os.path.getsize(path),
+        "pages": len(pages),
+        "chunks": len(chunks),
+        "chunkTypes": stats.get("type_breakdown", {}),
+        "stageSeconds": {
+            "parse": round(t1 - t0, 4),
+            "chunk": round(t2 - t1, 4),
+            "embed": round(embed_s, 4),
+            "upsert": round(upsert_s, 4),
+        },
+        "wallSeconds": round(wall, 4),
+        "parsePagesPerS": rate(len(pages), t1 - t0),
+        "chunkChunksPerS": rate(len(chunks), t2 - t1),
+        "embedVectorsPerS": rate(len(chunks), embed_s),
+        "upsertVectorsPerS": rate(len(chunks), upsert_s),
+        "pagesPerS": rate(len(pages), wall),
+        "chunksPerS": rate(len(chunks), wall),
+        "peakRssMb": _peak_rss_mb(),
+    }
+
+
+def _median(runs: list[dict], key: str) -> float:
+    return float(np.median([r[key] for r in runs]))
+
+
+def run(
+    specs: list[PdfSpec],
+    repeats: int = 3,
+    batch_size: int = 256,
+    dim: int = 1536,
+    isolate: bool = True,
+) -> dict[str, Any]:
+    """
+    Benchmark every spec ``repeats`` times and return per-case medians.
+
+    With ``isolate`` each run happens in a fresh process, so ``peakRssMb`` is that run's own
+    peak rather than the high-water mark of everything before it.
+    """
+    cases = []
+    with tempfile.TemporaryDirectory(prefix="contextforge-bench-") as workdir:
+        for spec in specs:
+            if isolate:
+                methods = mp.get_all_start_methods()
+                ctx = mp.get_context("fork" if "fork" in methods else "spawn")
+                runs = []
+                for _ in range(repeats):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                        runs.append(pool.submit(run_case, spec, batch_size, dim, workdir).result())
+            else:
+                runs = [run_case(spec, batch_size, dim, workdir) for _ in range(repeats)]
+            case = dict(runs[0])
+            for key in (*RATE_KEYS, "pagesPerS", "chunksPerS", "wallSeconds"):
+                case[key] = round(_median(runs, key), 4 if key == "wallSeconds" else 1)
+            case["stageSeconds"] = {
+                stage: round(float(np.median([r["stageSeconds"][stage] for r in runs])), 4)
+                for stage in case["stageSeconds"]
+            }
+            case["peakRssMb"] = max(r["peakRssMb"] for r in runs)
+            case["repeats"] = repeats
+            cases.append(case)
+            logger.info(
+                f"{spec.name}: {case['pagesPerS']} pages/s, {case['chunksPerS']} chunks/s, "
+                f"peak {case['peakRssMb']} MB"
+            )
+    return {
+        "benchmark": "ingest",
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "batchSize": batch_size,
+        "dim": dim,
+        "cases": cases,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float = 0.1) -> list[str]:
+    """Rates in ``result`` that fell by more than ``tolerance`` against ``baseline``."""
+    previous = {c["case"]: c for c in baseline.get("cases", [])}
+    regressions = []
+    for case in result["cases"]:
+        base = previous.get(case["case"])
+        if base is None:
+            continue
+        for key in RATE_KEYS:
+            if base.get(key) and case[key] < base[key] * (1 - tolerance):
+                change = (case[key] - base[key]) / base[key]
+                regressions.append(
+                    f"{case['case']} {key}: {base[key]} -> {case[key]} ({change:+.0%})"
+                )
+        if base.get("chunks") and case["chunks"] != base["chunks"]:
+            # Not a slowdown, but chunker output changed; rates are not like for like
+            regressions.append(f"{case['case']} chunks: {base['chunks']} -> {case['chunks']}")
+    return regressions
+
+
+def specs_from_args(
+    pages: list[int], words: list[int], tables: list[float], seed: int = 0
+) -> list[PdfSpec]:
+    return [
+        PdfSpec(pages=p, words_per_page=w, table_ratio=t, seed=seed)
+        for p, w, t in itertools.product(pages, words, tables)
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:  # pragma: no cover - convenience
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bench.ingest",
+        description="Benchmark parse/chunk/embed/upsert on synthetic PDFs",
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--words-per-page", type=int, nargs="+", default=[150, 600])
+    parser.add_argument("--table-ratio", type=float, nargs="+", default=[0.0, 0.5])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here (default: data/bench/...)")
+    parser.add_argument("--baseline", help="Compare against a previous results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    from app.core.config import settings
+    from app.core.logging import configure_logging
+
+    configure_logging()
+    result = run(
+        specs_from_args(args.pages, args.words_per_page, args.table_ratio, args.seed),
+        repeats=args.repeats,
+        batch_size=args.batch_size,
+        dim=args.dim,
+    )
+    output = args.output or os.path.join(
+        settings.data_dir, "bench", f"ingest-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,512 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+import numpy as np
+
+from app.bench.stubs import StubChatClient, StubEmbedder, StubVectorStore
+from app.bench.synthetic import PdfSpec, page_lines
+from app.core.config import settings
+from app.deps import sanitize_namespace
+
+logger = logging.getLogger(__name__)
+
+BENCH_DOC_ID = "00000000-0000-0000-0000-00000000be4c"
+
+QUESTIONS = [
+    "What was the revenue growth this quarter?",
+    "Which clause covers liability?",
+    "How is the payment term defined?",
+    "What does the report say about latency?",
+    "Summarize the storage policy.",
+    "Which region has the most replicas?",
+    "What is the average margin?",
+    "When is the invoice due?",
+]
+
+
+@dataclass
+class StubLatency:
+    embed_ms: float = 20.0
+    search_ms: float = 5.0
+    chat_ms: float = 300.0
+
+
+def _populate(store: StubVectorStore, embedder: StubEmbedder, chunks: int) -> None:
+    """Fill the benchmark namespace with ``chunks`` synthetic chunks of ~6 lines each."""
+    spec = PdfSpec(pages=max(1, chunks // 8), words_per_page=400, table_ratio=0.2, seed=1)
+    payloads: list[dict] = []
+    page = 0
+    while len(payloads) < chunks:
+        lines = [line for line in page_lines(spec, page % spec.pages) if line]
+        for start in range(0, len(lines), 6):
+            text = " ".join(lines[start : start + 6])
+            payloads.append(
+                {
+                    "chunk_id": f"bench-{len(payloads)}",
+                    "text": text,
+                    "page_start": page + 1,
+                    "page_end": page + 1,
+                    "section": None,
+                }
+            )
+        page += 1
+    payloads = payloads[:chunks]
+    vectors = StubEmbedder(embedder.dim).embed_texts([p["text"] for p in payloads])
+    store.upsert(
+        sanitize_namespace(BENCH_DOC_ID),
+        [
+            {"id": p["chunk_id"], "vector": v, "payload": p}
+            for p, v in zip(payloads, vectors, strict=True)
+        ],
+    )
+
+
+@contextmanager
+def stub_backends(
+    latency: StubLatency, chunks: int = 500, dim: int = 1536, llm_cache: bool = False
+) -> Iterator[None]:
+    """
+    Swap the answer path's embedder, vector store and chat model for local stand-ins.
+
+    The LLM cache is off by default: the load repeats a few questions, so cached answers
+    would skip generation and hide the cost of the rest of the path.
+    """
+    from app.api.routes import answers
+    from app.services.answerer import answerer
+    from app.services.reranker import llm_score
+
+    embedder = StubEmbedder(dim, latency_ms=latency.embed_ms)
+    store = StubVectorStore(latency_ms=latency.search_ms)
+    chat = StubChatClient(latency_ms=latency.chat_ms)
+    _populate(store, embedder, chunks)
+    patches = [
+        (answers, "get_embedder", lambda: embedder),
+        (answers, "get_vectorstore", lambda: store),
+        (answerer, "OpenAI", lambda **_: chat),
+        (llm_score, "OpenAI", lambda **_: chat),
+        (settings, "llm_cache_enabled", llm_cache),
+        (settings, "warmup_enabled", False),
+    ]
+    saved = [(target, name, getattr(target, name)) for target, name, _ in patches]
+    try:
+        for target, name, value in patches:
+            setattr(target, name, value)
+        yield
+    finally:
+        for target, name, value in saved:
+            setattr(target, name, value)
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag and threadpool saturation of a (possibly foreign) event loop.
+
+    A thread schedules a probe onto the loop every ``interval_s``; the delay until it runs is
+    the loop lag. The probe also reads anyio's default thread limiter, which bounds the
+    threadpool that sync FastAPI endpoints and dependencies run on.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval_s: float = 0.01) -> None:
+        self.loop = loop
+        self.interval_s = interval_s
+        self.lag_ms: list[float] = []
+        self.busy: list[int] = []
+        self.waiting: list[int] = []
+        self.tokens = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    async def _probe(self, posted: float) -> None:
+        from anyio.to_thread import current_default_thread_limiter
+
+        self.lag_ms.append((time.perf_counter() - posted) * 1000)
+        stats = current_default_thread_limiter().statistics()
+        self.tokens = int(stats.total_tokens)
+        self.busy.append(stats.borrowed_tokens)
+        self.waiting.append(stats.tasks_waiting)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            asyncio.run_coroutine_threadsafe(self._probe(time.perf_counter()), self.loop)
+
+    def reset(self) -> None:
+        self.lag_ms, self.busy, self.waiting = [], [], []
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self) -> dict[str, Any]:
+        lag = np.asarray(self.lag_ms or [0.0])
+        busy = np.asarray(self.busy or [0])
+        return {
+            "loopLagMs": {
+                "p50": round(float(np.percentile(lag, 50)), 2),
+                "p99": round(float(np.percentile(lag, 99)), 2),
+                "max": round(float(lag.max()), 2),
+            },
+            "threadpool": {
+                "size": self.tokens,
+                "busyMean": round(float(busy.mean()), 1),
+                "busyMax": int(busy.max()),
+                "waitingMax": max(self.waiting or [0]),
+                # Share of probes that found every worker thread taken
+                "saturated": round(float((busy >= max(1, self.tokens)).mean()), 3),
+            },
+        }
+
+
+def _latency_report(latencies: list[float]) -> dict[str, float]:
+    values = np.asarray(latencies or [0.0])
+    return {
+        "p50": round(float(np.percentile(values, 50)), 2),
+        "p95": round(float(np.percentile(values, 95)), 2),
+        "p99": round(float(np.percentile(values, 99)), 2),
+        "max": round(float(values.max()), 2),
+        "mean": round(float(values.mean()), 2),
+    }
+
+
+class _AsgiClient:
+    """Per-worker handle on a shared in-process httpx client."""
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self.client = client
+
+    async def post_json(self, path: str, body: dict) -> int:
+        return (await self.client.post(path, json=body)).status_code
+
+    def close(self) -> None:
+        pass
+
+
+class _Connection:
+    """
+    Minimal HTTP/1.1 keep-alive client, one per worker.
+
+    httpx's connection pool costs far more per request than the endpoint itself at high
+    concurrency, which would make the load generator the bottleneck it is meant to find.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def post_json(self, path: str, body: dict) -> int:
+        try:
+            return await self._post(path, json.dumps(body).encode())
+        except Exception:
+            self.close()
+            raise
+
+    async def _post(self, path: str, data: bytes) -> int:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        head = (
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n"
+        )
+        self._writer.write(head.encode() + data)
+        await self._writer.drain()
+
+        lines = (await self._reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        pairs = (line.split(":", 1) for line in lines[1:] if ":" in line)
+        headers = {k.strip().lower(): v.strip() for k, v in pairs}
+        if "content-length" in headers:
+            await self._reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self._reader.readexactly(size + 2)  # chunk and its CRLF
+                if size == 0:
+                    break
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+async def run_level(
+    connect: Callable[[], Any],
+    monitor: LoopMonitor,
+    concurrency: int,
+    duration_s: float,
+    warmup_s: float = 1.0,
+) -> dict[str, Any]:
+    """Keep ``concurrency`` requests in flight for ``warmup_s + duration_s`` seconds."""
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    failures: set[str] = set()  # exception types already logged
+    started = time.perf_counter()
+    measure_from = started + warmup_s
+    deadline = measure_from + duration_s
+    measuring = False
+
+    async def worker(n: int) -> None:
+        nonlocal measuring
+        client = connect()
+        i = n
+        try:
+            while time.perf_counter() < deadline:
+                body = {"question": QUESTIONS[i % len(QUESTIONS)], "docIds": [BENCH_DOC_ID]}
+                i += concurrency
+                t0 = time.perf_counter()
+                try:
+                    status = await client.post_json("/v1/answers", body)
+                    error = None if status == 200 else str(status)
+                except Exception as e:
+                    error = type(e).__name__
+                    if error not in failures:
+                        failures.add(error)
+                        logger.warning(f"c={concurrency}: first {error}: {e}")
+                t1 = time.perf_counter()
+                if t0 < measure_from:
+                    continue
+                if not measuring:
+                    measuring = True
+                    monitor.reset()
+                if error is None:
+                    latencies.append((t1 - t0) * 1000)
+                else:
+                    errors[error] = errors.get(error, 0) + 1
+        finally:
+            client.close()
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = max(time.perf_counter() - measure_from, 1e-9)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "latencyMs": _latency_report(latencies),
+        **monitor.report(),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def _uvicorn(app, port: int) -> Iterator[asyncio.AbstractEventLoop]:
+    """Serve ``app`` on a local uvicorn in a background thread; yields the server's loop."""
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    )
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(
+        target=lambda: loop.run_until_complete(server.serve()), name="uvicorn", daemon=True
+    )
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        time.sleep(0.05)
+    try:
+        yield loop
+    finally:
+        server.should_exit = True
+        thread.join()
+        loop.close()
+
+
+async def _sweep(
+    connect: Callable[[], Any],
+    loop: asyncio.AbstractEventLoop,
+    levels: list[int],
+    duration_s: float,
+    warmup_s: float,
+) -> list[dict]:
+    monitor = LoopMonitor(loop)
+    monitor.start()
+    try:
+        results = []
+        for concurrency in levels:
+            level = await run_level(connect, monitor, concurrency, duration_s, warmup_s)
+            logger.info(
+                f"c={concurrency}: {level['rps']} req/s, p50 {level['latencyMs']['p50']} ms, "
+                f"p99 {level['latencyMs']['p99']} ms, loop lag p99 "
+                f"{level['loopLagMs']['p99']} ms, threadpool busy max "
+                f"{level['threadpool']['busyMax']}/{level['threadpool']['size']}"
+            )
+            results.append(level)
+        return results
+    finally:
+        monitor.stop()
+
+
+async def _run_asgi(app, levels: list[int], duration_s: float, warmup_s: float) -> list[dict]:
+    # Client and app share this loop, so loop lag includes the load generator's own work
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await _sweep(
+            lambda: _AsgiClient(client),
+            asyncio.get_running_loop(),
+            levels,
+            duration_s,
+            warmup_s,
+        )
+
+
+def run(
+    levels: list[int],
+    duration_s: float = 10.0,
+    warmup_s: float = 1.0,
+    latency: StubLatency | None = None,
+    mode: str = "asgi",
+    chunks: int = 500,
+    dim: int = 1536,
+    llm_cache: bool = False,
+) -> dict[str, Any]:
+    """
+    Sweep ``/v1/answers`` over concurrency ``levels`` against stubbed backends.
+
+    ``mode="asgi"`` calls the app in-process through httpx's ASGI transport; ``"uvicorn"``
+    serves it from a local uvicorn so HTTP parsing and the socket path are included.
+    """
+    from app.main import create_app
+
+    latency = latency or StubLatency()
+    app = create_app()
+    with stub_backends(latency, chunks=chunks, dim=dim, llm_cache=llm_cache):
+        if mode == "asgi":
+            results = asyncio.run(_run_asgi(app, levels, duration_s, warmup_s))
+        elif mode == "uvicorn":
+            port = _free_port()
+            with _uvicorn(app, port) as loop:
+                results = asyncio.run(
+                    _sweep(
+                        lambda: _Connection("127.0.0.1", port), loop, levels, duration_s, warmup_s
+                    )
+                )
+        else:
+            raise ValueError(f"Unknown mode {mode!r}")
+    return {
+        "benchmark": "load",
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "mode": mode,
+        "durationS": duration_s,
+        "stubLatencyMs": latency.__dict__,
+        "chunks": chunks,
+        "dim": dim,
+        "levels": results,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float = 0.1) -> list[str]:
+    """Levels whose throughput fell, or whose p99 rose, by more than ``tolerance``."""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    regressions = []
+    for level in result["levels"]:
+        base = previous.get(level["concurrency"])
+        if base is None:
+            continue
+        c = level["concurrency"]
+        if base["rps"] and level["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"c={c} rps: {base['rps']} -> {level['rps']}")
+        p99, base_p99 = level["latencyMs"]["p99"], base["latencyMs"]["p99"]
+        if base_p99 and p99 > base_p99 * (1 + tolerance):
+            regressions.append(f"c={c} p99: {base_p99} -> {p99} ms")
+        if level["errors"] and not base["errors"]:
+            regressions.append(f"c={c} errors: {level['errors']}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:  # pragma: no cover - convenience
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bench.load",
+        description="Load-test /v1/answers against stubbed embedder, vector store and LLM",
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--embed-ms", type=float, default=20.0)
+    parser.add_argument("--search-ms", type=float, default=5.0)
+    parser.add_argument("--chat-ms", type=float, default=300.0)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--llm-cache", action="store_true")
+    parser.add_argument("--output", help="Write results JSON here (default: data/bench/...)")
+    parser.add_argument("--baseline", help="Compare against a previous results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    from app.core.logging import configure_logging
+    from app.services.tokenizer import get_encoding
+
+    configure_logging()
+    try:
+        # The only real dependency left on the stubbed answer path; without it every
+        # request fails and the sweep measures nothing
+        get_encoding()
+    except RuntimeError as e:
+        parser.exit(2, f"{e}\n")
+    result = run(
+        args.concurrency,
+        duration_s=args.duration,
+        warmup_s=args.warmup,
+        latency=StubLatency(args.embed_ms, args.search_ms, args.chat_ms),
+        mode=args.mode,
+        chunks=args.chunks,
+        dim=args.dim,
+        llm_cache=args.llm_cache,
+    )
+    empty = [level["concurrency"] for level in result["levels"] if not level["requests"]]
+    if empty:
+        errors = {level["concurrency"]: level["errors"] for level in result["levels"]}
+        print(f"No successful requests at concurrency {empty}, not writing results: {errors}")
+        return 1
+    output = args.output or os.path.join(
+        settings.data_dir, "bench", f"load-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from app.bench.stubs import StubVectorStore
+from app.core.config import Settings, settings
+from app.deps import parsed_path, sanitize_namespace
+from app.services.chunker.chunker import chunk_pages
+from app.services.reranker import llm_score
+from app.services.retriever.retriever import Hit, Retriever, rerank_hits
+from app.services.vectorstore.points import chunk_points
+
+logger = logging.getLogger(__name__)
+
+# Settings that change how documents are chunked; grids over them need the memory index
+CHUNK_KEYS = ("chunk_target_tokens", "chunk_overlap_tokens")
+
+
+@dataclass
+class LabelledQuestion:
+    question: str
+    doc_id: str
+    relevant_pages: set[int]
+
+
+def load_questions(path: str) -> list[LabelledQuestion]:
+    """Read ``{"question", "docId", "relevantPages"}`` items from a JSON list or JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        items = json.loads(text)
+    else:
+        items = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [
+        LabelledQuestion(item["question"], str(item["docId"]), set(item["relevantPages"]))
+        for item in items
+    ]
+
+
+def _coerce(key: str, raw: str) -> Any:
+    current = getattr(settings, key)
+    if isinstance(current, bool):
+        if raw.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(f"{key} expects true/false, got {raw!r}")
+        return raw.lower() in ("true", "1")
+    if isinstance(current, int):
+        return int(raw)
+    if isinstance(current, float):
+        return float(raw)
+    return raw
+
+
+def parse_grid(specs: list[str]) -> list[dict[str, Any]]:
+    """Expand ``key=v1,v2`` specs over Settings fields into every combination."""
+    axes: dict[str, list[Any]] = {}
+    for spec in specs:
+        key, _, values = spec.partition("=")
+        key = key.strip()
+        if key not in Settings.model_fields:
+            raise ValueError(f"Unknown setting {key!r}")
+        axes[key] = [_coerce(key, v.strip()) for v in values.split(",") if v.strip()]
+    keys = list(axes)
+    combos = itertools.product(*axes.values())
+    return [dict(zip(keys, combo, strict=True)) for combo in combos] or [{}]
+
+
+@contextmanager
+def overrides(**values: Any) -> Iterator[None]:
+    saved = {key: getattr(settings, key) for key in values}
+    try:
+        for key, value in values.items():
+            setattr(settings, key, value)
+        yield
+    finally:
+        for key, value in saved.items():
+            setattr(settings, key, value)
+
+
+def _hit_pages(hit: Hit) -> set[int]:
+    start = hit.chunk.get("page_start")
+    end = hit.chunk.get("page_end") or start
+    return set(range(int(start), int(end) + 1)) if start is not None else set()
+
+
+def score_hits(hits: list[Hit], relevant: set[int], k: int) -> dict[str, float]:
+    """
+    Page-level recall@k, MRR and nDCG@k of ranked ``hits``.
+
+    A hit is relevant when its page range covers a relevant page that no earlier hit
+    covered, so several chunks of one page are not counted as several relevant results.
+    """
+    found: set[int] = set()
+    gains = []
+    first_relevant = None
+    for rank, hit in enumerate(hits[:k], start=1):
+        new = (_hit_pages(hit) & relevant) - found
+        found |= new
+        gains.append(1.0 if new else 0.0)
+        if new and first_relevant is None:
+            first_relevant = rank
+    dcg = sum(g / math.log2(rank + 1) for rank, g in enumerate(gains, start=1))
+    ideal = sum(1 / math.log2(rank + 1) for rank in range(1, min(k, len(relevant)) + 1))
+    return {
+        "recall": len(found) / len(relevant) if relevant else 0.0,
+        "mrr": 1.0 / first_relevant if first_relevant else 0.0,
+        "ndcg": dcg / ideal if ideal else 0.0,
+    }
+
+
+class CountingEmbedder:
+    """Embedder wrapper counting requests and embedded texts."""
+
+    def __init__(self, inner) -> None:
+        self.inner = inner
+        self.model = getattr(inner, "model", "")
+        self.calls = 0
+        self.texts = 0
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        return self.inner.embed_texts(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        self.texts += 1
+        return self.inner.embed_query(text)
+
+
+@contextmanager
+def count_llm_calls() -> Iterator[dict[str, int]]:
+    """Count chat completions requested by the LLM reranker (cache hits included)."""
+    counts = {"calls": 0}
+    original = llm_score.chat_completion
+
+    def counting(*args: Any, **kwargs: Any) -> str:
+        counts["calls"] += 1
+        return original(*args, **kwargs)
+
+    llm_score.chat_completion = counting
+    try:
+        yield counts
+    finally:
+        llm_score.chat_completion = original
+
+
+@dataclass
+class MemoryIndex:
+    """
+    Exact in-memory index rebuilt from each document's stored parsed pages.
+
+    Collections are built per chunking configuration and reused across grid points that
+    share it, so only the chunking axes cost embedding calls. ``embedder`` counts those
+    calls separately from the per-query ones.
+    """
+
+    embedder: CountingEmbedder
+    store: StubVectorStore = field(default_factory=lambda: StubVectorStore(rescale=False))
+    built: set[str] = field(default_factory=set)
+
+    def namespace(self, doc_id: str) -> str:
+        chunking = "_".join(str(getattr(settings, key)) for key in CHUNK_KEYS)
+        return f"{sanitize_namespace(doc_id)}__{chunking}"
+
+    def ensure(self, doc_id: str) -> str:
+        namespace = self.namespace(doc_id)
+        if namespace in self.built:
+            return namespace
+        with open(parsed_path(doc_id), encoding="utf-8") as f:
+            pages = json.load(f)["pages"]
+        chunks, _ = chunk_pages(doc_id, pages)
+        size = max(1, settings.embedding_batch_size)
+        for start in range(0, len(chunks), size):
+            batch = chunks[start : start + size]
+            vectors = self.embedder.embed_texts([c.text for c in batch])
+            self.store.upsert(namespace, chunk_points(batch, vectors))
+        self.built.add(namespace)
+        logger.info(f"Indexed {doc_id} as {namespace}: {len(chunks)} chunks")
+        return namespace
+
+
+def evaluate_config(
+    questions: list[LabelledQuestion],
+    embedder,
+    vectorstore,
+    cutoff: int,
+    index: MemoryIndex | None = None,
+) -> dict[str, Any]:
+    """Run every question under the current settings and aggregate quality and cost."""
+    from app.deps import get_reranker
+
+    counter = CountingEmbedder(embedder)
+    retriever = Retriever(embedder=counter, vectorstore=index.store if index else vectorstore)
+    reranker = get_reranker() if settings.enable_rerank else None
+    scores: list[dict[str, float]] = []
+    latencies: list[float] = []
+    with count_llm_calls() as llm:
+        for q in questions:
+            namespace = index.ensure(q.doc_id) if index else sanitize_namespace(q.doc_id)
+            start = time.perf_counter()
+            results = retriever.search(
+                q.question, namespace=namespace, k=settings.top_k, k_final=settings.top_k_final
+            )
+            if reranker is not None:
+                rerank_hits(q.question, results, reranker, settings.top_k_final)
+            latencies.append((time.perf_counter() - start) * 1000)
+            scores.append(score_hits(results.hits, q.relevant_pages, cutoff))
+
+    n = max(1, len(questions))
+    values = np.asarray(latencies or [0.0])
+    return {
+        f"recall@{cutoff}": round(sum(s["recall"] for s in scores) / n, 4),
+        "mrr": round(sum(s["mrr"] for s in scores) / n, 4),
+        f"ndcg@{cutoff}": round(sum(s["ndcg"] for s in scores) / n, 4),
+        "latencyMs": {
+            "p50": round(float(np.percentile(values, 50)), 2),
+            "p95": round(float(np.percentile(values, 95)), 2),
+            "mean": round(float(values.mean()), 2),
+        },
+        "embeddingCallsPerQuery": round(counter.calls / n, 2),
+        "llmCallsPerQuery": round(llm["calls"] / n, 2),
+    }
+
+
+def run(
+    questions: list[LabelledQuestion],
+    grid: list[dict[str, Any]],
+    cutoff: int = 5,
+    index: str = "live",
+    embedder=None,
+    vectorstore=None,
+    llm_cache: bool = False,
+) -> dict[str, Any]:
+    """
+    Evaluate ``questions`` under every configuration in ``grid``.
+
+    ``index="live"`` searches the documents' existing collections; ``"memory"`` re-chunks
+    and embeds their parsed pages into an exact in-memory index, which grids over
+    ``chunk_target_tokens``/``chunk_overlap_tokens`` require.
+    """
+    from app.deps import get_embedder, get_vectorstore
+
+    if index == "live" and any(key in config for config in grid for key in CHUNK_KEYS):
+        raise ValueError("Grids over chunking settings need index='memory'")
+    embedder = embedder or get_embedder()
+    index_embedder = CountingEmbedder(embedder)
+    memory = MemoryIndex(index_embedder) if index == "memory" else None
+    store = None if memory else (vectorstore or get_vectorstore())
+
+    configs = []
+    with overrides(llm_cache_enabled=llm_cache):
+        for config in grid:
+            with overrides(**config):
+                result = evaluate_config(questions, embedder, store, cutoff, index=memory)
+            configs.append({"config": config, **result})
+            logger.info(f"{config}: {result}")
+    return {
+        "benchmark": "retrieval",
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "questions": len(questions),
+        "cutoff": cutoff,
+        "index": index,
+        "indexEmbeddingCalls": index_embedder.calls,
+        "configs": configs,
+    }
+
+
+def cheapest(result: dict, min_recall: float, min_mrr: float = 0.0) -> dict | None:
+    """The cheapest configuration meeting the quality bar: fewest LLM calls, then latency."""
+    recall_key = f"recall@{result['cutoff']}"
+    passing = [
+        c for c in result["configs"] if c[recall_key] >= min_recall and c["mrr"] >= min_mrr
+    ]
+    if not passing:
+        return None
+    return min(
+        passing,
+        key=lambda c: (c["llmCallsPerQuery"], c["embeddingCallsPerQuery"], c["latencyMs"]["p50"]),
+    )
+
+
+def format_table(result: dict) -> str:
+    cutoff = result["cutoff"]
+    rows = [
+        (
+            " ".join(f"{k}={v}" for k, v in c["config"].items()) or "(current settings)",
+            f"{c[f'recall@{cutoff}']:.3f}",
+            f"{c['mrr']:.3f}",
+            f"{c[f'ndcg@{cutoff}']:.3f}",
+            f"{c['latencyMs']['p50']:.1f}",
+            f"{c['latencyMs']['p95']:.1f}",
+            f"{c['embeddingCallsPerQuery']:g}",
+            f"{c['llmCallsPerQuery']:g}",
+        )
+        for c in result["configs"]
+    ]
+    header = ("config", f"recall@{cutoff}", "mrr", f"ndcg@{cutoff}", "p50 ms", "p95 ms")
+    header += ("emb/q", "llm/q")
+    widths = [max(len(str(r[i])) for r in [header, *rows]) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(str(cell).ljust(w) for cell, w in zip(row, widths, strict=True))
+        for row in [header, *rows]
+    )
+
+
+def main(argv: list[str] | None = None) -> int:  # pragma: no cover - convenience
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bench.retrieval",
+        description="Compare retrieval quality and cost across retriever configurations",
+    )
+    parser.add_argument("questions", help="JSON/JSONL of {question, docId, relevantPages}")
+    parser.add_argument(
+        "--grid",
+        nargs="*",
+        default=[],
+        help="Settings to sweep, e.g. top_k=5,10,20 enable_bm25=false,true",
+    )
+    parser.add_argument("--cutoff", type=int, default=5, help="k for recall@k and nDCG@k")
+    parser.add_argument("--index", choices=["live", "memory"], default=None)
+    parser.add_argument("--llm-cache", action="store_true")
+    parser.add_argument("--min-recall", type=float, default=None)
+    parser.add_argument("--min-mrr", type=float, default=0.0)
+    parser.add_argument("--output", help="Write results JSON here (default: data/bench/...)")
+    args = parser.parse_args(argv)
+
+    from app.core.logging import configure_logging
+
+    configure_logging()
+    try:
+        grid = parse_grid(args.grid)
+    except ValueError as e:
+        parser.error(str(e))
+    index = args.index or (
+        "memory" if any(key in c for c in grid for key in CHUNK_KEYS) else "live"
+    )
+    result = run(
+        load_questions(args.questions),
+        grid,
+        cutoff=args.cutoff,
+        index=index,
+        llm_cache=args.llm_cache,
+    )
+    if args.min_recall is not None:
+        result["cheapest"] = cheapest(result, args.min_recall, args.min_mrr)
+
+    output = args.output or os.path.join(
+        settings.data_dir, "bench", f"retrieval-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(format_table(result))
+    if args.min_recall is not None:
+        best = result["cheapest"]
+        print(f"\nCheapest meeting the bar: {best['config'] if best else 'none'}")
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any
+
+import numpy as np
+
+# Modules that should not be imported just by loading the API app (numpy stays: the
+# answer path uses it on every request)
+HEAVY_MODULES = ("openai", "qdrant_client", "redis", "rq", "tiktoken", "fitz")
+
+
+def _import_profile(module: str) -> tuple[float, dict[str, int], set[str]]:
+    """Import ``module`` in a fresh interpreter under ``-X importtime``."""
+    code = f"import {module}, sys; print(' '.join(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.getcwd(),
+    )
+    cumulative: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = (part.strip() for part in line.removeprefix("import time:").split("|"))
+        if cum.isdigit():
+            cumulative[name] = int(cum)
+    total_us = cumulative.get(module, 0)
+    return total_us / 1000, cumulative, set(proc.stdout.split())
+
+
+def import_report(module: str = "app.main", repeats: int = 5, top: int = 15) -> dict[str, Any]:
+    """Median import time of ``module`` and which heavy dependencies it pulls in."""
+    runs = [_import_profile(module) for _ in range(repeats)]
+    totals = [total for total, _, _ in runs]
+    _, cumulative, loaded = runs[-1]
+    # Top-level packages only; nested entries are already included in their parent
+    packages = {name: us for name, us in cumulative.items() if "." not in name}
+    return {
+        "module": module,
+        "importMs": {
+            "median": round(float(np.median(totals)), 1),
+            "min": round(min(totals), 1),
+            "max": round(max(totals), 1),
+        },
+        "heavyImported": sorted(m for m in HEAVY_MODULES if m in loaded),
+        "topPackagesMs": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> int:  # pragma: no cover - convenience
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bench.startup", description="Report import time of the API app"
+    )
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="Also write the report JSON here")
+    args = parser.parse_args(argv)
+
+    report = import_report(args.module, args.repeats)
+    report["createdAt"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
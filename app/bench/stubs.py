@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+# Deterministic local stand-ins for the embedder, vector store and chat model. Each call
+# sleeps for its configured latency (the real clients are blocking too), so benchmarks
+# exercise our own code paths at realistic backend timings without network access.
+
+
+def _sleep_ms(ms: float) -> None:
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+
+class StubEmbedder:
+    """Deterministic, network-free embedder; vectors are seeded from the text hash."""
+
+    model = "stub"
+
+    def __init__(self, dim: int = 1536, latency_ms: float = 0.0) -> None:
+        self.dim = dim
+        self.latency_ms = latency_ms
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        _sleep_ms(self.latency_ms)
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+            out[i] = np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+        out /= np.linalg.norm(out, axis=1, keepdims=True)
+        return out.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_texts([text])[0]
+
+
+class StubVectorStore:
+    """
+    In-memory vector store doing exact cosine search over a float32 matrix per namespace.
+
+    Random embeddings are nearly orthogonal, so by default search scores are rescaled from
+    [-1, 1] to [0, 1]; otherwise every query would fall under the answer confidence
+    thresholds. ``rescale=False`` returns raw cosine scores like Qdrant does.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, rescale: bool = True) -> None:
+        self.latency_ms = latency_ms
+        self.rescale = rescale
+        self.namespaces: dict[str, list[np.ndarray]] = {}
+        self.payloads: dict[str, list[dict]] = {}
+        self._matrix: dict[str, np.ndarray] = {}
+
+    def upsert(self, namespace: str, vectors: list[dict]) -> None:
+        self.namespaces.setdefault(namespace, []).append(
+            np.asarray([p["vector"] for p in vectors], dtype=np.float32)
+        )
+        self.payloads.setdefault(namespace, []).extend(p["payload"] for p in vectors)
+        self._matrix.pop(namespace, None)
+
+    def count(self, namespace: str) -> int:
+        return sum(len(m) for m in self.namespaces.get(namespace, []))
+
+    def _search(self, namespace: str, query_vector: list[float], k: int) -> list[dict]:
+        matrix = self._matrix.get(namespace)
+        if matrix is None:
+            parts = self.namespaces.get(namespace)
+            if not parts:
+                return []
+            matrix = self._matrix[namespace] = np.concatenate(parts)
+        scores = matrix @ np.asarray(query_vector, dtype=np.float32)
+        top = np.argsort(-scores)[:k]
+        payloads = self.payloads[namespace]
+        return [
+            {
+                "id": payloads[i].get("chunk_id"),
+                "score": float((scores[i] + 1) / 2 if self.rescale else scores[i]),
+                "payload": payloads[i],
+            }
+            for i in top
+        ]
+
+    def search(self, namespace: str, query_vector: list[float], k: int) -> list[dict]:
+        _sleep_ms(self.latency_ms)
+        return self._search(namespace, query_vector, k)
+
+    def search_batch(
+        self, namespace: str, query_vectors: list[list[float]], k: int
+    ) -> list[list[dict]]:
+        _sleep_ms(self.latency_ms)
+        return [self._search(namespace, q, k) for q in query_vectors]
+
+
+_PAGE_RE = re.compile(r"\[page (\d+)\]")
+
+
+class StubChatClient:
+    """Stands in for ``openai.OpenAI``; answers cite the first page found in the prompt."""
+
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: list[dict], **params) -> SimpleNamespace:
+        _sleep_ms(self.latency_ms)
+        prompt = messages[-1]["content"]
+        page: re.Match | None = _PAGE_RE.search(prompt)
+        question = prompt.split("\n", 1)[0].removeprefix("Question: ")
+        text = f"Stub answer to {question!r}."
+        if page is not None:
+            text = f"{text[:-1]} [page {page.group(1)}]."
+        words = sum(len(m["content"].split()) for m in messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+            usage=SimpleNamespace(prompt_tokens=words, completion_tokens=len(text.split())),
+        )
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import random
+import textwrap
+from dataclasses import dataclass
+
+import fitz  # PyMuPDF
+
+_WORDS = [
+    "context", "retrieval", "vector", "index", "embedding", "chunk", "page", "document", "section",
+    "table", "revenue", "quarter", "growth", "margin", "policy", "customer", "contract", "clause",
+    "liability", "term", "payment", "invoice", "model", "latency", "throughput", "memory",
+    "storage", "cluster", "region", "replica", "shard", "queue", "worker", "report", "summary",
+    "analysis", "result", "method", "sample", "figure", "value", "total", "average", "increase",
+]
+
+_PAGE_W, _PAGE_H = 595, 842  # A4 in points
+_MARGIN = 40
+_FONT_SIZE = 7
+_LINE_H = _FONT_SIZE * 1.25
+_LINE_CHARS = 120
+MAX_LINES = int((_PAGE_H - 2 * _MARGIN) / _LINE_H)
+
+
+@dataclass(frozen=True)
+class PdfSpec:
+    """Shape of a synthetic PDF: page count, words of prose per page, share of table pages."""
+
+    pages: int = 20
+    words_per_page: int = 400
+    table_ratio: float = 0.2
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"p{self.pages}-w{self.words_per_page}-t{self.table_ratio:g}"
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(6, 18))
+    return " ".join(words).capitalize() + "."
+
+
+def _prose(rng: random.Random, words: int) -> list[str]:
+    lines: list[str] = []
+    while words > 0:
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            sentences.append(_sentence(rng))
+            words -= sentences[-1].count(" ") + 1
+            if words <= 0:
+                break
+        lines.extend(textwrap.wrap(" ".join(sentences), _LINE_CHARS))
+        lines.append("")  # paragraph break
+    return lines
+
+
+def _table(rng: random.Random, rows: int) -> list[str]:
+    cols = rng.randint(3, 6)
+    header = " | ".join(f"{rng.choice(_WORDS)}_{c}" for c in range(cols))
+    body = [
+        " | ".join(f"{rng.uniform(0, 10_000):10.2f}" for _ in range(cols)) for _ in range(rows)
+    ]
+    return [f"Table {rng.randint(1, 99)}", header, *body, ""]
+
+
+def page_lines(spec: PdfSpec, page: int) -> list[str]:
+    rng = random.Random(spec.seed * 1_000_003 + page)
+    lines = [f"Section {page + 1}", ""]
+    if rng.random() < spec.table_ratio:
+        # Table pages keep half their prose so density stays comparable across mixes
+        lines += _prose(rng, spec.words_per_page // 2) + _table(rng, rng.randint(8, 30))
+    else:
+        lines += _prose(rng, spec.words_per_page)
+    return lines[:MAX_LINES]  # text past the page end would be clipped anyway
+
+
+def make_pdf(path: str, spec: PdfSpec) -> str:
+    """Write a deterministic synthetic PDF for ``spec`` to ``path``."""
+    doc = fitz.open()
+    for page_no in range(spec.pages):
+        page = doc.new_page(width=_PAGE_W, height=_PAGE_H)
+        for i, line in enumerate(page_lines(spec, page_no)):
+            if line:
+                y = _MARGIN + (i + 1) * _LINE_H
+                page.insert_text((_MARGIN, y), line, fontsize=_FONT_SIZE, fontname="cour")
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return path
@@ -0,0 +1,478 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing as mp
+import os
+import shutil
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from uuid import UUID, uuid4
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.db import repo
+from app.db.database import init_db
+from app.deps import blob_path, chunks_path, parsed_path, sanitize_namespace, vectors_path
+from app.services.chunker.chunker import Chunk, chunk_pages
+from app.services.parser.pdf_pymupdf import parse_pdf_pymupdf
+from app.services.vectorstore.artifacts import reindex_document, save_vectors
+from app.services.vectorstore.points import chunk_points
+
+logger = logging.getLogger(__name__)
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _parse_and_chunk(path: str, doc_id: str) -> dict:
+    """Pool task: parse and chunk one PDF. CPU-bound, so it runs in a worker process."""
+    t0 = time.perf_counter()
+    pages, meta = parse_pdf_pymupdf(path)
+    t1 = time.perf_counter()
+    chunks, stats = chunk_pages(doc_id, pages)
+    t2 = time.perf_counter()
+    return {
+        "doc_id": doc_id,
+        "pages": pages,
+        "meta": meta,
+        "chunks": [c.__dict__ for c in chunks],
+        "stats": stats,
+        "parse_s": t1 - t0,
+        "chunk_s": t2 - t1,
+    }
+
+
+@dataclass
+class StageTotals:
+    docs: int = 0
+    failed: int = 0
+    pages: int = 0
+    chunks: int = 0
+    vectors: int = 0
+    parse_s: float = 0.0
+    chunk_s: float = 0.0
+    embed_s: float = 0.0
+    upsert_s: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+
+    def report(self) -> dict[str, Any]:
+        wall = max(time.perf_counter() - self.started, 1e-9)
+
+        def rate(n: int, seconds: float) -> float:
+            return round(n / seconds, 1) if seconds > 0 else 0.0
+
+        return {
+            "docs": self.docs,
+            "failed": self.failed,
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "vectors": self.vectors,
+            "wallSeconds": round(wall, 2),
+            # Per-stage rates use the time spent in that stage (summed over pool workers);
+            # end-to-end rates use wall time
+            "parsePagesPerS": rate(self.pages, self.parse_s),
+            "chunkChunksPerS": rate(self.chunks, self.chunk_s),
+            "embedVectorsPerS": rate(self.vectors, self.embed_s),
+            "upsertVectorsPerS": rate(self.vectors, self.upsert_s),
+            "pagesPerS": rate(self.pages, wall),
+            "chunksPerS": rate(self.chunks, wall),
+            "vectorsPerS": rate(self.vectors, wall),
+        }
+
+
+class BulkIngester:
+    """
+    In-process ingest sink for the offline CLI.
+
+    Parsed documents are fed in as they come back from the pool. Their chunks go into one
+    shared buffer that is embedded in full ``batch_size`` requests regardless of document
+    boundaries; each batch's vectors are then upserted per document namespace. Finished
+    documents are written to the database in bulk every ``commit_every`` documents, which is
+    also the resume point: a re-run skips files whose hash already has a ready document.
+
+    A batch whose embedding fails is dropped and every document in it fails; an upsert
+    failure fails only its document. Failed documents lose their buffered chunks, vectors
+    and files, so a re-run ingests them from scratch.
+    """
+
+    def __init__(self, embedder, vectorstore, batch_size: int, commit_every: int = 50) -> None:
+        self.embedder = embedder
+        self.vectorstore = vectorstore
+        self.batch_size = max(1, batch_size)
+        self.commit_every = max(1, commit_every)
+        self.totals = StageTotals()
+        self._buffer: list[Chunk] = []
+        self._remaining: dict[str, int] = {}
+        self._vectors: dict[str, list[np.ndarray]] = defaultdict(list)
+        self._docs: dict[str, dict] = {}
+        self._sources: dict[str, str] = {}
+        self._finished: list[dict] = []
+
+    def add(self, source: str, sha256: str, result: dict) -> None:
+        doc_id = result["doc_id"]
+        chunks = [Chunk(**c) for c in result["chunks"]]
+        self.totals.pages += len(result["pages"])
+        self.totals.chunks += len(chunks)
+        self.totals.parse_s += result["parse_s"]
+        self.totals.chunk_s += result["chunk_s"]
+
+        try:
+            with open(parsed_path(doc_id), "w", encoding="utf-8") as f:
+                json.dump({"pages": result["pages"], "meta": result["meta"]}, f)
+            with open(chunks_path(doc_id), "w", encoding="utf-8") as f:
+                json.dump({"chunks": result["chunks"], "stats": result["stats"]}, f)
+            shutil.copyfile(source, blob_path(doc_id))
+        except Exception:
+            _remove_files(doc_id)
+            raise
+
+        self._docs[doc_id] = {
+            "id": UUID(doc_id),
+            "name": os.path.basename(source),
+            "sha256": sha256,
+            "bytes": os.path.getsize(source),
+            "pages": result["meta"].get("total_pages", len(result["pages"])),
+            "chunks": len(chunks),
+            "status": "ready",
+        }
+        self._sources[doc_id] = source
+        self._remaining[doc_id] = len(chunks)
+        if not chunks:
+            self._complete(doc_id)
+        self._buffer.extend(chunks)
+        while len(self._buffer) >= self.batch_size:
+            batch, self._buffer = self._buffer[: self.batch_size], self._buffer[self.batch_size :]
+            self._embed(batch)
+
+    def close(self) -> StageTotals:
+        """Embed the partial last batch and write all remaining document rows."""
+        try:
+            if self._buffer:
+                batch, self._buffer = self._buffer, []
+                self._embed(batch)
+        finally:
+            self._commit()
+        return self.totals
+
+    def _embed(self, batch: list[Chunk]) -> None:
+        by_doc: dict[str, list[int]] = defaultdict(list)
+        for i, c in enumerate(batch):
+            by_doc[c.doc_id].append(i)
+        t0 = time.perf_counter()
+        try:
+            vectors = self.embedder.embed_texts([c.text for c in batch])
+        except Exception as e:
+            for doc_id in by_doc:
+                self._fail(doc_id, e)
+            return
+        t1 = time.perf_counter()
+        for doc_id, idx in by_doc.items():
+            points = chunk_points([batch[i] for i in idx], [vectors[i] for i in idx])
+            try:
+                self.vectorstore.upsert(namespace=sanitize_namespace(doc_id), vectors=points)
+            except Exception as e:
+                self._fail(doc_id, e)
+                continue
+            self._vectors[doc_id].append(np.asarray([vectors[i] for i in idx], dtype=np.float32))
+            self.totals.vectors += len(idx)
+            self._remaining[doc_id] -= len(idx)
+            if self._remaining[doc_id] == 0:
+                self._complete(doc_id)
+        self.totals.embed_s += t1 - t0
+        self.totals.upsert_s += time.perf_counter() - t1
+
+    def _fail(self, doc_id: str, error: Exception) -> None:
+        """Drop a document that can't be finished, along with everything stored for it."""
+        if doc_id not in self._docs:  # already failed earlier in the same batch
+            return
+        logger.error(f"Failed to ingest {self._sources.pop(doc_id)}: {error}")
+        del self._docs[doc_id]
+        del self._remaining[doc_id]
+        self._vectors.pop(doc_id, None)
+        self._buffer = [c for c in self._buffer if c.doc_id != doc_id]
+        try:
+            self.vectorstore.delete_namespace(sanitize_namespace(doc_id))
+        except Exception as e:
+            logger.warning(f"Could not drop vectors of failed document {doc_id}: {e}")
+        _remove_files(doc_id)
+        self.totals.failed += 1
+
+    def _complete(self, doc_id: str) -> None:
+        parts = self._vectors.pop(doc_id, [])
+        if settings.vector_artifacts_enabled and parts:
+            save_vectors(
+                vectors_path(doc_id), np.concatenate(parts), settings.vector_artifact_dtype
+            )
+        self._finished.append(self._docs.pop(doc_id))
+        del self._remaining[doc_id]
+        self._sources.pop(doc_id, None)
+        self.totals.docs += 1
+        if len(self._finished) >= self.commit_every:
+            self._commit()
+
+    def _commit(self) -> None:
+        if self._finished:
+            repo.create_documents(self._finished)
+            self._finished = []
+
+
+def _remove_files(doc_id: str) -> None:
+    for path_fn in (parsed_path, chunks_path, blob_path, vectors_path):
+        if os.path.exists(path_fn(doc_id)):
+            os.remove(path_fn(doc_id))
+
+
+def find_pdfs(root: str, recursive: bool = True) -> list[str]:
+    pattern = "**/*.pdf" if recursive else "*.pdf"
+    return sorted(str(p) for p in Path(root).glob(pattern) if p.is_file())
+
+
+def ingest_dir(
+    root: str,
+    workers: int,
+    batch_size: int,
+    commit_every: int = 50,
+    recursive: bool = True,
+    embedder=None,
+    vectorstore=None,
+) -> dict[str, Any]:
+    """Ingest every PDF under ``root`` without the API or Redis and return throughput."""
+    from app.deps import get_embedder, get_vectorstore
+
+    paths = find_pdfs(root, recursive=recursive)
+    hashes = {p: _sha256_file(p) for p in paths}
+    pending = _pending(paths, hashes)
+    logger.info(f"Found {len(paths)} PDFs, {len(paths) - len(pending)} already ingested")
+
+    sink = BulkIngester(
+        embedder or get_embedder(),
+        vectorstore or get_vectorstore(),
+        batch_size=batch_size,
+        commit_every=commit_every,
+    )
+    try:
+        for path, result in _parsed(pending, workers):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                sink.add(path, hashes[path], result)
+            except Exception as e:
+                sink.totals.failed += 1
+                logger.error(f"Failed to ingest {path}: {e}")
+    finally:
+        # Documents whose vectors are already upserted get their rows even if we stop early
+        report = sink.close().report()
+    report["skipped"] = len(paths) - len(pending)
+    return report
+
+
+def _pending(paths: list[str], hashes: dict[str, str]) -> list[str]:
+    """Paths still to ingest; identical files within the directory are ingested once."""
+    done = repo.find_ready_by_sha256s(list(hashes.values()))
+    pending: list[str] = []
+    seen: set[str] = set()
+    for path in paths:
+        if hashes[path] not in done and hashes[path] not in seen:
+            seen.add(hashes[path])
+            pending.append(path)
+    return pending
+
+
+def _parsed(paths: list[str], workers: int) -> Iterator[tuple[str, Any]]:
+    """Yield ``(path, parse result or exception)``, from a process pool when ``workers`` > 0."""
+    if workers <= 0:
+        for path in paths:
+            try:
+                yield path, _parse_and_chunk(path, str(uuid4()))
+            except Exception as e:
+                yield path, e
+        return
+
+    methods = mp.get_all_start_methods()
+    ctx = mp.get_context("fork" if "fork" in methods else "spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        # Keep a bounded number of parsed documents in flight so memory stays flat
+        todo = iter(paths)
+        in_flight: dict[Future, str] = {}
+        while True:
+            while len(in_flight) < workers * 2 and (path := next(todo, None)) is not None:
+                in_flight[pool.submit(_parse_and_chunk, path, str(uuid4()))] = path
+            if not in_flight:
+                return
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                path = in_flight.pop(fut)
+                error = fut.exception()
+                yield path, error if error is not None else fut.result()
+
+
+def reindex(
+    vectorstore,
+    concurrency: int,
+    batch_size: int,
+    recreate: bool = False,
+) -> dict[str, Any]:
+    """
+    Rebuild every ready document's vector namespace from its local artifacts.
+
+    Each collection is loaded once from the first document that still has its files (the
+    canonical document, or any of its dedupe aliases), then aliases are re-pointed at it.
+    Documents are loaded concurrently; nothing is re-embedded.
+    """
+    members = _collections(repo.list_ready_documents())
+    started = time.perf_counter()
+    points = 0
+    errors: dict[str, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(_load_collection, vectorstore, c, ids, batch_size, recreate): c
+            for c, ids in members.items()
+        }
+        for n, fut in enumerate(as_completed(futures), start=1):
+            canonical = futures[fut]
+            try:
+                points += fut.result()
+            except Exception as e:
+                errors[canonical] = str(e)
+                logger.error(f"Re-index of {canonical} failed: {e}")
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Re-indexed {n}/{len(futures)} collections, {points} points "
+                f"({points / max(elapsed, 1e-9):.0f} points/s)"
+            )
+
+    for canonical, ids in members.items():
+        if canonical not in errors:
+            _repoint_aliases(vectorstore, canonical, ids)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "collections": len(members) - len(errors),
+        "points": points,
+        "failed": errors,
+        "wallSeconds": round(elapsed, 2),
+        "pointsPerS": round(points / max(elapsed, 1e-9), 1),
+    }
+
+
+def _collections(docs: list) -> dict[str, list[str]]:
+    """Document ids grouped by the canonical document whose collection holds their vectors."""
+    members: dict[str, list[str]] = defaultdict(list)
+    for d in docs:
+        canonical = str(d.source_id or d.id)
+        # Canonical document first, so its own files are preferred
+        if str(d.id) == canonical:
+            members[canonical].insert(0, str(d.id))
+        else:
+            members[canonical].append(str(d.id))
+    return members
+
+
+def _load_collection(
+    vectorstore, canonical: str, doc_ids: list[str], batch_size: int, recreate: bool
+) -> int:
+    namespace = sanitize_namespace(canonical)
+    for doc_id in doc_ids:
+        if os.path.exists(vectors_path(doc_id)) and os.path.exists(chunks_path(doc_id)):
+            if recreate:
+                vectorstore.delete_namespace(namespace)
+            return reindex_document(
+                vectorstore,
+                namespace,
+                chunks_path(doc_id),
+                vectors_path(doc_id),
+                batch_size=batch_size,
+            )
+    raise FileNotFoundError("no vector artifact; re-ingest to rebuild")
+
+
+def _repoint_aliases(vectorstore, canonical: str, doc_ids: list[str]) -> None:
+    for doc_id in doc_ids:
+        if doc_id != canonical:
+            vectorstore.delete_namespace(sanitize_namespace(doc_id))
+            vectorstore.alias_namespace(
+                sanitize_namespace(doc_id), target=sanitize_namespace(canonical)
+            )
+
+
+def main(argv: list[str] | None = None) -> None:  # pragma: no cover - convenience
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="ContextForge CLI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Ingest a directory of PDFs in-process")
+    ingest.add_argument("directory")
+    ingest.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ingest.add_argument("--batch-size", type=int, default=settings.embedding_batch_size)
+    ingest.add_argument("--commit-every", type=int, default=50)
+    ingest.add_argument("--no-recursive", action="store_true")
+
+    reindex_cmd = sub.add_parser(
+        "reindex", help="Rebuild the vector store from local vector artifacts"
+    )
+    reindex_cmd.add_argument("--concurrency", type=int, default=settings.reindex_concurrency)
+    reindex_cmd.add_argument("--batch-size", type=int, default=512)
+    reindex_cmd.add_argument(
+        "--recreate", action="store_true", help="Drop each collection before loading it"
+    )
+
+    fetch_cmd = sub.add_parser(
+        "fetch-tokenizer", help="Download the tokenizer BPE file for offline use"
+    )
+    fetch_cmd.add_argument(
+        "--bundle", action="store_true", help="Also copy it into app/assets (image build step)"
+    )
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.command == "fetch-tokenizer":
+        from app.services import tokenizer
+
+        print(tokenizer.fetch(bundle=args.bundle))
+        return
+    init_db()
+    if args.command == "ingest":
+        report = ingest_dir(
+            args.directory,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            commit_every=args.commit_every,
+            recursive=not args.no_recursive,
+        )
+        print(json.dumps(report, indent=2))
+    elif args.command == "reindex":
+        from app.deps import get_vectorstore
+
+        report = reindex(
+            get_vectorstore(),
+            concurrency=args.concurrency,
+            batch_size=args.batch_size,
+            recreate=args.recreate,
+        )
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -8,13 +8,30 @@ class Settings(BaseSettings):
     app_host: str = "0.0.0.0"
     app_port: int = 8080
     cors_origins: str = "*"
+    # Build clients, load the tokenizer and ping backends at startup, off the first request
+    warmup_enabled: bool = True
 
     data_dir: str = "./data"
 
     sqlite_path: str = "./data/meta.db"
+    sqlite_busy_timeout_ms: int = 5000  # Wait this long for a write lock before failing
+    sqlite_synchronous: str = "NORMAL"  # NORMAL is durable across app crashes in WAL mode
+    sqlite_pool_size: int = 10
+    sqlite_max_overflow: int = 20
 
     redis_url: str = "redis://localhost:6379/0"
 
+    # Prometheus metrics, aggregated across processes in Redis and served at /metrics
+    metrics_enabled: bool = True
+    metrics_flush_interval_s: float = 5.0
+
+    # On-demand profiles (cProfile / stack samples + tracemalloc peak) under data_dir/profiles
+    profiling_token: str | None = None  # Requests sending X-Profile-Token: <token> are profiled
+    profiling_sample_rate: float = 0.0  # Fraction of HTTP requests profiled without the header
+    profiling_ingest_sample_rate: float = 0.0  # Fraction of ingest stage jobs profiled
+    profiling_interval_ms: float = 5.0  # Stack sampling interval for HTTP requests
+    profiling_max_files: int = 200  # Oldest profiles are deleted beyond this many
+
     qdrant_url: str = "http://localhost:6333"
     qdrant_api_key: Optional[str] = None
 
@@ -26,20 +43,118 @@ class Settings(BaseSettings):
     # Embedding performance settings
     embedding_batch_size: int = 512
     embedding_max_retries: int = 5
+    # Keep a local copy of every document's embeddings (chunks/<id>.vectors.npy)
+    vector_artifacts_enabled: bool = True
+    vector_artifact_dtype: str = "float16"  # float16 or float32
+    reindex_concurrency: int = 4
+
+    # Hot/cold vector collections: idle collections move to disk, then get unloaded and
+    # rebuilt from their vector artifacts on first use
+    tiering_enabled: bool = False
+    tier_hot_max_collections: int = 500  # Most recently used collections kept in RAM; 0 = no cap
+    tier_demote_after_s: float = 7 * 24 * 3600  # Idle time before moving to disk; 0 = never
+    tier_unload_after_s: float = 90 * 24 * 3600  # Idle time before unloading; 0 = never
+    tier_sweep_interval_s: float = 600
+
+    # Ingest fan-out
+    ingest_fanout: bool = True  # Split large documents into RQ stage jobs
+    ingest_shard_pages: int = 200  # Pages per chunk/embed shard job
+    ingest_max_retries: int = 3  # RQ retries per stage job
+    # Push ingest progress over Redis pub/sub (GET /v1/documents/{id}/events)
+    ingest_events_enabled: bool = True
+    ingest_events_ttl_s: int = 24 * 3600  # How long the latest event of a document is kept
+    events_max_wait_s: float = 600  # Longest an event stream or long-poll stays open
+
+    # Uploads identical (sha256) to a ready document:
+    # off = ingest again, existing = return the existing docId, alias = new docId sharing
+    # the existing blob, artifacts and vectors
+    dedupe_policy: Literal["off", "existing", "alias"] = "alias"
+
+    # Bulk ingest (POST /v1/documents/bulk)
+    bulk_max_documents: int = 1000
+    bulk_max_archive_mb: int = 2048  # Uncompressed size limit for zip uploads
+
+    # Size-class ingest queues: ingest-small / ingest-medium / ingest-large
+    ingest_small_max_mb: float = 5
+    ingest_small_max_pages: int = 20
+    ingest_medium_max_mb: float = 50
+    ingest_medium_max_pages: int = 300
+    ingest_queue_weights: str = "small:6,medium:3,large:1"  # Dequeue share per class
+    ingest_class_max_concurrency: str = "large:2"  # Cluster-wide running-job caps per class
+
+    # Warm worker pool (python -m app.workers.worker)
+    worker_queues: str = "ingest-small,ingest-medium,ingest-large,ingest"  # Comma-separated
+    worker_concurrency: int = 2  # Worker processes per host
+    worker_max_jobs: int = 500  # Recycle a worker after this many jobs (0 = never)
+    worker_max_memory_mb: int = 1024  # Recycle a worker above this RSS (0 = never)
 
     enable_ocr: bool = False
     enable_rerank: bool = False
+    rerank_mode: Literal["listwise", "concurrent", "pointwise"] = "listwise"
+    rerank_concurrency: int = 8  # Parallel calls in concurrent mode
+    rerank_timeout_s: float = 3.0  # Per-request rerank budget
+    rerank_cascade: bool = False  # Prune with a local lexical scorer before the LLM
+    rerank_cascade_top_m: int = 4  # Candidates passed from the lexical stage to the LLM
     enable_bm25: bool = False  # Enable BM25 hybrid scoring
     vector_weight: float = 0.7  # Weight for vector similarity scores
     bm25_weight: float = 0.3   # Weight for BM25 scores
     max_context_tokens: int = 2000
+    enable_context_compression: bool = False  # Keep only question-relevant sentences
+    compression_max_tokens: int = 600
+    compression_use_embeddings: bool = True  # Embed sentences for semantic scoring
     top_k: int = 10
     top_k_final: int = 6
     sim_threshold_max: float = 0.25
     sim_threshold_avg: float = 0.20
+    # cl100k_base BPE file for air-gapped hosts; otherwise app/assets or the cache below
+    tokenizer_file: str | None = None
+    tokenizer_cache_dir: str = "./data/tiktoken"
     chunk_target_tokens: int = 800
     chunk_overlap_tokens: int = 100
 
+    # Batch answering
+    batch_answer_concurrency: int = 8  # Concurrent chat completions per batch request
+    batch_answer_max_questions: int = 500
+
+    # Coalesce concurrent /v1/answers query embeddings and vector searches into batches
+    query_batching_enabled: bool = True
+    query_batch_window_ms: float = 3.0  # Max wait for more queries, only while others are in flight
+    query_batch_max_size: int = 32
+
+    # Identical concurrent /v1/answers requests share one computation
+    singleflight_enabled: bool = True
+    singleflight_redis: bool = False  # Also coalesce across replicas (Redis lock + channel)
+    singleflight_wait_s: float = 30.0  # Followers compute it themselves after waiting this long
+    singleflight_result_ttl_s: float = 5.0  # Results kept for followers that subscribe late
+
+    # Per-request deadline for /v1/answers, and hedging of its embedding and chat calls
+    answer_timeout_s: float = 30.0  # Clients may ask for less with X-Timeout-Ms
+    hedging_enabled: bool = True
+    hedge_quantile: float = 0.95  # Duplicate a call once it runs longer than this quantile
+    hedge_min_samples: int = 20  # Observed calls of a kind before hedging it
+    hedge_budget_ratio: float = 0.1  # Hedge tokens earned per call
+    hedge_budget_burst: float = 10.0
+    hedge_pool_size: int = 64
+
+    # Provider rate limits shared by API replicas and workers (Redis token buckets); 0 = none
+    ratelimit_enabled: bool = False
+    chat_rpm_limit: int = 500
+    chat_tpm_limit: int = 200_000
+    embedding_rpm_limit: int = 3000
+    embedding_tpm_limit: int = 1_000_000
+    ratelimit_burst_s: float = 10.0  # Buckets hold this many seconds of quota
+    ratelimit_background_share: float = 0.8  # Rest of each bucket is kept for answers
+    ratelimit_max_wait_s: float = 120.0  # Background calls fail after waiting this long
+    ratelimit_completion_tokens: int = 500  # Assumed reply size when max_tokens is not set
+
+    # LLM call memoization (temperature=0 chat completions only)
+    llm_cache_enabled: bool = True
+    llm_cache_answers: bool = True  # Memoize generate_answer calls
+    llm_cache_rerank: bool = True  # Memoize LLMReranker calls
+    llm_cache_max_entries: int = 50_000
+    llm_cache_max_mb: int = 256
+    llm_cache_ttl_seconds: float | None = None
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -17,6 +17,11 @@ class IngestionError(Exception):
     pass
 
 
+class DeadlineExceededError(Exception):
+    """Raised when a request runs out of time before a stage could finish."""
+    pass
+
+
 def register_exception_handlers(app: FastAPI) -> None:
     @app.exception_handler(Exception)
     async def unhandled_exception_handler(request: Request, exc: Exception):
@@ -73,3 +78,13 @@ def register_exception_handlers(app: FastAPI) -> None:
             },
         )
 
+    @app.exception_handler(DeadlineExceededError)
+    async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError):
+        return JSONResponse(
+            status_code=504,
+            content={
+                "code": "deadline_exceeded",
+                "message": str(exc),
+                "details": "Retry later or send a larger X-Timeout-Ms",
+            },
+        )
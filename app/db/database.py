@@ -1,17 +1,56 @@
 from contextlib import contextmanager
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.pool import QueuePool
 from sqlmodel import SQLModel, Session, create_engine
 
 from app.core.config import settings
 
-engine = create_engine(f"sqlite:///{settings.sqlite_path}", echo=False)
+# The API's threadpool and every worker share one SQLite file. WAL lets readers run while a
+# writer commits, and the busy timeout makes writers queue for the lock instead of failing
+# with "database is locked". Pooled connections keep their pragmas and page cache.
+engine = create_engine(
+    f"sqlite:///{settings.sqlite_path}",
+    echo=False,
+    poolclass=QueuePool,
+    pool_size=settings.sqlite_pool_size,
+    max_overflow=settings.sqlite_max_overflow,
+    connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+)
+
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite(dbapi_conn, _record) -> None:
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.close()
 
 
 def init_db() -> None:
     SQLModel.metadata.create_all(engine)
+    _add_missing_columns()
+
+
+def _add_missing_columns() -> None:
+    """Add nullable columns introduced after a table was first created (SQLite ALTER)."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    col_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(
+                        text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}")
+                    )
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 
 @contextmanager
-def get_session() -> Session:
-    with Session(engine) as session:
+def get_session(expire_on_commit: bool = True) -> Session:
+    with Session(engine, expire_on_commit=expire_on_commit) as session:
         yield session
 
@@ -15,10 +15,17 @@ class Document(SQLModel, table=True):
     sha256: str
     status: str = Field(default="queued")
     error: Optional[str] = None
+    # Set when this document reuses the artifacts and vectors of an identical upload
+    source_id: UUID | None = Field(default=None, index=True)
+    # Set for documents created together through the bulk ingest endpoint
+    batch_id: UUID | None = Field(default=None, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     __table_args__ = (
         Index("ix_document_sha256_name", "sha256", "name"),
+        # Keyset pagination of the document list, with and without a status filter
+        Index("ix_document_status_created_at", "status", "created_at", "id"),
+        Index("ix_document_created_at", "created_at", "id"),
     )
 
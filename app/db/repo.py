@@ -1,7 +1,9 @@
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-from sqlmodel import select
+from sqlalchemy import and_, or_, update
+from sqlmodel import func, select
 
 from app.db.database import get_session
 from app.db.models import Document
@@ -16,6 +18,90 @@ def create_document(name: str, sha256: str, bytes: int) -> Document:
         return doc
 
 
+def create_documents(items: list[dict], batch_id: UUID | None = None) -> list[Document]:
+    """
+    Insert many documents in one transaction.
+
+    Items hold name, sha256 and bytes, and may set any other column (e.g. ``id``, ``pages``
+    or ``status``); status defaults to queued.
+    """
+    with get_session(expire_on_commit=False) as session:
+        docs = [Document(**{"status": "queued", **item}, batch_id=batch_id) for item in items]
+        session.add_all(docs)
+        session.commit()
+        return docs
+
+
+def batch_status_counts(batch_id: UUID) -> dict[str, int]:
+    with get_session() as session:
+        stmt = (
+            select(Document.status, func.count())
+            .where(Document.batch_id == batch_id)
+            .group_by(Document.status)
+        )
+        return {status: int(count) for status, count in session.exec(stmt)}
+
+
+def find_ready_by_sha256s(sha256s: list[str]) -> dict[str, Document]:
+    """Oldest ready document per hash, for the hashes that have one."""
+    if not sha256s:
+        return {}
+    with get_session() as session:
+        stmt = (
+            select(Document)
+            .where(Document.sha256.in_(set(sha256s)), Document.status == "ready")
+            .order_by(Document.created_at.desc())
+        )
+        # Descending order, so the oldest match per hash is written last
+        return {d.sha256: d for d in session.exec(stmt)}
+
+
+def find_ready_by_sha256(sha256: str) -> Document | None:
+    with get_session() as session:
+        stmt = (
+            select(Document)
+            .where(Document.sha256 == sha256, Document.status == "ready")
+            .order_by(Document.created_at.asc())
+            .limit(1)
+        )
+        return session.exec(stmt).first()
+
+
+def alias_fields(source: Document, name: str) -> dict:
+    """Columns of a ready document that shares ``source``'s artifacts and vectors."""
+    return {
+        "name": name,
+        "sha256": source.sha256,
+        "bytes": source.bytes,
+        "pages": source.pages,
+        "chunks": source.chunks,
+        "status": "ready",
+        "source_id": source.source_id or source.id,
+    }
+
+
+def create_alias(source: Document, name: str, batch_id: UUID | None = None) -> Document:
+    """Create a ready document that shares ``source``'s artifacts and vectors."""
+    with get_session() as session:
+        doc = Document(**alias_fields(source, name), batch_id=batch_id)
+        session.add(doc)
+        session.commit()
+        session.refresh(doc)
+        return doc
+
+
+def count_aliases(source_id: UUID) -> int:
+    with get_session() as session:
+        stmt = select(func.count()).select_from(Document).where(Document.source_id == source_id)
+        return int(session.exec(stmt).one())
+
+
+def list_alias_ids(source_id: UUID) -> list[UUID]:
+    with get_session() as session:
+        stmt = select(Document.id).where(Document.source_id == source_id)
+        return list(session.exec(stmt))
+
+
 def update_status(
     doc_id: UUID,
     status: str,
@@ -23,20 +109,20 @@ def update_status(
     chunks: Optional[int] = None,
     error: Optional[str] = None,
 ) -> Document:
-    with get_session() as session:
-        doc = session.get(Document, doc_id)
+    """Update status (and any given counters) in a single UPDATE ... RETURNING statement."""
+    values: dict = {"status": status, "updated_at": datetime.utcnow()}
+    if pages is not None:
+        values["pages"] = pages
+    if chunks is not None:
+        values["chunks"] = chunks
+    if error is not None:
+        values["error"] = error
+    with get_session(expire_on_commit=False) as session:
+        stmt = update(Document).where(Document.id == doc_id).values(**values).returning(Document)
+        doc = session.execute(stmt).scalar_one_or_none()
         if doc is None:
             raise ValueError("Document not found")
-        doc.status = status  # type: ignore
-        if pages is not None:
-            doc.pages = pages
-        if chunks is not None:
-            doc.chunks = chunks
-        if error is not None:
-            doc.error = error
-        session.add(doc)
         session.commit()
-        session.refresh(doc)
         return doc
 
 
@@ -45,12 +131,35 @@ def get_document(doc_id: UUID) -> Optional[Document]:
         return session.get(Document, doc_id)
 
 
-def list_documents(limit: int = 50, status: Optional[str] = None) -> list[Document]:
+def list_documents(
+    limit: int = 50,
+    status: str | None = None,
+    after: tuple[datetime, UUID] | None = None,
+) -> list[Document]:
+    """
+    Newest documents first. Pass the ``(created_at, id)`` of the last row of a page as
+    ``after`` to get the next page; the seek uses the ``(status, created_at)`` or
+    ``created_at`` index, so deep pages cost the same as the first one.
+    """
     with get_session() as session:
         stmt = select(Document)
         if status:
             stmt = stmt.where(Document.status == status)
-        stmt = stmt.order_by(Document.created_at.desc()).limit(limit)
+        if after is not None:
+            created_at, last_id = after
+            stmt = stmt.where(
+                or_(
+                    Document.created_at < created_at,
+                    and_(Document.created_at == created_at, Document.id < last_id),
+                )
+            )
+        stmt = stmt.order_by(Document.created_at.desc(), Document.id.desc()).limit(limit)
+        return list(session.exec(stmt))
+
+
+def list_ready_documents() -> list[Document]:
+    with get_session() as session:
+        stmt = select(Document).where(Document.status == "ready").order_by(Document.created_at)
         return list(session.exec(stmt))
 
 
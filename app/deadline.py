@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.core.errors import DeadlineExceededError
+
+TIMEOUT_HEADER = "x-timeout-ms"
+
+# Absolute time.monotonic() by which the current request must be done. It is a context
+# variable, so it follows the request into the endpoint's threadpool thread; work handed
+# to other threads must copy the context (see app.services.llm.hedge).
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def scope(seconds: float | None) -> Iterator[None]:
+    """Run the block with a deadline ``seconds`` from now (never later than an outer one)."""
+    if seconds is None or seconds <= 0:
+        yield
+        return
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(at, outer))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def until(at: float | None) -> Iterator[None]:
+    """Run the block with the absolute deadline ``at`` (see current()) in place of any other."""
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current() -> float | None:
+    """The time.monotonic() by which the current request must be done, or None."""
+    return _deadline.get()
+
+
+def remaining() -> float | None:
+    """Seconds left before the deadline, or None without one."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check(stage: str) -> None:
+    """Raise when there is no time left to start ``stage``."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError(f"Deadline exceeded before {stage}")
+
+
+def timeout(cap: float | None = None) -> float | None:
+    """Timeout for the next upstream call: the time left, at most ``cap``."""
+    left = remaining()
+    if left is None:
+        return cap
+    return max(0.0, left if cap is None else min(left, cap))
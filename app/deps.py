@@ -1,15 +1,22 @@
 from __future__ import annotations
 
+from collections.abc import Generator
+from functools import lru_cache
 from pathlib import Path
-from typing import Generator
-
-from redis import Redis
-from rq import Queue
+from typing import TYPE_CHECKING
+from uuid import UUID
 
 from app.core.config import settings
 from app.db.database import get_session
-from app.services.embeddings.openai_embedder import OpenAIEmbedder
-from app.services.vectorstore.qdrant_store import QdrantStore
+from app.services.reranker.base import Reranker
+
+if TYPE_CHECKING:
+    from redis import Redis
+    from rq import Queue
+
+    from app.services.embeddings.openai_embedder import OpenAIEmbedder
+    from app.services.vectorstore.qdrant_store import QdrantStore
+    from app.workers.events import EventHub
 
 
 # ---------- Filesystem paths ----------
@@ -20,6 +27,14 @@ def sanitize_namespace(doc_id: str) -> str:
     return f"doc_{doc_id.replace('-', '_')}"
 
 
+def namespace_doc_id(namespace: str) -> str | None:
+    """Inverse of ``sanitize_namespace``; None for namespaces that are not document IDs."""
+    try:
+        return str(UUID(namespace.removeprefix("doc_").replace("_", "-")))
+    except ValueError:
+        return None
+
+
 def _ensure_parent(path: Path) -> Path:
     path.parent.mkdir(parents=True, exist_ok=True)
     return path
@@ -37,10 +52,28 @@ def chunks_path(doc_id: str) -> str:
     return str(_ensure_parent(Path(settings.data_dir) / "chunks" / f"{doc_id}.chunks.json"))
 
 
+def vectors_path(doc_id: str) -> str:
+    return str(_ensure_parent(Path(settings.data_dir) / "chunks" / f"{doc_id}.vectors.npy"))
+
+
+def checkpoint_dir(doc_id: str) -> str:
+    path = Path(settings.data_dir) / "checkpoints" / doc_id
+    path.mkdir(parents=True, exist_ok=True)
+    return str(path)
+
+
 # ---------- Factories ----------
 
 
+# Clients are built once per process and reused (connection pools stay warm). Their
+# packages are imported here rather than at module level: openai and qdrant_client alone
+# take seconds to import, which every API process would otherwise pay at startup.
+
+
+@lru_cache(maxsize=1)
 def get_embedder() -> OpenAIEmbedder:
+    from app.services.embeddings.openai_embedder import OpenAIEmbedder
+
     return OpenAIEmbedder(
         api_key=settings.openai_api_key,
         base_url=settings.openai_base_url,
@@ -50,13 +83,84 @@ def get_embedder() -> OpenAIEmbedder:
     )
 
 
+@lru_cache(maxsize=1)
 def get_vectorstore() -> QdrantStore:
-    return QdrantStore(url=settings.qdrant_url, api_key=settings.qdrant_api_key)
+    from app.services.vectorstore.qdrant_store import QdrantStore
+
+    store = QdrantStore(url=settings.qdrant_url, api_key=settings.qdrant_api_key)
+    if not settings.tiering_enabled:
+        return store
+    from app.services.vectorstore.tiering import (
+        ArtifactRestorer,
+        TieredVectorStore,
+        TierManager,
+    )
+
+    restorer = ArtifactRestorer(store)
+    manager = TierManager(
+        store,
+        get_redis(),
+        restore=restorer.restore,
+        can_restore=restorer.can_restore,
+        hot_max=settings.tier_hot_max_collections,
+        demote_after_s=settings.tier_demote_after_s,
+        unload_after_s=settings.tier_unload_after_s,
+        sweep_interval_s=settings.tier_sweep_interval_s,
+    )
+    return TieredVectorStore(store, manager, resolve=canonical_namespace)  # type: ignore[return-value]
+
+
+def get_tier_manager():
+    """Hot/cold tier manager of the shared vector store, or None when tiering is off."""
+    return getattr(get_vectorstore(), "manager", None)
+
+
+@lru_cache(maxsize=10000)
+def canonical_namespace(namespace: str) -> str:
+    """
+    Collection a namespace reads from: the source document's for dedupe aliases.
+
+    Cached per process; whatever creates or deletes documents calls ``cache_clear()``.
+    """
+    from app.db import repo
+
+    doc_id = namespace_doc_id(namespace)
+    doc = repo.get_document(UUID(doc_id)) if doc_id else None
+    if doc is not None and doc.source_id is not None:
+        return sanitize_namespace(str(doc.source_id))
+    return namespace
+
+
+def get_reranker() -> Reranker:
+    from app.services.reranker.llm_score import LLMReranker
+
+    if settings.rerank_cascade:
+        from app.services.reranker.cascade import CascadeReranker, LexicalScorer
+
+        return CascadeReranker(
+            first=LexicalScorer(), second=LLMReranker(), top_m=settings.rerank_cascade_top_m
+        )
+    return LLMReranker()
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> Redis:
+    from redis import Redis
+
+    return Redis.from_url(settings.redis_url)
+
+
+@lru_cache(maxsize=1)
+def get_event_hub() -> EventHub:
+    from app.workers.events import EventHub
+
+    return EventHub(settings.redis_url)
+
 
+def get_redis_queue(name: str = "ingest") -> Queue:
+    from rq import Queue
 
-def get_redis_queue() -> Queue:
-    redis = Redis.from_url(settings.redis_url)
-    return Queue("ingest", connection=redis)
+    return Queue(name, connection=get_redis())
 
 
 def get_db_session() -> Generator:
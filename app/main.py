@@ -1,10 +1,15 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.routes.admin import router as admin_router
+from app.api.routes.health import router as health_router
 from app.core.config import settings
 from app.core.errors import register_exception_handlers
 from app.telemetry import install_telemetry
-from app.api.routes.health import router as health_router
 
 try:
     from app.api.routes.documents import router as documents_router
@@ -14,8 +19,17 @@ except Exception:  # pragma: no cover - during early boot if deps missing
     answers_router = None
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if settings.warmup_enabled:
+        from app.warmup import warm_up
+
+        await asyncio.to_thread(warm_up)
+    yield
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="ContextForge API", version="0.1.0")
+    app = FastAPI(title="ContextForge API", version="0.1.0", lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -29,6 +43,7 @@ def create_app() -> FastAPI:
     register_exception_handlers(app)
 
     app.include_router(health_router)
+    app.include_router(admin_router)
     if documents_router is not None:
         app.include_router(documents_router)
     if answers_router is not None:
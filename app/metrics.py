@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Metrics are aggregated in each process and periodically added into one Redis hash, so
+# the API processes and every ingest worker report through a single /metrics endpoint.
+# Hash fields are Prometheus sample names (``name{label="v"}``) and values are totals.
+_REDIS_KEY = "contextforge:metrics"
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+BUCKETS_SIZE = (1, 2, 4, 8, 16, 32, 64, 128)
+
+STAGE_DURATION = "contextforge_stage_duration_ms"
+HTTP_DURATION = "contextforge_http_request_duration_ms"
+LLM_TOKENS = "contextforge_llm_tokens_total"
+LLM_CACHE = "contextforge_llm_cache_requests_total"
+RETRIES = "contextforge_retries_total"
+QUERY_BATCH_SIZE = "contextforge_query_batch_size"
+SINGLEFLIGHT = "contextforge_singleflight_requests_total"
+HEDGES = "contextforge_hedged_requests_total"
+RATELIMIT_WAIT = "contextforge_ratelimit_wait_ms"
+
+_HELP = {
+    STAGE_DURATION: ("histogram", "Duration of query and ingest pipeline stages in ms"),
+    HTTP_DURATION: ("histogram", "HTTP request duration in ms"),
+    LLM_TOKENS: ("counter", "Chat and embedding tokens by model and kind"),
+    LLM_CACHE: ("counter", "LLM response cache lookups by result"),
+    RETRIES: ("counter", "Retried operations by component"),
+    QUERY_BATCH_SIZE: ("histogram", "Queries per coalesced embedding call or vector search"),
+    SINGLEFLIGHT: ("counter", "Coalesced requests by role (leader computed, local/remote shared)"),
+    HEDGES: ("counter", "Hedged upstream calls by result (sent, won, denied by the budget)"),
+    RATELIMIT_WAIT: ("histogram", "Time spent waiting for shared provider rate limit quota"),
+}
+
+# Stage timings of the current HTTP request, rendered into its Server-Timing header
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+def _series(name: str, labels: dict[str, str], le: str | None = None) -> str:
+    pairs = [f'{k}="{v}"' for k, v in sorted(labels.items())]
+    if le is not None:
+        pairs.append(f'le="{le}"')  # always last, so buckets of a series sort together
+    return f"{name}{{{','.join(pairs)}}}" if pairs else name
+
+
+class MetricsRegistry:
+    """Process-local counters and histograms, flushed into Redis as deltas."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict[str, float] = {}
+        self._flusher_pid: int | None = None
+        self._failing = False  # the last flush failed; repeats are logged at debug level
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        if not settings.metrics_enabled:
+            return
+        self._add({_series(name, labels): value})
+
+    def observe(
+        self, name: str, ms: float, buckets: tuple[float, ...] = BUCKETS_MS, **labels: str
+    ) -> None:
+        if not settings.metrics_enabled:
+            return
+        samples = {
+            _series(f"{name}_sum", labels): ms,
+            _series(f"{name}_count", labels): 1.0,
+            _series(f"{name}_bucket", labels, le="+Inf"): 1.0,
+        }
+        for bound in buckets:
+            if ms <= bound:
+                samples[_series(f"{name}_bucket", labels, le=str(bound))] = 1.0
+        self._add(samples)
+
+    def _add(self, samples: dict[str, float]) -> None:
+        with self._lock:
+            for key, value in samples.items():
+                self._pending[key] = self._pending.get(key, 0.0) + value
+        self._ensure_flusher()
+
+    def _ensure_flusher(self) -> None:
+        # Threads don't survive fork, so every (forked) worker process starts its own
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(settings.metrics_flush_interval_s)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            from app.deps import get_redis
+
+            pipe = get_redis().pipeline(transaction=False)
+            for key, value in pending.items():
+                pipe.hincrbyfloat(_REDIS_KEY, key, value)
+            pipe.execute()
+        except Exception as e:
+            level = logging.DEBUG if self._failing else logging.WARNING
+            self._failing = True
+            logger.log(level, f"Metrics flush failed, keeping {len(pending)} samples: {e}")
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] = self._pending.get(key, 0.0) + value
+            return
+        self._failing = False
+
+    def snapshot(self) -> dict[str, float]:
+        """Totals across all processes (plus this process' unflushed samples)."""
+        self.flush()
+        with self._lock:
+            totals = dict(self._pending)
+        try:
+            from app.deps import get_redis
+
+            for key, value in get_redis().hgetall(_REDIS_KEY).items():
+                totals[key.decode()] = totals.get(key.decode(), 0.0) + float(value)
+        except Exception as e:
+            logger.warning(f"Could not read shared metrics: {e}")
+        return totals
+
+
+registry = MetricsRegistry()
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    registry.inc(name, value, **labels)
+
+
+@contextmanager
+def stage(pipeline: str, name: str) -> Iterator[None]:
+    """Time a pipeline stage into the stage histogram and the request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        registry.observe(STAGE_DURATION, ms, pipeline=pipeline, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + ms
+
+
+def start_request() -> dict[str, float]:
+    timings: dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing(timings: dict[str, float], total_ms: float) -> str:
+    parts = [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+def render(totals: dict[str, float]) -> str:
+    """Prometheus text exposition of ``totals``, grouped by metric family."""
+    families: dict[str, list[tuple[str, float]]] = {}
+    for key, value in totals.items():
+        series = key.split("{", 1)[0]
+        family = next(
+            (
+                name
+                for name in _HELP
+                if series == name or series in (f"{name}_sum", f"{name}_count", f"{name}_bucket")
+            ),
+            series,
+        )
+        families.setdefault(family, []).append((key, value))
+
+    lines: list[str] = []
+    for family in sorted(families):
+        kind, help_text = _HELP.get(family, ("untyped", family))
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        for key, value in sorted(families[family], key=lambda kv: _sort_key(kv[0])):
+            lines.append(f"{key} {float(value)!r}")
+    return "\n".join(lines) + "\n"
+
+
+def _sort_key(series: str) -> tuple:
+    # Buckets of one series in ascending ``le`` order; ``le`` is always the last label
+    if 'le="' not in series:
+        return (series, 0.0)
+    head, le = series.rsplit('le="', 1)
+    if head[-1] not in "{,":  # another label ending in "le", e.g. role
+        return (series, 0.0)
+    bound = le.split('"', 1)[0]
+    return (head, float("inf") if bound == "+Inf" else float(bound))
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile-token"
+
+# tracemalloc is process-wide, so only one profile runs at a time; others are skipped
+_active = threading.Lock()
+_SAFE_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+_EXTENSIONS = (".json", ".prof", ".folded")
+
+
+def profiles_dir() -> Path:
+    path = Path(settings.data_dir) / "profiles"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def authorised(token: str | None) -> bool:
+    """Whether ``token`` is the configured profiling token (never when none is configured)."""
+    expected = settings.profiling_token
+    return bool(token and expected) and hmac.compare_digest(token, expected)
+
+
+def requested(token: str | None, sample_rate: float) -> bool:
+    """Profile when the caller presents the configured token, or by sampling."""
+    if authorised(token):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+class StackSampler:
+    """
+    Samples the stacks of the tracked threads every ``interval_s`` seconds.
+
+    Request handlers run on a threadpool, which deterministic profilers attached to the
+    event loop thread don't see. Only threads inside ``track()`` (the ones running the
+    profiled request's handler) are sampled, so concurrent requests stay out of the profile.
+    Stacks are kept in collapsed form (``a;b;c count``), which flamegraph.pl and speedscope
+    read directly.
+    """
+
+    def __init__(self, interval_s: float) -> None:
+        self.interval_s = interval_s
+        self.stacks: Counter[str] = Counter()
+        self._threads: Counter[int] = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Sample the calling thread until the block exits."""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[ident] -= 1
+                if not self._threads[ident]:
+                    del self._threads[ident]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            with self._lock:
+                tracked = set(self._threads)
+            for ident, frame in sys._current_frames().items():
+                if ident not in tracked:
+                    continue
+                names, ours = [], False
+                while frame is not None:
+                    code = frame.f_code
+                    ours = ours or f"{os.sep}app{os.sep}" in code.co_filename
+                    where = f"{Path(code.co_filename).name}:{code.co_firstlineno}"
+                    names.append(f"{code.co_name} ({where})")
+                    frame = frame.f_back
+                # An async handler's event loop thread may be idle in select(); skip those
+                if ours:
+                    self.stacks[";".join(reversed(names))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def top(self, n: int = 25) -> list[dict]:
+        leaves: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = max(1, sum(leaves.values()))
+        return [
+            {"frame": frame, "samples": c, "share": round(c / total, 3)}
+            for frame, c in leaves.most_common(n)
+        ]
+
+
+# Stack sampler of the request being profiled; copied into the threadpool with the context
+_sampler: ContextVar[StackSampler | None] = ContextVar("profiling_sampler", default=None)
+
+
+def on_request_thread(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a route endpoint so a profiled request samples the thread the endpoint runs on."""
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            sampler = _sampler.get()
+            if sampler is None:
+                return await endpoint(*args, **kwargs)
+            with sampler.track():
+                return await endpoint(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        sampler = _sampler.get()
+        if sampler is None:
+            return endpoint(*args, **kwargs)
+        with sampler.track():
+            return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def profile(kind: str, label: str, sampling: bool) -> Iterator[dict]:
+    """
+    Profile the enclosed block and write the result under ``data_dir/profiles``.
+
+    ``sampling`` selects the stack sampler (HTTP requests; it samples the threads of
+    endpoints wrapped with ``on_request_thread``) instead of cProfile on the current thread
+    (ingest jobs). The yielded dict gets the profile ``id`` once the block finishes; it stays
+    empty when another profile is already running.
+    """
+    info: dict = {}
+    if not _active.acquire(blocking=False):
+        yield info
+        return
+    started_tracing = not tracemalloc.is_tracing()
+    try:
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = StackSampler(settings.profiling_interval_ms / 1000) if sampling else None
+        cprof = None if sampling else cProfile.Profile()
+        start = time.perf_counter()
+        token = _sampler.set(profiler)
+        if profiler is not None:
+            profiler.start()
+        else:
+            cprof.enable()
+        try:
+            yield info
+        finally:
+            _sampler.reset(token)
+            if profiler is not None:
+                profiler.stop()
+            else:
+                cprof.disable()
+            wall_ms = (time.perf_counter() - start) * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            info.update(_write(kind, label, wall_ms, peak, profiler, cprof))
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _active.release()
+
+
+def _write(kind, label, wall_ms, peak_bytes, sampler, cprof) -> dict:
+    stamp = time.strftime("%Y%m%dT%H%M%S") + f"{time.time() % 1:.3f}"[1:]
+    profile_id = f"{stamp}-{kind}-{_SAFE_RE.sub('_', label)[:80]}"
+    out = profiles_dir()
+    meta = {
+        "id": profile_id,
+        "kind": kind,
+        "label": label,
+        "createdAt": time.time(),
+        "wallMs": round(wall_ms, 2),
+        "peakMemoryKb": round(peak_bytes / 1024, 1),
+    }
+    if sampler is not None:
+        (out / f"{profile_id}.folded").write_text(sampler.folded(), encoding="utf-8")
+        meta["format"] = "folded"
+        meta["samples"] = sum(sampler.stacks.values())
+        meta["top"] = sampler.top()
+    else:
+        cprof.dump_stats(str(out / f"{profile_id}.prof"))
+        buf = io.StringIO()
+        pstats.Stats(cprof, stream=buf).sort_stats("cumulative").print_stats(25)
+        meta["format"] = "pstats"
+        meta["top"] = buf.getvalue()
+    (out / f"{profile_id}.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    _prune(out)
+    logger.info(f"Wrote profile {profile_id} ({wall_ms:.0f} ms, peak {meta['peakMemoryKb']} KB)")
+    return {"id": profile_id}
+
+
+def _prune(out: Path) -> None:
+    metas = sorted(out.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for meta in metas[: max(0, len(metas) - settings.profiling_max_files)]:
+        for ext in _EXTENSIONS:
+            (out / f"{meta.stem}{ext}").unlink(missing_ok=True)
+
+
+def list_profiles(limit: int = 50) -> list[dict]:
+    metas = sorted(profiles_dir().glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    result = []
+    for path in metas[:limit]:
+        meta = json.loads(path.read_text(encoding="utf-8"))
+        meta.pop("top", None)
+        result.append(meta)
+    return result
+
+
+def profile_files(profile_id: str) -> list[Path]:
+    """Files of one profile; empty for unknown or unsafe ids."""
+    if _SAFE_RE.search(profile_id) or profile_id.startswith("."):
+        return []
+    paths = [profiles_dir() / f"{profile_id}{ext}" for ext in _EXTENSIONS]
+    return [p for p in paths if p.is_file()]
+
+
+def enabled_for_job(meta: dict) -> bool:
+    return bool(meta.get("profile")) or requested(None, settings.profiling_ingest_sample_rate)
+
+
+def job_profile(kind: str, label: str) -> AbstractContextManager[dict]:
+    """Profile the current ingest stage when its RQ job asked for it (or is sampled)."""
+    from rq import get_current_job
+
+    job = get_current_job()
+    meta = job.meta if job is not None else {}
+    if enabled_for_job(meta):
+        return profile(kind, label, sampling=False)
+    return _noop()
+
+
+@contextmanager
+def _noop() -> Iterator[dict]:
+    yield {}
+
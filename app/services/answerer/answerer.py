@@ -1,12 +1,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional
-
-from openai import OpenAI
 
+from app import metrics
 from app.core.config import settings
-from app.services.reranker.llm_score import LLMReranker
+from app.services.llm.chat import OpenAI, chat_completion
 import re
 
 
@@ -133,15 +131,18 @@ def generate_answer(
         system_prompt += "\n\nIMPORTANT: In quote mode, you must include exact quotes from the context to support your answers. Use quotation marks and cite the page numbers."
     
     user = f"Question: {question}\n\nContext:\n{context}"
-    resp = client.chat.completions.create(
-        model=settings.chat_model,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user},
-        ],
-        temperature=0,
-    )
-    text = resp.choices[0].message.content or ""
+    with metrics.stage("query", "generate"):
+        text = chat_completion(
+            client,
+            model=settings.chat_model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user},
+            ],
+            use_cache=settings.llm_cache_answers,
+            purpose="answer",
+            temperature=0,
+        )
 
     # Citation enhancement: ensure citations for sentences without them
     text = _enhance_citations(text, top_chunks)
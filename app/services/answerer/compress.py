@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import re
+import time
+
+import numpy as np
+
+from app.services.embeddings.base import Embedder
+from app.services.tokenizer import get_encoding
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+_WORD_RE = re.compile(r"\b\w+\b")
+
+
+def _num_tokens(text: str) -> int:
+    enc = get_encoding()
+    return len(enc.encode(text))
+
+
+def _format_context(kept: list[dict]) -> str:
+    """Render kept sentences as ``[page X]`` blocks, one block per source chunk."""
+    blocks: list[str] = []
+    for chunk in kept:
+        blocks.append(f"[page {chunk['page']}]\n{chunk['text']}\n\n")
+    return "".join(blocks)
+
+
+def _split_sentences(chunks: list[dict]) -> list[tuple[int, str]]:
+    """Split chunks into ``(chunk index, sentence)`` pairs in document order."""
+    sentences: list[tuple[int, str]] = []
+    for ci, chunk in enumerate(chunks):
+        for s in _SENTENCE_SPLIT_RE.split(chunk.get("text", "")):
+            s = s.strip()
+            if s:
+                sentences.append((ci, s))
+    return sentences
+
+
+def _select(
+    sentences: list[tuple[int, str]], scores: np.ndarray, chunks: list[dict], max_tokens: int
+) -> set[int]:
+    """Indices of the best-scoring sentences that fit in ``max_tokens``."""
+    # Greedily take the best sentences that fit; the "[page X]\n" header is paid once per chunk
+    order = np.argsort(-scores, kind="stable")
+    selected: set[int] = set()
+    opened: set[int] = set()
+    used_tokens = 0
+    for idx in order:
+        ci, s = sentences[idx]
+        cost = _num_tokens(s) + 1
+        if ci not in opened:
+            cost += _num_tokens(f"[page {chunks[ci].get('page')}]\n\n\n")
+        if used_tokens + cost > max_tokens:
+            continue
+        selected.add(int(idx))
+        opened.add(ci)
+        used_tokens += cost
+    return selected
+
+
+def compress_context(
+    question: str,
+    chunks: list[dict],
+    max_tokens: int,
+    query_vector: list[float] | None = None,
+    embedder: Embedder | None = None,
+    semantic_weight: float = 0.7,
+) -> tuple[str, list[dict], dict]:
+    """
+    Extractive compression of packed context chunks.
+
+    Splits chunks into sentences, scores each against the question (cosine similarity to
+    ``query_vector`` when an embedder is given, plus question-term overlap), and keeps the
+    best sentences within ``max_tokens``. Kept sentences stay in document order and grouped
+    under their source chunk, so ``[page X]`` citations remain correct.
+
+    Args:
+        question: User question
+        chunks: Chunks from ``build_context`` (page, chunk_id, text)
+        max_tokens: Token budget for the compressed context
+        query_vector: Question embedding (from retrieval) for semantic scoring
+        embedder: Embedder used to embed sentences; lexical scoring only when None
+        semantic_weight: Weight of the semantic score vs lexical overlap
+
+    Returns:
+        Tuple of (context_text, compressed_chunks, stats)
+    """
+    start = time.perf_counter()
+    sentences = _split_sentences(chunks)
+    context = _format_context(chunks)
+    tokens_before = _num_tokens(context)
+    if not sentences or tokens_before <= max_tokens:
+        # Already within budget; skip the sentence embedding call
+        stats = {"tokensBefore": tokens_before, "tokensAfter": tokens_before, "skipped": True}
+        return context, chunks, stats
+
+    q_terms = set(_WORD_RE.findall(question.lower()))
+    lexical = np.array(
+        [
+            len(q_terms & set(_WORD_RE.findall(s.lower()))) / max(1, len(q_terms))
+            for _, s in sentences
+        ],
+        dtype=np.float32,
+    )
+    scores = lexical
+    if embedder is not None and query_vector is not None:
+        vecs = np.asarray(embedder.embed_texts([s for _, s in sentences]), dtype=np.float32)
+        q = np.asarray(query_vector, dtype=np.float32)
+        denom = np.linalg.norm(vecs, axis=1) * max(float(np.linalg.norm(q)), 1e-9)
+        semantic = vecs @ q / np.maximum(denom, 1e-9)
+        scores = semantic_weight * semantic + (1 - semantic_weight) * lexical
+
+    selected = _select(sentences, scores, chunks, max_tokens)
+    kept: list[dict] = []
+    for ci, chunk in enumerate(chunks):
+        texts = [s for i, (c, s) in enumerate(sentences) if c == ci and i in selected]
+        if texts:
+            kept.append({**chunk, "text": " ".join(texts)})
+
+    context = _format_context(kept)
+    stats = {
+        "tokensBefore": tokens_before,
+        "tokensAfter": _num_tokens(context),
+        "sentencesBefore": len(sentences),
+        "sentencesAfter": len(selected),
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+    return context, kept, stats
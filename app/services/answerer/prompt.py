@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import List, Tuple
 
-import tiktoken
+from app.services.tokenizer import get_encoding
 
 
 def build_system_prompt() -> str:
@@ -14,7 +14,7 @@ def build_system_prompt() -> str:
 
 
 def build_context(hits: list, max_tokens: int) -> tuple[str, list[dict]]:
-    enc = tiktoken.get_encoding("cl100k_base")
+    enc = get_encoding()
     header = []
     used: list[dict] = []
     total_tokens = 0
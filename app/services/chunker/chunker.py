@@ -5,10 +5,9 @@ import uuid
 from dataclasses import dataclass
 from typing import Literal
 
-import tiktoken
-
 from app.core.config import settings
 from app.services.parser.base import ParsedPage
+from app.services.tokenizer import get_encoding
 
 
 _SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
@@ -26,12 +25,12 @@ class Chunk:
 
 
 def _num_tokens(text: str) -> int:
-    enc = tiktoken.get_encoding("cl100k_base")
+    enc = get_encoding()
     return len(enc.encode(text))
 
 
 def _pack_sentences(sentences: list[str], target: int, overlap: int) -> list[str]:
-    enc = tiktoken.get_encoding("cl100k_base")
+    enc = get_encoding()
     chunks: list[str] = []
     current: list[str] = []
     current_tokens = 0
@@ -98,7 +97,7 @@ def _smart_chunk_text(text: str, target_tokens: int, overlap_tokens: int) -> lis
     Returns:
         List of text chunks
     """
-    enc = tiktoken.get_encoding("cl100k_base")
+    enc = get_encoding()
     
     # Split by paragraphs first
     paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
@@ -199,7 +198,7 @@ def chunk_pages(doc_id: str, pages: list[ParsedPage]) -> tuple[list[Chunk], dict
     stats = {
         "chunks": len(chunks),
         "type_breakdown": type_counts,
-        "avg_chunk_tokens": sum(len(tiktoken.get_encoding("cl100k_base").encode(c.text)) for c in chunks) / len(chunks) if chunks else 0
+        "avg_chunk_tokens": sum(len(get_encoding().encode(c.text)) for c in chunks) / len(chunks) if chunks else 0
     }
     
     return chunks, stats
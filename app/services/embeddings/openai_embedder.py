@@ -1,14 +1,29 @@
 from __future__ import annotations
 
+import random
 import time
 import logging
-from typing import List
 from openai import OpenAI
 from openai import RateLimitError, APIError, APIConnectionError
 
+from app import deadline, metrics
+from app.core.errors import DeadlineExceededError
+from app.services.llm import hedge, ratelimit
+from app.services.llm.ratelimit import RateLimitTimeoutError
+
 logger = logging.getLogger(__name__)
 
 
+def _backoff(seconds: float) -> None:
+    # Jittered so workers that hit a 429 together don't all retry at the same moment
+    pause = random.uniform(seconds / 2, seconds)
+    # Don't sleep through the request's deadline only to give up afterwards
+    left = deadline.remaining()
+    if left is not None and left < pause:
+        raise DeadlineExceededError("Deadline exceeded while backing off embedding retries")
+    time.sleep(pause)
+
+
 class OpenAIEmbedder:
     def __init__(self, api_key: str, base_url: str, model: str, 
                  batch_size: int = 512, max_retries: int = 5) -> None:
@@ -52,6 +67,8 @@ class OpenAIEmbedder:
     def _embed_with_retry(self, inputs: list[str]) -> list[list[float]]:
         """
         Embed with exponential backoff and specific error handling.
+
+        Within a request each attempt is bounded by its deadline and hedged when slow.
         
         Args:
             inputs: List of input texts
@@ -67,27 +84,34 @@ class OpenAIEmbedder:
         
         for attempt in range(self.max_retries):
             try:
-                resp = self._client.embeddings.create(model=self.model, input=inputs)
-                return [d.embedding for d in resp.data]
-                
-            except RateLimitError as e:
+                return self._embed_once(inputs, attempt)
+
+            except DeadlineExceededError:
+                raise
+
+            except (RateLimitError, RateLimitTimeoutError) as e:
+                # Ingest waits out a saturated limiter; a user waiting on an answer does not
+                if isinstance(e, RateLimitTimeoutError) and (
+                    ratelimit.current_priority() == ratelimit.INTERACTIVE
+                ):
+                    raise
                 last_exception = e
                 wait_time = delay * (2 ** attempt)  # Exponential backoff
                 logger.warning(f"Rate limit hit, waiting {wait_time}s (attempt {attempt + 1})")
-                time.sleep(wait_time)
+                _backoff(wait_time)
                 
             except APIConnectionError as e:
                 last_exception = e
                 wait_time = delay * (2 ** attempt)
                 logger.warning(f"API connection error, waiting {wait_time}s (attempt {attempt + 1})")
-                time.sleep(wait_time)
+                _backoff(wait_time)
                 
             except APIError as e:
                 if e.status_code >= 500:  # Server errors
                     last_exception = e
                     wait_time = delay * (2 ** attempt)
                     logger.warning(f"Server error {e.status_code}, waiting {wait_time}s (attempt {attempt + 1})")
-                    time.sleep(wait_time)
+                    _backoff(wait_time)
                 else:  # Client errors (4xx) - don't retry
                     logger.error(f"Client error {e.status_code}: {e.message}")
                     raise
@@ -97,11 +121,25 @@ class OpenAIEmbedder:
                 logger.error(f"Unexpected error during embedding: {e}")
                 if attempt == self.max_retries - 1:
                     raise
-                time.sleep(delay)
+                _backoff(delay)
                 delay *= 2
         
         # If we get here, all retries failed
         logger.error(f"All {self.max_retries} embedding attempts failed")
         raise last_exception or Exception("Embedding failed after all retries")
 
+    def _embed_once(self, inputs: list[str], attempt: int = 0) -> list[list[float]]:
+        if attempt:
+            metrics.inc(metrics.RETRIES, component="embedding")
+        resp = hedge.call("embedding", lambda timeout: self._create(inputs, timeout))
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            tokens = usage.prompt_tokens or 0
+            metrics.inc(metrics.LLM_TOKENS, tokens, model=self.model, kind="embedding")
+        return [d.embedding for d in resp.data]
 
+    def _create(self, inputs: list[str], timeout: float | None):
+        ratelimit.limiter.acquire("embedding", ratelimit.estimate_tokens(inputs))
+        if timeout is None:
+            return self._client.embeddings.create(model=self.model, input=inputs)
+        return self._client.embeddings.create(model=self.model, input=inputs, timeout=timeout)
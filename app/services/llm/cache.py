@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access);
+"""
+
+
+def make_key(model: str, messages: list[dict], params: dict[str, Any]) -> str:
+    """Stable hash of a chat completion request."""
+    raw = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent memoization of deterministic chat completions.
+
+    Entries live in a local SQLite file and are evicted least-recently-used first once the
+    entry or byte limit is exceeded. Entries older than ``ttl_seconds`` are treated as misses.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 50_000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency_ms, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl_seconds and now - row[2] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                metrics.inc(metrics.LLM_CACHE, result="miss")
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET hits = hits + 1, last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            self.saved_ms += row[1]
+            metrics.inc(metrics.LLM_CACHE, result="hit")
+            return row[0]
+
+    def put(self, key: str, response: str, latency_ms: float) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, response, size, latency_ms, hits, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (key, response, size, latency_ms, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Drop least recently used rows until both limits hold again
+        excess_rows = max(0, count - self.max_entries)
+        excess_bytes = max(0, total - self.max_bytes)
+        victims: list[str] = []
+        freed = 0
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY last_access ASC"
+        ):
+            if len(victims) >= excess_rows and freed >= excess_bytes:
+                break
+            victims.append(key)
+            freed += size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(k,) for k in victims])
+        logger.debug(f"Evicted {len(victims)} LLM cache entries ({freed} bytes)")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+            self.saved_ms = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total, lifetime_hits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "savedMs": round(self.saved_ms, 2),
+            "lifetimeHits": lifetime_hits,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_llm_cache() -> LLMCache:
+    return LLMCache(
+        path=str(Path(settings.data_dir) / "cache" / "llm_cache.db"),
+        max_entries=settings.llm_cache_max_entries,
+        max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+        ttl_seconds=settings.llm_cache_ttl_seconds,
+    )
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any
+
+from app import metrics
+from app.core.config import settings
+from app.services.llm import hedge, ratelimit
+from app.services.llm.cache import get_llm_cache, make_key
+
+if TYPE_CHECKING:
+    import openai
+
+
+def OpenAI(**kwargs: Any) -> openai.OpenAI:  # noqa: N802 - drop-in for the class
+    """Build an ``openai.OpenAI`` client, importing the (slow to import) package on first use."""
+    from openai import OpenAI as _OpenAI
+
+    return _OpenAI(**kwargs)
+
+
+def chat_completion(
+    client: openai.OpenAI,
+    model: str,
+    messages: list[dict],
+    use_cache: bool = True,
+    purpose: str = "chat",
+    timeout: float | None = None,
+    **params: Any,
+) -> str:
+    """
+    Run a chat completion and return the message text.
+
+    Deterministic requests (``temperature=0``) are memoized in the local LLM cache when
+    ``use_cache`` and ``settings.llm_cache_enabled`` are both set. Within a request the call
+    is bounded by its deadline and hedged when slower than usual for ``purpose``. Every
+    request to the provider first takes quota from the shared chat rate limit.
+
+    Args:
+        client: OpenAI client to call on a cache miss
+        model: Chat model name
+        messages: Chat messages
+        use_cache: Per call-site switch for memoization
+        purpose: Call site, keeps separate latency statistics for hedging
+        timeout: Upper bound in seconds for the call (the deadline may cut it shorter)
+        **params: Extra completion parameters (temperature, max_tokens, ...)
+
+    Returns:
+        The first choice's message content ("" if empty)
+    """
+    cacheable = use_cache and settings.llm_cache_enabled and params.get("temperature") == 0
+    key = make_key(model, messages, params) if cacheable else ""
+    if cacheable:
+        cached = get_llm_cache().get(key)
+        if cached is not None:
+            return cached
+
+    texts = [str(m.get("content") or "") for m in messages]
+    tokens = ratelimit.estimate_tokens(
+        texts, params.get("max_tokens") or settings.ratelimit_completion_tokens
+    )
+
+    def create(call_timeout: float | None) -> Any:
+        ratelimit.limiter.acquire("chat", tokens)
+        options = {} if call_timeout is None else {"timeout": call_timeout}
+        return client.chat.completions.create(model=model, messages=messages, **params, **options)
+
+    start = time.perf_counter()
+    resp = hedge.call(f"{purpose}:{model}", create, cap=timeout)
+    text = resp.choices[0].message.content or ""
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        metrics.inc(metrics.LLM_TOKENS, usage.prompt_tokens or 0, model=model, kind="prompt")
+        metrics.inc(
+            metrics.LLM_TOKENS, usage.completion_tokens or 0, model=model, kind="completion"
+        )
+    if cacheable:
+        get_llm_cache().put(key, text, latency_ms=(time.perf_counter() - start) * 1000)
+    return text
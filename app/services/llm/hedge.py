@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TypeVar
+
+from app import deadline, metrics
+from app.core.config import settings
+from app.core.errors import DeadlineExceededError
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Latencies of the most recent successful calls of one kind."""
+
+    def __init__(self, size: int = 500) -> None:
+        self._lock = threading.Lock()
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """The ``q`` latency quantile in seconds; None until ``hedge_min_samples`` calls."""
+        with self._lock:
+            if len(self._samples) < max(1, settings.hedge_min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeBudget:
+    """
+    Token bucket capping hedges to a share of calls.
+
+    Each call earns ``hedge_budget_ratio`` tokens, up to ``hedge_budget_burst``; each hedge
+    spends one. When upstream slows down across the board, hedging stops at that share
+    instead of doubling the load.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tokens: float | None = None
+
+    def earn(self) -> None:
+        with self._lock:
+            tokens = settings.hedge_budget_burst if self._tokens is None else self._tokens
+            self._tokens = min(settings.hedge_budget_burst, tokens + settings.hedge_budget_ratio)
+
+    def spend(self) -> bool:
+        with self._lock:
+            tokens = settings.hedge_budget_burst if self._tokens is None else self._tokens
+            if tokens < 1:
+                self._tokens = tokens
+                return False
+            self._tokens = tokens - 1
+            return True
+
+
+budget = HedgeBudget()
+_trackers: dict[str, LatencyTracker] = {}
+_lock = threading.Lock()
+_pool: ThreadPoolExecutor | None = None
+_in_pool = 0  # attempts queued or running on the pool
+
+
+def tracker(name: str) -> LatencyTracker:
+    with _lock:
+        return _trackers.setdefault(name, LatencyTracker())
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.hedge_pool_size, thread_name_prefix="hedge"
+            )
+        return _pool
+
+
+def call(name: str, fn: Callable[[float | None], T], cap: float | None = None) -> T:
+    """
+    Run ``fn(timeout)`` within the current request's deadline, hedging slow attempts.
+
+    ``timeout`` is the time left (at most ``cap``). Once an attempt runs longer than the
+    ``hedge_quantile`` latency of recent ``name`` calls, and the budget allows, a duplicate
+    attempt starts and the first to succeed wins; the other finishes in the background and
+    is dropped. Outside a request (no deadline, e.g. ingest) ``fn`` just runs.
+    """
+    if deadline.remaining() is None:
+        return fn(cap)
+    deadline.check(name)
+    latencies = tracker(name)
+    budget.earn()
+    delay = latencies.quantile(settings.hedge_quantile) if settings.hedging_enabled else None
+    timeout = deadline.timeout(cap)
+    # Attempts run on the pool so the caller can take whichever finishes first; with the
+    # pool (nearly) full a primary would queue behind others, so it runs here instead
+    if delay is None or delay >= timeout or _in_pool >= settings.hedge_pool_size - 1:
+        start = time.perf_counter()
+        result = fn(timeout)
+        latencies.record(time.perf_counter() - start)
+        return result
+
+    primary = _submit(fn, timeout, latencies)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+    if not budget.spend():
+        metrics.inc(metrics.HEDGES, call=name, result="denied")
+        return _first_success(name, [primary])
+    metrics.inc(metrics.HEDGES, call=name, result="sent")
+    hedge = _submit(fn, deadline.timeout(cap), latencies)
+    return _first_success(name, [primary, hedge])
+
+
+def _submit(
+    fn: Callable[[float | None], T], timeout: float | None, latencies: LatencyTracker
+) -> Future:
+    global _in_pool
+
+    def run() -> T:
+        global _in_pool
+        try:
+            start = time.perf_counter()
+            result = fn(timeout)
+            latencies.record(time.perf_counter() - start)
+            return result
+        finally:
+            with _lock:
+                _in_pool -= 1
+
+    with _lock:
+        _in_pool += 1
+    # Each attempt runs in a copy of the caller's context (deadline, request timings)
+    return _executor().submit(contextvars.copy_context().run, run)
+
+
+def _first_success(name: str, attempts: list[Future]) -> T:
+    pending = set(attempts)
+    error: BaseException | None = None
+    while pending:
+        done, pending = wait(pending, timeout=deadline.timeout(), return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceededError(f"Deadline exceeded waiting for {name}")
+        for fut in done:
+            if fut.exception() is None:
+                if fut is not attempts[0]:
+                    metrics.inc(metrics.HEDGES, call=name, result="won")
+                return fut.result()
+            error = fut.exception()
+    raise error
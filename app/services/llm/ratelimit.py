@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import logging
+import random
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app import deadline, metrics
+from app.core.config import settings
+from app.core.errors import DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"  # a user is waiting on the answer
+BACKGROUND = "background"  # ingest and everything else
+
+# Provider limits are shared by every API replica and ingest worker, so the buckets live in
+# Redis. Each group (chat, embedding) has a request bucket and a token bucket; a call takes
+# from both at once or waits.
+_BUCKET_KEY = "contextforge:ratelimit:{group}:{kind}"
+
+# KEYS: bucket hashes. ARGV per key: refill per ms, capacity, cost, floor.
+# A call may take ``cost`` when the level stays at or above ``floor`` (the share kept back
+# for interactive calls) or, for costs larger than the bucket, when it is full; the level
+# may then go negative and later calls wait until it refills. Returns the ms to wait.
+_ACQUIRE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local levels = {}
+local wait = 0
+for i = 1, #KEYS do
+    local base = (i - 1) * 4
+    local rate = tonumber(ARGV[base + 1])
+    local cap = tonumber(ARGV[base + 2])
+    local cost = tonumber(ARGV[base + 3])
+    local floor = tonumber(ARGV[base + 4])
+    local state = redis.call('HMGET', KEYS[i], 'level', 'ts')
+    local level = tonumber(state[1]) or cap
+    local ts = tonumber(state[2]) or now
+    level = math.min(cap, level + math.max(0, now - ts) * rate)
+    levels[i] = level
+    local need = math.min(cost, cap - floor) + floor - level
+    if need > 0 then
+        wait = math.max(wait, math.ceil(need / rate))
+    end
+end
+if wait > 0 then
+    return wait
+end
+for i = 1, #KEYS do
+    local base = (i - 1) * 4
+    local rate = tonumber(ARGV[base + 1])
+    local cap = tonumber(ARGV[base + 2])
+    redis.call('HSET', KEYS[i], 'level', levels[i] - tonumber(ARGV[base + 3]), 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil(cap / rate) + 1000)
+end
+return 0
+"""
+
+_priority: ContextVar[str] = ContextVar("ratelimit_priority", default=BACKGROUND)
+
+
+class RateLimitTimeoutError(Exception):
+    """Raised when a call without a deadline waited ``ratelimit_max_wait_s`` for quota."""
+
+
+@contextmanager
+def priority(level: str) -> Iterator[None]:
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def estimate_tokens(texts: list[str], completion_tokens: int = 0) -> int:
+    # Roughly 4 characters per token, which is also how providers count before tokenizing
+    return sum(len(t) for t in texts) // 4 + 1 + completion_tokens
+
+
+def _limits(group: str) -> tuple[int, int]:
+    if group == "embedding":
+        return settings.embedding_rpm_limit, settings.embedding_tpm_limit
+    return settings.chat_rpm_limit, settings.chat_tpm_limit
+
+
+class RateLimiter:
+    """
+    Client side of the shared token buckets.
+
+    Buckets refill at the configured per-minute limits and hold ``ratelimit_burst_s``
+    seconds' worth. Background calls leave ``1 - ratelimit_background_share`` of each bucket
+    to interactive ones, so answers get through while ingest saturates the limits. Waits are
+    jittered so callers don't retry in lockstep. Interactive callers wait until their
+    deadline, background callers up to ``ratelimit_max_wait_s``. If Redis is unreachable,
+    calls go through unthrottled.
+    """
+
+    def __init__(self) -> None:
+        self._script = None
+
+    def _acquire_script(self):
+        if self._script is None:
+            from app.deps import get_redis
+
+            self._script = get_redis().register_script(_ACQUIRE)
+        return self._script
+
+    def acquire(self, group: str, tokens: int) -> float:
+        """Take one request and ``tokens`` tokens of ``group``; returns the seconds waited."""
+        if not settings.ratelimit_enabled:
+            return 0.0
+        level = _priority.get()
+        share = 1.0 if level == INTERACTIVE else settings.ratelimit_background_share
+        keys: list[str] = []
+        args: list[float] = []
+        limits = zip(("requests", "tokens"), _limits(group), (1, tokens), strict=True)
+        for kind, per_minute, cost in limits:
+            if per_minute <= 0:
+                continue
+            capacity = max(1.0, per_minute * settings.ratelimit_burst_s / 60)
+            keys.append(_BUCKET_KEY.format(group=group, kind=kind))
+            args += [per_minute / 60_000, capacity, cost, capacity * (1 - share)]
+        if not keys:
+            return 0.0
+
+        start = time.monotonic()
+        # An interactive caller waits as long as its deadline allows; without one (or in the
+        # background) it gives up after ratelimit_max_wait_s
+        bounded = level == INTERACTIVE and deadline.remaining() is not None
+        give_up = None if bounded else start + settings.ratelimit_max_wait_s
+        while True:
+            try:
+                wait_ms = int(self._acquire_script()(keys=keys, args=args))
+            except Exception as e:
+                logger.warning(f"Rate limiter unavailable, not throttling {group}: {e}")
+                return 0.0
+            waited = time.monotonic() - start
+            if wait_ms <= 0:
+                metrics.registry.observe(
+                    metrics.RATELIMIT_WAIT, waited * 1000, group=group, priority=level
+                )
+                return waited
+            pause = wait_ms / 1000 * random.uniform(1.0, 1.5)
+            left = deadline.remaining()
+            if left is not None and left < pause:
+                raise DeadlineExceededError(f"Deadline exceeded waiting for {group} rate limit")
+            if give_up is not None and time.monotonic() + pause > give_up:
+                raise RateLimitTimeoutError(
+                    f"No {group} quota after waiting {waited:.1f}s (rate limit)"
+                )
+            time.sleep(pause)
+
+
+limiter = RateLimiter()
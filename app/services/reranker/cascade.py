@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import re
+import time
+
+import numpy as np
+
+from app import metrics
+from app.services.reranker.base import Reranker
+from app.services.reranker.llm_score import UNSCORED
+
+_TOKEN_RE = re.compile(r"\b\w+\b")
+
+_STOPWORDS = frozenset(
+    {
+        "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "how", "in",
+        "is", "it", "of", "on", "or", "the", "this", "that", "to", "was", "were", "what", "when",
+        "where", "which", "who", "why", "with",
+    }
+)
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class LexicalScorer:
+    """
+    Cheap in-process relevance scorer.
+
+    Combines query-term coverage, BM25 (with the candidate set as the corpus) and term
+    proximity into one score in 0..1. Features are computed over a candidates x query-terms
+    term-frequency matrix with NumPy.
+    """
+
+    def __init__(
+        self,
+        overlap_weight: float = 0.4,
+        bm25_weight: float = 0.4,
+        proximity_weight: float = 0.2,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> None:
+        self.overlap_weight = overlap_weight
+        self.bm25_weight = bm25_weight
+        self.proximity_weight = proximity_weight
+        self.k1 = k1
+        self.b = b
+
+    def score(self, question: str, snippets: list[str]) -> list[float]:
+        if not snippets:
+            return []
+        terms = [t for t in dict.fromkeys(_tokenize(question)) if t not in _STOPWORDS]
+        if not terms:
+            return [0.0] * len(snippets)
+        term_index = {t: i for i, t in enumerate(terms)}
+
+        n_docs, n_terms = len(snippets), len(terms)
+        tf = np.zeros((n_docs, n_terms), dtype=np.float32)
+        doc_len = np.zeros(n_docs, dtype=np.float32)
+        proximity = np.zeros(n_docs, dtype=np.float32)
+        for d, snippet in enumerate(snippets):
+            tokens = _tokenize(snippet)
+            doc_len[d] = len(tokens)
+            hits = np.fromiter(
+                (term_index.get(t, -1) for t in tokens), dtype=np.int32, count=len(tokens)
+            )
+            positions = np.flatnonzero(hits >= 0)
+            if positions.size == 0:
+                continue
+            ids = hits[positions]
+            tf[d] = np.bincount(ids, minlength=n_terms)
+            # Smallest gap between two different query terms; adjacent terms score 1.0
+            gaps = np.diff(positions)[ids[1:] != ids[:-1]]
+            if gaps.size:
+                proximity[d] = 1.0 / gaps.min()
+
+        overlap = (tf > 0).sum(axis=1) / n_terms
+
+        df = (tf > 0).sum(axis=0)
+        idf = np.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+        avg_len = max(float(doc_len.mean()), 1.0)
+        norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+        bm25 = ((tf * (self.k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+        if bm25.max() > 0:
+            bm25 = bm25 / bm25.max()
+
+        scores = (
+            self.overlap_weight * overlap
+            + self.bm25_weight * bm25
+            + self.proximity_weight * proximity
+        )
+        return [float(s) for s in scores]
+
+
+class CascadeReranker:
+    """
+    Two-stage reranker: a cheap scorer prunes candidates to ``top_m`` and only those are
+    scored by the expensive second stage (usually the LLM reranker).
+
+    Returned scores order survivors by second-stage score ahead of pruned candidates, which
+    keep their first-stage order. Survivors the second stage could not score fall back to
+    first-stage order among themselves.
+    """
+
+    def __init__(self, first: Reranker, second: Reranker, top_m: int) -> None:
+        self.first = first
+        self.second = second
+        self.top_m = top_m
+        self.last_stats: dict = {}
+
+    def score(self, question: str, snippets: list[str]) -> list[float]:
+        if not snippets:
+            return []
+
+        t0 = time.perf_counter()
+        with metrics.stage("query", "rerank_prefilter"):
+            first_scores = np.asarray(self.first.score(question, snippets), dtype=np.float64)
+        first_ms = (time.perf_counter() - t0) * 1000
+
+        # Map first-stage scores into [0, 1) so pruned candidates always rank below survivors
+        span = first_scores.max() - first_scores.min()
+        if span > 0:
+            first_norm = (first_scores - first_scores.min()) / span * 0.999
+        else:
+            first_norm = np.zeros_like(first_scores)
+        keep = np.argsort(-first_norm, kind="stable")[: max(1, self.top_m)]
+
+        t1 = time.perf_counter()
+        second_scores = self.second.score(question, [snippets[i] for i in keep])
+        second_ms = (time.perf_counter() - t1) * 1000
+
+        final = first_norm.copy()
+        for i, s in zip(keep, second_scores, strict=True):
+            # Scored survivors land in [10, 15.01], first-stage score only breaking ties;
+            # unscored survivors land in [9, 10) by first-stage order
+            if s != UNSCORED:
+                final[i] = 10.0 + s + 0.01 * first_norm[i]
+            else:
+                final[i] = 9.0 + first_norm[i]
+
+        second_stats = getattr(self.second, "last_stats", {})
+        self.last_stats = {
+            "mode": "cascade",
+            "candidates": len(snippets),
+            "pruned": len(snippets) - len(keep),
+            "stages": [
+                {
+                    "name": "lexical",
+                    "ms": round(first_ms, 2),
+                    "in": len(snippets),
+                    "out": len(keep),
+                },
+                {
+                    "name": second_stats.get("mode", "llm"),
+                    "ms": round(second_ms, 2),
+                    "in": len(keep),
+                    "scored": second_stats.get("scored", len(keep)),
+                },
+            ],
+        }
+        return [float(s) for s in final]
@@ -1,34 +1,197 @@
 from __future__ import annotations
 
-from typing import List
-
-from openai import OpenAI
+import contextvars
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
 
+from app import deadline, metrics
 from app.core.config import settings
+from app.services.llm.chat import OpenAI, chat_completion
+
+logger = logging.getLogger(__name__)
+
+# Score given to candidates the reranker could not score (timeout, unparsable reply).
+# It sits below the 0–5 range so a stable sort keeps them after scored candidates, in
+# their original retrieval order.
+UNSCORED = -1.0
+
+MODES = ("listwise", "concurrent", "pointwise")
+
+_PAIR_RE = re.compile(
+    r"(?:snippet\s*)?\[?#?(\d+)\]?\s*[:=\-–]+\s*(-?\d+(?:\.\d+)?)", re.IGNORECASE
+)
+
+
+def _clamp(value: float) -> float:
+    return max(0.0, min(5.0, value))
+
+
+def parse_listwise_scores(content: str, n: int) -> list[float]:
+    """
+    Parse a listwise reply into one score per candidate.
+
+    Accepts a JSON object (``{"1": 4, "2": 0.5}``), a JSON array of numbers, or loose
+    ``1: 4`` / ``[2] - 3.5`` lines. Candidates missing from the reply get ``UNSCORED``.
+
+    Args:
+        content: Raw model reply
+        n: Number of candidates in the prompt (1-based ids)
+
+    Returns:
+        List of n scores
+    """
+    scores = [UNSCORED] * n
+    data = _load_json(re.search(r"\{.*\}", content, re.DOTALL))
+    if isinstance(data, dict):
+        data = data.get("scores", data)
+    if isinstance(data, dict):
+        for key, val in data.items():
+            _set_score(scores, int(re.sub(r"\D", "", str(key)) or 0), val)
+        return scores
+
+    pairs = _PAIR_RE.findall(content)
+    if pairs:
+        for idx_str, val_str in pairs:
+            _set_score(scores, int(idx_str), val_str)
+        return scores
+
+    # Bare array in candidate order; checked last since "[2]" ids also look like arrays
+    if not isinstance(data, list):
+        data = _load_json(re.search(r"\[.*\]", content, re.DOTALL))
+    if isinstance(data, list):
+        for pos, val in enumerate(data[:n], start=1):
+            if isinstance(val, dict):
+                item_id = val.get("id", pos)
+                pos = int(item_id) if _is_number(item_id) else 0
+                val = val.get("score")
+            _set_score(scores, pos, val)
+    return scores
+
+
+def _set_score(scores: list[float], item_id: int, val: object) -> None:
+    """Store ``val`` for the 1-based ``item_id`` if both are usable."""
+    if 1 <= item_id <= len(scores) and _is_number(val):
+        scores[item_id - 1] = _clamp(float(val))  # type: ignore[arg-type]
+
+
+def _load_json(match: re.Match | None) -> object:
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(0))
+    except ValueError:
+        return None
+
+
+def _is_number(val: object) -> bool:
+    try:
+        float(val)  # type: ignore[arg-type]
+        return True
+    except (TypeError, ValueError):
+        return False
 
 
 class LLMReranker:
-    def __init__(self) -> None:
+    """
+    LLM relevance scorer.
+
+    Modes:
+        pointwise: one chat completion per snippet, sequentially
+        concurrent: one chat completion per snippet, run in parallel under a time budget
+        listwise: one chat completion scoring every snippet at once
+    """
+
+    def __init__(self, mode: str | None = None) -> None:
         self.client = OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url)
+        self.mode = mode or settings.rerank_mode
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown rerank mode {self.mode!r}, expected one of {MODES}")
+        self.last_stats: dict = {}
 
-    def score(self, question: str, snippets: list[str]) -> list[float]:  # pragma: no cover - optional
+    def score(self, question: str, snippets: list[str]) -> list[float]:
+        if not snippets:
+            return []
+        with metrics.stage("query", "rerank"):
+            if self.mode == "listwise":
+                scores = self._score_listwise(question, snippets)
+            elif self.mode == "concurrent":
+                scores = self._score_concurrent(question, snippets)
+            else:  # pointwise
+                scores = [self._score_one(question, s) for s in snippets]
+        self.last_stats = {
+            "mode": self.mode,
+            "candidates": len(snippets),
+            "scored": sum(1 for s in scores if s != UNSCORED),
+        }
+        return scores
+
+    def _score_one(self, question: str, snippet: str) -> float:
         prompt = (
             "Score 0–5 how well the snippet answers the question. Reply with a number only.\n"
             f"Question: {question}\n"
             "Snippet: {snippet}"
         )
+        content = chat_completion(
+            self.client,
+            model=settings.chat_model,
+            messages=[{"role": "user", "content": prompt.format(snippet=snippet)}],
+            use_cache=settings.llm_cache_rerank,
+            purpose="rerank",
+            temperature=0,
+        )
+        try:
+            val = float(content.strip())
+        except Exception:
+            val = 0.0
+        return val
+
+    def _score_concurrent(self, question: str, snippets: list[str]) -> list[float]:
+        workers = max(1, min(settings.rerank_concurrency, len(snippets)))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        # Scoring threads keep the request's deadline and rate limit priority
+        futures = [
+            pool.submit(contextvars.copy_context().run, self._score_one, question, s)
+            for s in snippets
+        ]
+        wait(futures, timeout=deadline.timeout(settings.rerank_timeout_s))
+        # Don't block on stragglers; their results are dropped (but still land in the LLM cache)
+        pool.shutdown(wait=False, cancel_futures=True)
+
         scores: list[float] = []
-        for snippet in snippets:
-            resp = self.client.chat.completions.create(
-                model=settings.chat_model,
-                messages=[{"role": "user", "content": prompt.format(snippet=snippet)}],
-                temperature=0,
+        for fut in futures:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                scores.append(fut.result())
+            else:
+                scores.append(UNSCORED)
+        missing = scores.count(UNSCORED)
+        if missing:
+            logger.warning(
+                f"Rerank budget exceeded; {missing}/{len(snippets)} kept retrieval order"
             )
-            try:
-                val = float(resp.choices[0].message.content.strip())
-            except Exception:
-                val = 0.0
-            scores.append(val)
         return scores
 
-
+    def _score_listwise(self, question: str, snippets: list[str]) -> list[float]:
+        listing = "\n\n".join(f"[{i}] {s}" for i, s in enumerate(snippets, start=1))
+        prompt = (
+            "Score 0–5 how well each numbered snippet answers the question.\n"
+            "Reply with a JSON object mapping snippet number to score only, "
+            'e.g. {"1": 4, "2": 0}.\n'
+            f"Question: {question}\n\n"
+            f"Snippets:\n{listing}"
+        )
+        try:
+            content = chat_completion(
+                self.client,
+                model=settings.chat_model,
+                messages=[{"role": "user", "content": prompt}],
+                use_cache=settings.llm_cache_rerank,
+                purpose="rerank_listwise",
+                timeout=settings.rerank_timeout_s,
+                temperature=0,
+            )
+        except Exception as e:
+            logger.warning(f"Listwise rerank failed, keeping retrieval order: {e}")
+            return [UNSCORED] * len(snippets)
+        return parse_listwise_scores(content, len(snippets))
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from app import deadline, metrics
+from app.core.config import settings
+from app.core.errors import DeadlineExceededError
+
+
+class _Batch:
+    __slots__ = ("items", "deadlines", "full", "done", "results", "error")
+
+    def __init__(self) -> None:
+        self.items: list[Any] = []
+        self.deadlines: list[float | None] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: list[Any] = []
+        self.error: BaseException | None = None
+
+
+class Activity:
+    """Counts callers inside ``with activity:`` blocks, e.g. retrievals in progress."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __enter__(self) -> Activity:
+        with self._lock:
+            self.count += 1
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        with self._lock:
+            self.count -= 1
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent calls with the same key into one batched call.
+
+    The first caller of a batch leads it: it waits up to ``query_batch_window_ms`` for
+    more calls with the same key (or until ``query_batch_max_size`` joined), runs ``fn`` on
+    all items and hands every caller its own result. A leader only waits while ``activity``
+    shows other callers in progress, so a lone request pays no added latency. The batched
+    call runs under the latest of its callers' deadlines (none if any caller has none), so
+    a leader short on time does not cut the call short for the others.
+    """
+
+    def __init__(self, name: str, activity: Activity) -> None:
+        self.name = name
+        self.activity = activity
+        self._lock = threading.Lock()
+        self._open: dict[Hashable, _Batch] = {}
+
+    def submit(self, key: Hashable, item: Any, fn: Callable[[list], list]) -> Any:
+        max_size = max(1, settings.query_batch_max_size)
+        busy = self.activity.count > 1
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+            index = len(batch.items)
+            batch.items.append(item)
+            batch.deadlines.append(deadline.current())
+            if len(batch.items) >= max_size:
+                del self._open[key]
+                batch.full.set()
+        if leader:
+            if busy and max_size > 1 and settings.query_batch_window_ms > 0:
+                batch.full.wait(settings.query_batch_window_ms / 1000)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            self._run(batch, fn)
+        if not batch.done.wait(deadline.timeout()):
+            raise DeadlineExceededError(f"Deadline exceeded waiting for batched {self.name}")
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _run(self, batch: _Batch, fn: Callable[[list], list]) -> None:
+        metrics.registry.observe(
+            metrics.QUERY_BATCH_SIZE, len(batch.items), buckets=metrics.BUCKETS_SIZE, op=self.name
+        )
+        until = None if None in batch.deadlines else max(batch.deadlines)
+        try:
+            with deadline.until(until):
+                results = fn(batch.items)
+            if len(results) != len(batch.items):
+                raise RuntimeError(
+                    f"{self.name} batch returned {len(results)} results for {len(batch.items)}"
+                )
+            batch.results = results
+        except BaseException as e:
+            batch.error = e
+        finally:
+            batch.done.set()
+
+
+# Retrievals in progress in this process; both stages wait for batches only while busy
+retrievals = Activity()
+embed_batcher = MicroBatcher("embed", retrievals)
+search_batcher = MicroBatcher("search", retrievals)
@@ -4,9 +4,13 @@ from dataclasses import dataclass
 from typing import List, Optional
 import math
 import re
+import time
 
+from app import deadline, metrics
 from app.core.config import settings
 from app.services.embeddings.base import Embedder
+from app.services.reranker.base import Reranker
+from app.services.retriever.batcher import embed_batcher, retrievals, search_batcher
 from app.services.vectorstore.base import VectorStore
 
 
@@ -73,6 +77,7 @@ class Hit:
 class RetrievalResult:
     hits: List[Hit]
     metrics: dict
+    query_vector: list[float] | None = None
 
 
 class Retriever:
@@ -81,10 +86,69 @@ class Retriever:
         self.vectorstore = vectorstore
 
     def search(self, query: str, namespace: str, k: int, k_final: int) -> RetrievalResult:
-        # Vector search
-        qvec = self.embedder.embed_query(query)
-        raw = self.vectorstore.search(namespace=namespace, query_vector=qvec, k=k)
-        
+        with retrievals:
+            return self._search(query, namespace, k, k_final)
+
+    def _search(self, query: str, namespace: str, k: int, k_final: int) -> RetrievalResult:
+        # Vector search; concurrent searches share embedding calls and batch searches
+        deadline.check("embed")
+        with metrics.stage("query", "embed"):
+            if settings.query_batching_enabled:
+                qvec = embed_batcher.submit(id(self.embedder), query, self._embed_many)
+            else:
+                qvec = self.embedder.embed_query(query)
+        deadline.check("vector_search")
+        with metrics.stage("query", "vector_search"):
+            if settings.query_batching_enabled:
+                key = (id(self.vectorstore), namespace, k)
+                raw = search_batcher.submit(
+                    key, qvec, lambda qvecs: self._search_many(namespace, qvecs, k)
+                )
+            else:
+                raw = self.vectorstore.search(namespace=namespace, query_vector=qvec, k=k)
+        with metrics.stage("query", "rank"):
+            return self._rank(query, raw, k_final, qvec)
+
+    def _embed_many(self, queries: list[str]) -> list[list[float]]:
+        if len(queries) == 1:
+            return [self.embedder.embed_query(queries[0])]
+        return self.embedder.embed_texts(queries)
+
+    def _search_many(self, namespace: str, qvecs: list[list[float]], k: int) -> list[list[dict]]:
+        if len(qvecs) == 1:
+            return [self.vectorstore.search(namespace=namespace, query_vector=qvecs[0], k=k)]
+        return self.vectorstore.search_batch(namespace=namespace, query_vectors=qvecs, k=k)
+
+    def search_batch(
+        self, queries: list[str], namespace: str, k: int, k_final: int
+    ) -> list[RetrievalResult]:
+        """
+        Retrieve for many queries with one embeddings call and one batch vector search.
+
+        Args:
+            queries: Query texts, all searched against the same namespace
+            namespace: Vector store namespace
+            k: Candidates fetched per query
+            k_final: Hits kept per query after scoring and dedupe
+
+        Returns:
+            One RetrievalResult per query, in input order
+        """
+        if not queries:
+            return []
+        with metrics.stage("query", "embed"):
+            qvecs = self.embedder.embed_texts(queries)
+        with metrics.stage("query", "vector_search"):
+            raws = self.vectorstore.search_batch(namespace=namespace, query_vectors=qvecs, k=k)
+        with metrics.stage("query", "rank"):
+            return [
+                self._rank(q, raw, k_final, qvec)
+                for q, raw, qvec in zip(queries, raws, qvecs, strict=True)
+            ]
+
+    def _rank(
+        self, query: str, raw: list[dict], k_final: int, qvec: list[float] | None = None
+    ) -> RetrievalResult:
         # Convert to chunks
         chunks = [
             {
@@ -149,6 +213,21 @@ class Retriever:
         max_sim = max(scores) if scores else 0.0
         avg_top3 = sum(scores[:3]) / min(3, len(scores)) if scores else 0.0
         metrics = {"maxSim": max_sim, "avgTop3": avg_top3, "k": len(hits)}
-        return RetrievalResult(hits=hits, metrics=metrics)
-
-
+        return RetrievalResult(hits=hits, metrics=metrics, query_vector=qvec)
+
+
+def rerank_hits(
+    question: str, results: RetrievalResult, reranker: Reranker, k_final: int
+) -> RetrievalResult:
+    """Reorder ``results.hits`` by reranker score, keep ``k_final`` and record rerank stats."""
+    start = time.perf_counter()
+    scores = reranker.score(question, [h.chunk.get("text", "") for h in results.hits])
+    rerank_ms = (time.perf_counter() - start) * 1000
+
+    scored_hits = sorted(zip(results.hits, scores, strict=True), key=lambda x: x[1], reverse=True)
+    results.hits = [hit for hit, _ in scored_hits[:k_final]]
+    results.metrics["rerank"] = {
+        **getattr(reranker, "last_stats", {}),
+        "ms": round(rerank_ms, 2),
+    }
+    return results
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+from app import deadline, metrics
+from app.core.config import settings
+from app.core.errors import DeadlineExceededError
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LEADER = "leader"  # computed the result
+LOCAL = "local"  # shared the result of a call in this process
+REMOTE = "remote"  # shared the result of a call in another replica
+
+# Across replicas the leader holds a lock while it computes, then stores the result briefly
+# and publishes it on the key's channel. Followers subscribe first and then check the stored
+# result, so a result published in between is not lost.
+_LOCK_KEY = "contextforge:singleflight:{name}:{key}:lock"
+_RESULT_KEY = "contextforge:singleflight:{name}:{key}:result"
+_CHANNEL = "contextforge:singleflight:{name}:{key}"
+
+
+def make_key(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Runs one computation per key at a time and shares its result with concurrent callers.
+
+    Within a process, callers with the key of a running call wait for it. With a
+    ``connection`` and ``singleflight_redis``, the process' leader also takes a Redis lock so
+    replicas wait on each other; results cross over as ``encode``/``decode`` strings. A
+    follower computes the result itself when the other replica fails, dies (the lock
+    expires) or exceeds ``singleflight_wait_s``. Errors are shared within a process only, and
+    never a leader's ``DeadlineExceededError``: that deadline is the leader's own, so its
+    followers try again (joining a newer call or leading one) under theirs.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        encode: Callable[[T], str],
+        decode: Callable[[str], T],
+        connection: Callable[[], Redis] | None = None,
+    ) -> None:
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+        self.connection = connection
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> tuple[T, str]:
+        """Return ``fn()`` or the result of an identical call in flight, and the caller's role."""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    break
+            if not call.done.wait(deadline.timeout()):
+                raise DeadlineExceededError(f"Deadline exceeded waiting for shared {self.name}")
+            if isinstance(call.error, DeadlineExceededError):
+                continue
+            metrics.inc(metrics.SINGLEFLIGHT, flight=self.name, role=LOCAL)
+            if call.error is not None:
+                raise call.error
+            return call.result, LOCAL
+        role = LEADER
+        try:
+            call.result, role = self._lead(key, fn)
+            return call.result, role
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            metrics.inc(metrics.SINGLEFLIGHT, flight=self.name, role=role)
+
+    def _lead(self, key: str, fn: Callable[[], T]) -> tuple[T, str]:
+        if self.connection is None or not settings.singleflight_redis:
+            return fn(), LEADER
+        names = {"name": self.name, "key": key}
+        try:
+            conn = self.connection()
+            lock = conn.lock(_LOCK_KEY.format(**names), timeout=settings.singleflight_wait_s)
+            acquired = lock.acquire(blocking=False)
+        except Exception as e:
+            logger.warning(f"Single-flight lock for {self.name} failed, not coalescing: {e}")
+            return fn(), LEADER
+
+        if not acquired:
+            shared = self._await(conn, names)
+            if shared is not None:
+                return shared, REMOTE
+            return fn(), LEADER
+
+        payload = ""  # tells followers to compute it themselves
+        try:
+            result = fn()
+            payload = self.encode(result)
+            return result, LEADER
+        finally:
+            self._publish(conn, lock, names, payload)
+
+    def _publish(self, conn: Redis, lock, names: dict, payload: str) -> None:
+        try:
+            pipe = conn.pipeline()
+            if payload:
+                ttl_ms = max(1, int(settings.singleflight_result_ttl_s * 1000))
+                pipe.set(_RESULT_KEY.format(**names), payload, px=ttl_ms)
+            pipe.publish(_CHANNEL.format(**names), payload)
+            pipe.execute()
+            lock.release()
+        except Exception as e:  # the lock expires on its own
+            logger.warning(f"Single-flight publish for {self.name} failed: {e}")
+
+    def _await(self, conn: Redis, names: dict) -> T | None:
+        """Wait for another replica's result; None when the caller should compute it."""
+        wait_until = time.monotonic() + min(
+            settings.singleflight_wait_s, deadline.timeout() or settings.singleflight_wait_s
+        )
+        pubsub = conn.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(_CHANNEL.format(**names))
+            while True:
+                raw = conn.get(_RESULT_KEY.format(**names))
+                if raw is None:
+                    remaining = wait_until - time.monotonic()
+                    if remaining <= 0 or not conn.exists(_LOCK_KEY.format(**names)):
+                        return None
+                    message = pubsub.get_message(timeout=min(remaining, 0.5))
+                    if message is None:
+                        continue
+                    raw = message["data"]
+                return self.decode(raw.decode()) if raw else None
+        except Exception as e:
+            logger.warning(f"Waiting on single-flight {self.name} failed: {e}")
+            return None
+        finally:
+            with contextlib.suppress(Exception):
+                pubsub.close()
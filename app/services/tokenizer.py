@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import tiktoken
+
+logger = logging.getLogger(__name__)
+
+ENCODING = "cl100k_base"
+BPE_URL = "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken"
+BPE_SHA256 = "223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7"
+# Shipped with the image when ``python -m app.cli fetch-tokenizer --bundle`` ran at build time
+BUNDLED_BPE = Path(__file__).resolve().parents[1] / "assets" / "cl100k_base.tiktoken"
+
+
+def _cache_dir() -> str:
+    # tiktoken looks files up in TIKTOKEN_CACHE_DIR under the SHA-1 of their URL
+    cache_dir = os.environ.setdefault("TIKTOKEN_CACHE_DIR", settings.tokenizer_cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def cached_bpe_path() -> Path:
+    return Path(_cache_dir()) / hashlib.sha1(BPE_URL.encode()).hexdigest()
+
+
+def _local_bpe() -> Path | None:
+    if settings.tokenizer_file:
+        return Path(settings.tokenizer_file)
+    return BUNDLED_BPE if BUNDLED_BPE.exists() else None
+
+
+def _seed_cache() -> None:
+    """Copy a local BPE file into tiktoken's cache so loading never goes to the network."""
+    source = _local_bpe()
+    target = cached_bpe_path()
+    if source is None or target.exists():
+        return
+    if hashlib.sha256(source.read_bytes()).hexdigest() != BPE_SHA256:
+        raise ValueError(f"{source} is not the {ENCODING} BPE file (hash mismatch)")
+    tmp = target.with_suffix(".tmp")
+    shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+
+
+@lru_cache(maxsize=1)
+def get_encoding() -> tiktoken.Encoding:
+    """
+    The ``cl100k_base`` encoding, loaded once per process.
+
+    Loads from ``settings.tokenizer_file`` or the bundled copy when present, otherwise from
+    tiktoken's cache in ``settings.tokenizer_cache_dir``, downloading only as a last resort.
+    """
+    import tiktoken
+
+    _seed_cache()
+    try:
+        return tiktoken.get_encoding(ENCODING)
+    except Exception as e:
+        raise RuntimeError(
+            f"Could not load the {ENCODING} tokenizer: {e}. On hosts without internet access "
+            "set TOKENIZER_FILE or run `python -m app.cli fetch-tokenizer --bundle` at build time"
+        ) from e
+
+
+def fetch(bundle: bool = False) -> Path:
+    """Download the BPE file into the cache (and into the bundle location with ``bundle``)."""
+    get_encoding()
+    path = cached_bpe_path()
+    if bundle:
+        BUNDLED_BPE.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, BUNDLED_BPE)
+        path = BUNDLED_BPE
+    logger.info(f"{ENCODING} tokenizer available at {path}")
+    return path
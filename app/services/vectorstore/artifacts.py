@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Callable
+
+import numpy as np
+
+from app.services.chunker.chunker import Chunk
+from app.services.vectorstore.base import VectorStore
+from app.services.vectorstore.points import chunk_points
+
+# Each ready document keeps its embeddings next to chunks.json as an (n_chunks, dim) .npy
+# array whose rows follow the chunk order in chunks.json. The arrays are loaded memory-mapped,
+# so a vector store can be rebuilt from disk without calling the embedding API again.
+
+
+def save_vectors(path: str, vectors, dtype: str = "float16") -> None:
+    """Write vectors atomically; a partially written artifact is never visible."""
+    arr = np.asarray(vectors, dtype=np.dtype(dtype))
+    tmp = f"{path}.tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def load_vectors(path: str, mmap: bool = True) -> np.ndarray | None:
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def reindex_document(
+    vectorstore: VectorStore,
+    namespace: str,
+    chunks_file: str,
+    vectors_file: str,
+    batch_size: int = 512,
+    on_batch: Callable[[int], None] | None = None,
+) -> int:
+    """
+    Upsert one document's points from its chunks.json and vector artifact.
+
+    Returns the number of points written. Raises ``FileNotFoundError`` when either file is
+    missing and ``ValueError`` when they disagree on the number of chunks.
+    """
+    vectors = load_vectors(vectors_file)
+    if vectors is None or not os.path.exists(chunks_file):
+        raise FileNotFoundError(f"Missing artifacts for {namespace}")
+    with open(chunks_file, encoding="utf-8") as f:
+        chunks = [Chunk(**c) for c in json.load(f)["chunks"]]
+    if len(chunks) != len(vectors):
+        raise ValueError(f"{namespace}: {len(chunks)} chunks but {len(vectors)} vectors")
+
+    for i in range(0, len(chunks), max(1, batch_size)):
+        batch = vectors[i : i + batch_size].astype(np.float32).tolist()
+        points = chunk_points(chunks[i : i + batch_size], batch)
+        vectorstore.upsert(namespace=namespace, vectors=points)
+        if on_batch is not None:
+            on_batch(len(batch))
+    return len(chunks)
@@ -8,7 +8,15 @@ class VectorStore(Protocol):
     def search(self, namespace: str, query_vector: list[float], k: int) -> list[dict]:
         ...
 
+    def search_batch(
+        self, namespace: str, query_vectors: list[list[float]], k: int
+    ) -> list[list[dict]]:
+        ...
+
     def delete_namespace(self, namespace: str) -> None:
         ...
 
+    def alias_namespace(self, namespace: str, target: str) -> None:
+        ...
+
 
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from app.services.chunker.chunker import Chunk
+
+
+def chunk_points(chunks: list[Chunk], vectors: Sequence[Sequence[float]]) -> list[dict]:
+    """Vector store points for chunks and their embeddings, with the payload retrieval reads."""
+    return [
+        {
+            "id": c.id,
+            "vector": vec,
+            "payload": {
+                "text": c.text,
+                "page_start": c.page_start,
+                "page_end": c.page_end,
+                "section": c.section,
+                "chunk_id": c.id,
+            },
+        }
+        for c, vec in zip(chunks, vectors, strict=True)
+    ]
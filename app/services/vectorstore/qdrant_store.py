@@ -49,10 +49,62 @@ class QdrantStore:
             })
         return results
 
+    def search_batch(
+        self, namespace: str, query_vectors: list[list[float]], k: int
+    ) -> list[list[dict]]:
+        """Run several searches against one collection in a single request."""
+        if not query_vectors:
+            return []
+        requests = [
+            qm.SearchRequest(vector=vec, limit=k, with_payload=True) for vec in query_vectors
+        ]
+        batches = self.client.search_batch(collection_name=namespace, requests=requests)
+        return [
+            [
+                {"id": h.id, "score": float(h.score), "payload": dict(h.payload or {})}
+                for h in hits
+            ]
+            for hits in batches
+        ]
+
     def delete_namespace(self, namespace: str) -> None:
         try:
+            aliases = {a.alias_name for a in self.client.get_aliases().aliases}
+            if namespace in aliases:
+                # Only drop the alias; the collection belongs to the source document
+                self.client.update_collection_aliases(
+                    change_aliases_operations=[
+                        qm.DeleteAliasOperation(delete_alias=qm.DeleteAlias(alias_name=namespace))
+                    ]
+                )
+                return
             self.client.delete_collection(collection_name=namespace)
         except Exception:
             pass
 
+    def list_namespaces(self) -> list[str]:
+        return [c.name for c in self.client.get_collections().collections]
+
+    def drop_collection(self, namespace: str) -> None:
+        """Delete a collection (and any aliases pointing at it); errors propagate."""
+        self.client.delete_collection(collection_name=namespace)
+
+    def set_on_disk(self, namespace: str, on_disk: bool) -> None:
+        """Move a collection's vectors and payloads to disk (mmap) or back into RAM."""
+        self.client.update_collection(
+            collection_name=namespace,
+            vectors_config={"": qm.VectorParamsDiff(on_disk=on_disk)},
+            collection_params=qm.CollectionParamsDiff(on_disk_payload=on_disk),
+        )
+
+    def alias_namespace(self, namespace: str, target: str) -> None:
+        """Make ``namespace`` resolve to the existing ``target`` collection without copying."""
+        self.client.update_collection_aliases(
+            change_aliases_operations=[
+                qm.CreateAliasOperation(
+                    create_alias=qm.CreateAlias(collection_name=target, alias_name=namespace)
+                )
+            ]
+        )
+
 
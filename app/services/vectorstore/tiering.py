@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+logger = logging.getLogger(__name__)
+
+HOT = "hot"  # vectors and payloads in RAM (the Qdrant default)
+COLD = "cold"  # vectors and payloads on disk; still searchable, just slower
+UNLOADED = "unloaded"  # collection dropped; rebuilt from local vector artifacts on first use
+
+_ACCESS_KEY = "contextforge:vectors:access"
+_TIER_KEY = "contextforge:vectors:tier"
+_SWEEP_KEY = "contextforge:vectors:sweep"
+_RESTORE_LOCK = "contextforge:vectors:restore:{name}"
+
+
+class TierManager:
+    """
+    Tracks when each collection was last used and moves idle ones down the tiers.
+
+    Last access times (a sorted set) and tiers (a hash) live in Redis so API processes and
+    workers share them. ``ensure_hot`` promotes a collection before it is used; ``sweep``
+    demotes collections idle for ``demote_after_s`` or beyond the ``hot_max`` most recently
+    used to disk, and unloads those idle for ``unload_after_s`` when ``can_restore`` says
+    they can be rebuilt. Sweeps run at most every ``sweep_interval_s``, triggered by traffic.
+    """
+
+    def __init__(
+        self,
+        store,
+        connection: Redis,
+        restore: Callable[[str], None],
+        can_restore: Callable[[str], bool],
+        hot_max: int,
+        demote_after_s: float,
+        unload_after_s: float,
+        sweep_interval_s: float,
+    ) -> None:
+        self.store = store
+        self.connection = connection
+        self.restore = restore
+        self.can_restore = can_restore
+        self.hot_max = hot_max
+        self.demote_after_s = demote_after_s
+        self.unload_after_s = unload_after_s
+        self.sweep_interval_s = sweep_interval_s
+
+    def tier(self, name: str) -> str:
+        value = self.connection.hget(_TIER_KEY, name)
+        return value.decode() if value else HOT
+
+    def _set_tier(self, name: str, tier: str) -> None:
+        if tier == HOT:
+            self.connection.hdel(_TIER_KEY, name)
+        else:
+            self.connection.hset(_TIER_KEY, name, tier)
+
+    def ensure_hot(self, name: str) -> None:
+        """Record an access and promote ``name`` back to RAM if it was demoted."""
+        pipe = self.connection.pipeline()
+        pipe.zadd(_ACCESS_KEY, {name: time.time()})
+        pipe.hget(_TIER_KEY, name)
+        if self.sweep_interval_s > 0:
+            pipe.set(_SWEEP_KEY, 1, nx=True, ex=max(1, int(self.sweep_interval_s)))
+        results = pipe.execute()
+        tier = results[1].decode() if results[1] else HOT
+        if len(results) > 2 and results[2]:
+            threading.Thread(target=self._sweep_quietly, daemon=True).start()
+
+        if tier == COLD:
+            self.store.set_on_disk(name, False)
+            self._set_tier(name, HOT)
+            logger.info(f"Promoted {name} to RAM")
+        elif tier == UNLOADED:
+            with self.connection.lock(_RESTORE_LOCK.format(name=name), timeout=600):
+                # Another process may have restored it while we waited for the lock
+                if self.tier(name) == UNLOADED:
+                    started = time.perf_counter()
+                    self.restore(name)
+                    self._set_tier(name, HOT)
+                    logger.info(
+                        f"Restored {name} in {(time.perf_counter() - started) * 1000:.0f} ms"
+                    )
+
+    def forget(self, name: str) -> None:
+        pipe = self.connection.pipeline()
+        pipe.zrem(_ACCESS_KEY, name)
+        pipe.hdel(_TIER_KEY, name)
+        pipe.execute()
+
+    def sweep(self, now: float | None = None) -> dict:
+        now = time.time() if now is None else now
+        loaded = set(self.store.list_namespaces())
+        access = {
+            k.decode(): float(v)
+            for k, v in self.connection.zrange(_ACCESS_KEY, 0, -1, withscores=True)
+        }
+        tiers = {k.decode(): v.decode() for k, v in self.connection.hgetall(_TIER_KEY).items()}
+
+        # Collections that predate tracking start their idle clock now
+        untracked = {name: now for name in loaded if name not in access}
+        if untracked:
+            self.connection.zadd(_ACCESS_KEY, untracked)
+            access.update(untracked)
+
+        result = {"demoted": 0, "unloaded": 0, "forgotten": 0}
+        hot_rank = 0
+        for name, last in sorted(access.items(), key=lambda kv: -kv[1]):
+            tier = tiers.get(name, HOT)
+            if tier == UNLOADED:
+                continue
+            if name not in loaded:
+                self.forget(name)
+                result["forgotten"] += 1
+                continue
+            idle = now - last
+            if self.unload_after_s and idle > self.unload_after_s and self.can_restore(name):
+                self.store.drop_collection(name)
+                self._set_tier(name, UNLOADED)
+                result["unloaded"] += 1
+            elif tier == HOT:
+                over_capacity = self.hot_max and hot_rank >= self.hot_max
+                if over_capacity or (self.demote_after_s and idle > self.demote_after_s):
+                    self.store.set_on_disk(name, True)
+                    self._set_tier(name, COLD)
+                    result["demoted"] += 1
+                else:
+                    hot_rank += 1
+        logger.info(f"Tier sweep: {result}")
+        return result
+
+    def _sweep_quietly(self) -> None:
+        try:
+            self.sweep()
+        except Exception as e:
+            logger.warning(f"Tier sweep failed: {e}")
+
+    def stats(self) -> dict:
+        tiers = [v.decode() for v in self.connection.hvals(_TIER_KEY)]
+        tracked = int(self.connection.zcard(_ACCESS_KEY))
+        return {
+            "tracked": tracked,
+            HOT: tracked - len(tiers),
+            COLD: tiers.count(COLD),
+            UNLOADED: tiers.count(UNLOADED),
+        }
+
+
+class ArtifactRestorer:
+    """Rebuilds an unloaded document collection from its vector artifact and re-aliases it."""
+
+    def __init__(self, store) -> None:
+        self.store = store
+
+    def _files(self, name: str) -> tuple[tuple[str, str] | None, list[str]]:
+        from app.db import repo
+        from app.deps import chunks_path, namespace_doc_id, vectors_path
+
+        doc_id = namespace_doc_id(name)
+        if doc_id is None:
+            return None, []
+        aliases = [str(i) for i in repo.list_alias_ids(UUID(doc_id))]
+        # Aliases hold linked copies of the source files, which outlive the source row
+        for candidate in [doc_id, *aliases]:
+            chunks, vectors = chunks_path(candidate), vectors_path(candidate)
+            if os.path.exists(chunks) and os.path.exists(vectors):
+                return (chunks, vectors), aliases
+        return None, aliases
+
+    def can_restore(self, name: str) -> bool:
+        return self._files(name)[0] is not None
+
+    def restore(self, name: str) -> None:
+        from app.deps import sanitize_namespace
+        from app.services.vectorstore.artifacts import reindex_document
+
+        files, aliases = self._files(name)
+        if files is None:
+            raise FileNotFoundError(f"No vector artifact to restore {name}")
+        reindex_document(self.store, name, *files)
+        for alias in aliases:
+            self.store.alias_namespace(sanitize_namespace(alias), target=name)
+
+
+class TieredVectorStore:
+    """
+    VectorStore wrapper that promotes a collection before every read or write.
+
+    ``resolve`` maps a namespace (possibly a dedupe alias) to the collection it reads from,
+    which is what tiers are tracked by. Everything else is delegated to ``inner``.
+    """
+
+    def __init__(self, inner, manager: TierManager, resolve: Callable[[str], str]) -> None:
+        self.inner = inner
+        self.manager = manager
+        self.resolve = resolve
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+    def prefetch(self, namespace: str) -> None:
+        self.manager.ensure_hot(self.resolve(namespace))
+
+    def upsert(self, namespace: str, vectors: list[dict]) -> None:
+        self.prefetch(namespace)
+        self.inner.upsert(namespace, vectors)
+
+    def search(self, namespace: str, query_vector: list[float], k: int) -> list[dict]:
+        self.prefetch(namespace)
+        return self.inner.search(namespace, query_vector, k)
+
+    def search_batch(
+        self, namespace: str, query_vectors: list[list[float]], k: int
+    ) -> list[list[dict]]:
+        self.prefetch(namespace)
+        return self.inner.search_batch(namespace, query_vectors, k)
+
+    def delete_namespace(self, namespace: str) -> None:
+        self.inner.delete_namespace(namespace)
+        if self.resolve(namespace) == namespace:
+            self.manager.forget(namespace)
+
+    def alias_namespace(self, namespace: str, target: str) -> None:
+        self.manager.ensure_hot(target)
+        self.inner.alias_namespace(namespace, target)
@@ -3,16 +3,59 @@ import uuid
 from typing import Callable
 
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+
+from app import metrics, profiling
+from app.core.config import settings
+
+
+class ProfiledRoute(APIRoute):
+    """Route whose endpoint thread is stack-sampled when its request is profiled."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs) -> None:
+        super().__init__(path, profiling.on_request_thread(endpoint), **kwargs)
 
 
 def install_telemetry(app: FastAPI) -> None:
+    # Routes declared on the app itself; routers set route_class=ProfiledRoute
+    app.router.route_class = ProfiledRoute
+
     @app.middleware("http")
     async def add_request_context(request: Request, call_next: Callable):
         request_id = request.headers.get("x-request-id", str(uuid.uuid4()))
+        timings = metrics.start_request()
         start = time.perf_counter()
-        response = await call_next(request)
-        duration_ms = int((time.perf_counter() - start) * 1000)
+        if profiling.requested(
+            request.headers.get(profiling.PROFILE_HEADER), settings.profiling_sample_rate
+        ):
+            # Streaming responses are profiled up to their first byte
+            label = f"{request.method}-{request.url.path}"
+            with profiling.profile("http", label, sampling=True) as profile:
+                response = await call_next(request)
+            if profile:
+                response.headers["x-profile-id"] = profile["id"]
+        else:
+            response = await call_next(request)
+        duration = (time.perf_counter() - start) * 1000
         response.headers["x-request-id"] = request_id
-        response.headers["x-response-time-ms"] = str(duration_ms)
+        response.headers["x-response-time-ms"] = str(int(duration))
+        response.headers["server-timing"] = metrics.server_timing(timings, duration)
+
+        # Label by route template, not raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        metrics.registry.observe(
+            metrics.HTTP_DURATION,
+            duration,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(response.status_code),
+        )
         return response
 
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics() -> PlainTextResponse:
+        return PlainTextResponse(
+            metrics.render(metrics.registry.snapshot()),
+            media_type="text/plain; version=0.0.4",
+        )
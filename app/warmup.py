@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _tokenizer() -> None:
+    from app.services.tokenizer import get_encoding
+
+    get_encoding().encode("warm up")
+
+
+def _embedder() -> None:
+    from app.deps import get_embedder
+
+    get_embedder()
+
+
+def _vectorstore() -> None:
+    from app.deps import get_vectorstore
+
+    get_vectorstore().client.get_collections()
+
+
+def _redis() -> None:
+    from app.deps import get_redis
+
+    get_redis().ping()
+
+
+def _llm_cache() -> None:
+    from app.services.llm.cache import get_llm_cache
+
+    get_llm_cache()
+
+
+STEPS: dict[str, Callable[[], None]] = {
+    "tokenizer": _tokenizer,
+    "embedder": _embedder,
+    "vectorstore": _vectorstore,
+    "redis": _redis,
+    "llmCache": _llm_cache,
+}
+
+
+def warm_up() -> dict[str, float]:
+    """
+    Load the tokenizer and build the cached clients before the first request needs them.
+
+    Heavy packages are imported lazily, so this is also where the API process pays for
+    them. A failing step (e.g. Qdrant not up yet) is logged and skipped: the request path
+    builds the client again on first use. Returns the duration of each step in ms.
+    """
+    timings = {}
+    for name, step in STEPS.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {e}")
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"Warm-up finished: {timings}")
+    return timings
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+    from redis.asyncio.client import PubSub
+
+logger = logging.getLogger(__name__)
+
+# Ingest progress is pushed through Redis: every event is published on the document's
+# channel and also kept as the document's latest event, so a client that subscribes late
+# still gets the current state without a database read.
+_CHANNEL = "contextforge:doc:{doc_id}:events"
+_LAST_KEY = "contextforge:doc:{doc_id}:last"
+_SEQ_KEY = "contextforge:doc:{doc_id}:seq"
+
+TERMINAL_STAGES = frozenset({"ready", "failed"})
+
+
+def channel(doc_id: str) -> str:
+    return _CHANNEL.format(doc_id=doc_id)
+
+
+def last_key(doc_id: str) -> str:
+    return _LAST_KEY.format(doc_id=doc_id)
+
+
+def publish_event(doc_id: str, stage: str, **data: Any) -> None:
+    """Publish an ingest stage transition or progress update; never fails the caller."""
+    if not settings.ingest_events_enabled:
+        return
+    from app.deps import get_redis
+
+    try:
+        conn = get_redis()
+        seq = conn.incr(_SEQ_KEY.format(doc_id=doc_id))
+        payload = json.dumps(
+            {"docId": doc_id, "seq": seq, "stage": stage, "ts": round(time.time(), 3), **data}
+        )
+        ttl = settings.ingest_events_ttl_s
+        pipe = conn.pipeline()
+        pipe.expire(_SEQ_KEY.format(doc_id=doc_id), ttl)
+        pipe.set(last_key(doc_id), payload, ex=ttl)
+        pipe.publish(channel(doc_id), payload)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not publish {stage} event for {doc_id}: {e}")
+
+
+def parse_event(raw: bytes | None) -> dict | None:
+    return json.loads(raw) if raw else None
+
+
+class EventHub:
+    """
+    One Redis subscription per API process, shared by every client waiting on events.
+
+    Each event stream or long-poll registers an asyncio queue for its document; a single
+    reader task takes messages off the shared pub/sub connection and hands them to the
+    queues of their document. The hub belongs to the event loop that last used it and
+    starts over on another one.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._redis: Redis | None = None
+        self._pubsub: PubSub | None = None
+        self._reader: asyncio.Task | None = None
+        self._queues: dict[str, set[asyncio.Queue]] = {}
+
+    def _bind(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        from redis import asyncio as aioredis
+
+        self._loop = loop
+        self._redis = aioredis.Redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._reader = None
+        self._queues = {}
+
+    async def latest(self, doc_id: str) -> dict | None:
+        """The document's latest event, or None."""
+        self._bind()
+        return parse_event(await self._redis.get(last_key(doc_id)))
+
+    async def subscribe(self, doc_id: str) -> asyncio.Queue:
+        """A queue receiving the document's events (as dicts) until ``unsubscribe``."""
+        self._bind()
+        name = channel(doc_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        subscribers = self._queues.setdefault(name, set())
+        first = not subscribers
+        subscribers.add(queue)
+        if first:
+            try:
+                await self._pubsub.subscribe(name)
+            except BaseException:
+                await self.unsubscribe(doc_id, queue)
+                raise
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+        return queue
+
+    async def unsubscribe(self, doc_id: str, queue: asyncio.Queue) -> None:
+        name = channel(doc_id)
+        subscribers = self._queues.get(name)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._queues[name]
+            with suppress(Exception):
+                await self._pubsub.unsubscribe(name)
+
+    async def _read(self) -> None:
+        # Runs while anyone is subscribed; the next subscribe starts it again
+        while self._queues:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except Exception as e:
+                logger.warning(f"Reading ingest events failed, retrying: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None:
+                continue
+            name = message["channel"]
+            name = name.decode() if isinstance(name, bytes) else name
+            event = parse_event(message["data"])
+            for queue in self._queues.get(name, ()):
+                queue.put_nowait(event)
@@ -1,54 +1,269 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
+import shutil
+from typing import Any
 
+import numpy as np
+from rq import Queue, Retry, get_current_job
+
+from app import metrics, profiling
 from app.core.config import settings
-from app.deps import blob_path, chunks_path, get_embedder, get_vectorstore, parsed_path, sanitize_namespace
+from app.core.errors import IngestionError
+from app.deps import (
+    blob_path,
+    checkpoint_dir,
+    chunks_path,
+    get_embedder,
+    get_vectorstore,
+    parsed_path,
+    sanitize_namespace,
+    vectors_path,
+)
 from app.db import repo
-from app.services.chunker.chunker import chunk_pages
+from app.services.chunker.chunker import Chunk, chunk_pages
 from app.services.parser.pdf_pymupdf import parse_pdf_pymupdf
+from app.services.vectorstore.artifacts import save_vectors
+from app.services.vectorstore.points import chunk_points
+from app.workers.events import publish_event
+
+logger = logging.getLogger(__name__)
+
+# Ingest runs as stage jobs: ingest (parse) -> chunk_shard x N -> embed_shard x N -> finalize.
+# Under an RQ worker, documents larger than one shard fan out across the queue; otherwise
+# (small documents, tests, ingest_fanout=false) the same stages run inline in this process.
+# Every stage writes a checkpoint under data_dir/checkpoints/<doc_id>/, so a retried job
+# skips finished work and embedding resumes at the first batch that was not upserted.
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Any | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _ckpt(doc_id: str, name: str) -> str:
+    return os.path.join(checkpoint_dir(doc_id), name)
+
+
+def _require_json(doc_id: str, name: str) -> Any:
+    """Read a checkpoint that an earlier stage must have written."""
+    data = _read_json(_ckpt(doc_id, name))
+    if data is None:
+        # e.g. a stage job ran on a host without the shared data_dir, or it was cleaned up
+        raise IngestionError(f"Missing ingest checkpoint {name} for {doc_id}")
+    return data
+
+
+def _mark_failed(doc_id: str, error: Exception) -> None:
+    """Mark the document failed unless RQ is going to retry the current job."""
+    from uuid import UUID
+
+    job = get_current_job()
+    if job is not None and job.retries_left:
+        logger.warning(f"Ingest stage failed for {doc_id}, retrying: {error}")
+        publish_event(doc_id, "retrying", error=str(error))
+        metrics.inc(metrics.RETRIES, component="ingest")
+        return
+    repo.update_status(UUID(doc_id), status="failed", error=str(error))
+    publish_event(doc_id, "failed", error=str(error))
+
+
+def _shard_ranges(total_pages: int) -> list[tuple[int, int]]:
+    size = max(1, settings.ingest_shard_pages)
+    return [(start, min(start + size, total_pages)) for start in range(0, total_pages, size)]
 
 
 def ingest(doc_id: str) -> None:
+    with profiling.job_profile("ingest", f"{doc_id}-parse"):
+        _ingest(doc_id)
+
+
+def _ingest(doc_id: str) -> None:
     # update status processing
     from uuid import UUID
 
     try:
         repo.update_status(UUID(doc_id), status="processing")
-        pdf = blob_path(doc_id)
-        pages, meta = parse_pdf_pymupdf(pdf)
-        with open(parsed_path(doc_id), "w", encoding="utf-8") as f:
-            json.dump({"pages": pages, "meta": meta}, f)
+        publish_event(doc_id, "processing")
+        plan = _read_json(_ckpt(doc_id, "parse.json"))
+        if plan is None:
+            pdf = blob_path(doc_id)
+            with metrics.stage("ingest", "parse"):
+                pages, meta = parse_pdf_pymupdf(pdf)
+            with open(parsed_path(doc_id), "w", encoding="utf-8") as f:
+                json.dump({"pages": pages, "meta": meta}, f)
 
-        chunks, stats = chunk_pages(doc_id, pages)
-        with open(chunks_path(doc_id), "w", encoding="utf-8") as f:
-            json.dump({"chunks": [c.__dict__ for c in chunks], "stats": stats}, f)
-
-        embedder = get_embedder()
-        vectors = embedder.embed_texts([c.text for c in chunks])
-        vs = get_vectorstore()
-        payloads = []
-        for c, vec in zip(chunks, vectors):
-            payloads.append(
-                {
-                    "id": c.id,
-                    "vector": vec,
-                    "payload": {
-                        "text": c.text,
-                        "page_start": c.page_start,
-                        "page_end": c.page_end,
-                        "section": c.section,
-                        "chunk_id": c.id,
-                    },
-                }
+            shards = _shard_ranges(len(pages))
+            for shard, (start, end) in enumerate(shards):
+                _write_json(_ckpt(doc_id, f"pages_{shard}.json"), pages[start:end])
+            plan = {"shards": len(shards), "total_pages": meta.get("total_pages")}
+            _write_json(_ckpt(doc_id, "parse.json"), plan)
+        publish_event(doc_id, "parsed", pages=plan["total_pages"], shards=plan["shards"])
+
+        job = get_current_job()
+        if settings.ingest_fanout and job is not None and plan["shards"] > 1:
+            _enqueue_stages(
+                Queue(job.origin, connection=job.connection),
+                doc_id,
+                plan["shards"],
+                profile=bool(job.meta.get("profile")),
             )
-        namespace = sanitize_namespace(doc_id)
-        vs.upsert(namespace=namespace, vectors=payloads)
+            return
 
-        repo.update_status(
-            UUID(doc_id), status="ready", pages=meta.get("total_pages"), chunks=len(chunks)
-        )
+        for shard in range(plan["shards"]):
+            _chunk_shard(doc_id, shard)
+            _embed_shard(doc_id, shard)
+        _finalize(doc_id)
     except Exception as e:  # pragma: no cover - tested via route monkeypatches
-        repo.update_status(UUID(doc_id), status="failed", error=str(e))
+        _mark_failed(doc_id, e)
+        if get_current_job() is not None:
+            raise
+
+
+def _enqueue_stages(queue: Queue, doc_id: str, shards: int, profile: bool = False) -> None:
+    retry = Retry(max=settings.ingest_max_retries) if settings.ingest_max_retries else None
+    # A profiled document stays profiled across its stage jobs
+    opts: dict[str, Any] = {"retry": retry, "meta": {"profile": True} if profile else None}
+    embed_jobs = []
+    for shard in range(shards):
+        chunk_job = queue.enqueue("app.workers.jobs.chunk_shard", doc_id, shard, **opts)
+        embed_jobs.append(
+            queue.enqueue(
+                "app.workers.jobs.embed_shard", doc_id, shard, depends_on=chunk_job, **opts
+            )
+        )
+    queue.enqueue("app.workers.jobs.finalize_ingest", doc_id, depends_on=embed_jobs, **opts)
+    logger.info(f"Fanned out ingest of {doc_id} into {shards} shards")
+
+
+def _run_stage(doc_id: str, fn, *args: Any) -> None:
+    label = "-".join([doc_id, fn.__name__.strip("_"), *map(str, args)])
+    try:
+        with profiling.job_profile("ingest", label):
+            fn(doc_id, *args)
+    except Exception as e:
+        _mark_failed(doc_id, e)
+        raise
+
+
+def chunk_shard(doc_id: str, shard: int) -> None:
+    _run_stage(doc_id, _chunk_shard, shard)
+
+
+def embed_shard(doc_id: str, shard: int) -> None:
+    _run_stage(doc_id, _embed_shard, shard)
+
+
+def finalize_ingest(doc_id: str) -> None:
+    _run_stage(doc_id, _finalize)
+
+
+def _chunk_shard(doc_id: str, shard: int) -> None:
+    """Chunk one page shard; the output file doubles as the stage checkpoint."""
+    out = _ckpt(doc_id, f"chunks_{shard}.json")
+    if os.path.exists(out):
+        return
+    pages = _require_json(doc_id, f"pages_{shard}.json")
+    with metrics.stage("ingest", "chunk"):
+        chunks, stats = chunk_pages(doc_id, pages)
+    _write_json(out, {"chunks": [c.__dict__ for c in chunks], "stats": stats})
+    publish_event(doc_id, "chunked", shard=shard, chunks=len(chunks))
+
+
+def _embed_shard(doc_id: str, shard: int) -> None:
+    """Embed and upsert one shard's chunks in batches, checkpointing after every batch."""
+    data = _require_json(doc_id, f"chunks_{shard}.json")
+    chunks = [Chunk(**c) for c in data["chunks"]]
+    progress_path = _ckpt(doc_id, f"embed_{shard}.json")
+    done = (_read_json(progress_path) or {}).get("batches", 0)
+
+    batch_size = max(1, settings.embedding_batch_size)
+    batches = [chunks[i : i + batch_size] for i in range(0, len(chunks), batch_size)]
+    if done >= len(batches):
+        return
+
+    embedder = get_embedder()
+    vs = get_vectorstore()
+    namespace = sanitize_namespace(doc_id)
+    for index in range(done, len(batches)):
+        batch = batches[index]
+        with metrics.stage("ingest", "embed"):
+            vectors = embedder.embed_texts([c.text for c in batch])
+        with metrics.stage("ingest", "upsert"):
+            vs.upsert(namespace=namespace, vectors=chunk_points(batch, vectors))
+        if settings.vector_artifacts_enabled:
+            save_vectors(_ckpt(doc_id, f"vectors_{shard}_{index}.npy"), vectors, "float32")
+        _write_json(progress_path, {"batches": index + 1})
+        publish_event(
+            doc_id,
+            "embedding",
+            shard=shard,
+            chunksEmbedded=min((index + 1) * batch_size, len(chunks)),
+            chunks=len(chunks),
+        )
+
+
+def _finalize(doc_id: str) -> None:
+    """Merge shard outputs into chunks.json, mark the document ready and drop checkpoints."""
+    with metrics.stage("ingest", "finalize"):
+        _finalize_outputs(doc_id)
+
+
+def _finalize_outputs(doc_id: str) -> None:
+    from uuid import UUID
+
+    plan = _require_json(doc_id, "parse.json")
+    all_chunks: list[dict] = []
+    type_counts: dict[str, int] = {}
+    token_sum = 0.0
+    for shard in range(plan["shards"]):
+        data = _require_json(doc_id, f"chunks_{shard}.json")
+        stats = data.get("stats", {})
+        all_chunks.extend(data["chunks"])
+        for t, n in stats.get("type_breakdown", {}).items():
+            type_counts[t] = type_counts.get(t, 0) + n
+        token_sum += stats.get("avg_chunk_tokens", 0) * len(data["chunks"])
+
+    stats = {
+        "chunks": len(all_chunks),
+        "type_breakdown": type_counts,
+        "avg_chunk_tokens": token_sum / len(all_chunks) if all_chunks else 0,
+    }
+    with open(chunks_path(doc_id), "w", encoding="utf-8") as f:
+        json.dump({"chunks": all_chunks, "stats": stats}, f)
+    if settings.vector_artifacts_enabled:
+        _write_vector_artifact(doc_id, plan["shards"], len(all_chunks))
+
+    repo.update_status(
+        UUID(doc_id), status="ready", pages=plan.get("total_pages"), chunks=len(all_chunks)
+    )
+    shutil.rmtree(checkpoint_dir(doc_id), ignore_errors=True)
+    publish_event(doc_id, "ready", pages=plan.get("total_pages"), chunks=len(all_chunks))
 
 
+def _write_vector_artifact(doc_id: str, shards: int, n_chunks: int) -> None:
+    """Concatenate per-batch vector checkpoints, in chunk order, into the document artifact."""
+    parts = []
+    for shard in range(shards):
+        index = 0
+        while os.path.exists(path := _ckpt(doc_id, f"vectors_{shard}_{index}.npy")):
+            parts.append(np.load(path))
+            index += 1
+    total = sum(len(p) for p in parts)
+    if not parts or total != n_chunks:
+        # e.g. checkpoints written before artifacts were enabled; re-index needs a re-embed
+        if n_chunks:
+            logger.warning(f"No complete vector artifact for {doc_id} ({total}/{n_chunks})")
+        return
+    save_vectors(vectors_path(doc_id), np.concatenate(parts), settings.vector_artifact_dtype)
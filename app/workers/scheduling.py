@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from redis import Redis
+    from rq import Queue
+
+logger = logging.getLogger(__name__)
+
+SIZE_CLASSES = ("small", "medium", "large")
+
+_RUNNING_KEY = "contextforge:ingest:running:{cls}"
+_STATS_KEY = "contextforge:ingest:stats:{cls}"
+
+# KEYS: running set. ARGV: now, expiry, cap, job id. Takes a slot only while the class is
+# under its cap, so workers that dequeued at the same moment can't all start; returns 1/0.
+_RESERVE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+return 1
+"""
+
+
+def size_class(nbytes: int, pages: int | None = None) -> str:
+    """Classify an upload by byte size and (when known) page count."""
+    mb = nbytes / (1024 * 1024)
+    if mb <= settings.ingest_small_max_mb and (pages or 0) <= settings.ingest_small_max_pages:
+        return "small"
+    if mb <= settings.ingest_medium_max_mb and (pages or 0) <= settings.ingest_medium_max_pages:
+        return "medium"
+    return "large"
+
+
+def queue_for(cls: str) -> str:
+    return f"ingest-{cls}"
+
+
+def class_of(queue_name: str) -> str | None:
+    prefix = "ingest-"
+    if queue_name.startswith(prefix) and queue_name[len(prefix) :] in SIZE_CLASSES:
+        return queue_name[len(prefix) :]
+    return None
+
+
+def parse_class_map(spec: str) -> dict[str, int]:
+    """Parse ``"small:6,medium:3,large:1"`` into ``{"small": 6, ...}``."""
+    result: dict[str, int] = {}
+    for part in spec.split(","):
+        if ":" not in part:
+            continue
+        name, value = part.split(":", 1)
+        result[name.strip()] = int(value)
+    return result
+
+
+class FairScheduler:
+    """
+    Orders a worker's queues before every dequeue.
+
+    Queues are picked by smooth weighted round-robin so, with every class backlogged,
+    jobs are drained in proportion to their weights. Classes at their cluster-wide
+    concurrency cap are left out until a running job finishes. Running jobs are tracked
+    in a Redis sorted set scored by expiry, so a crashed worker can't hold a slot forever.
+    ``order`` only reads the set; the slot itself is taken atomically in ``job_started``.
+    """
+
+    def __init__(self, connection: Redis, weights: dict[str, int], caps: dict[str, int]) -> None:
+        self.connection = connection
+        self.weights = weights
+        self.caps = caps
+        self._current: dict[str, float] = defaultdict(float)
+        self._reserve = connection.register_script(_RESERVE)
+
+    def running(self, cls: str) -> int:
+        key = _RUNNING_KEY.format(cls=cls)
+        self.connection.zremrangebyscore(key, "-inf", time.time())
+        return int(self.connection.zcard(key))
+
+    def order(self, queues: list[Queue]) -> list[Queue]:
+        allowed = []
+        for q in queues:
+            cls = class_of(q.name)
+            cap = self.caps.get(cls or "")
+            if cap and self.running(cls) >= cap:  # type: ignore[arg-type]
+                continue
+            allowed.append(q)
+        if not allowed:
+            return []
+
+        total = 0
+        for q in allowed:
+            weight = self.weights.get(class_of(q.name) or "", 1)
+            self._current[q.name] += weight
+            total += weight
+        best = max(allowed, key=lambda q: self._current[q.name])
+        self._current[best.name] -= total
+        rest = sorted((q for q in allowed if q is not best), key=lambda q: -self._current[q.name])
+        return [best, *rest]
+
+    def job_started(self, cls: str, job_id: str, timeout: int | None) -> bool:
+        """Take a running slot for the job; False if its class is already at the cap."""
+        now = time.time()
+        expires = now + (timeout if timeout and timeout > 0 else 3600)
+        key = _RUNNING_KEY.format(cls=cls)
+        cap = self.caps.get(cls)
+        if not cap:
+            self.connection.zadd(key, {job_id: expires})
+            return True
+        return bool(self._reserve(keys=[key], args=[now, expires, cap, job_id]))
+
+    def job_finished(self, cls: str, job_id: str, wait_ms: float, run_ms: float) -> None:
+        self.connection.zrem(_RUNNING_KEY.format(cls=cls), job_id)
+        record_timing(self.connection, cls, wait_ms, run_ms)
+
+
+def record_timing(connection: Redis, cls: str, wait_ms: float, run_ms: float) -> None:
+    key = _STATS_KEY.format(cls=cls)
+    pipe = connection.pipeline()
+    pipe.hincrby(key, "jobs", 1)
+    pipe.hincrbyfloat(key, "wait_ms_sum", wait_ms)
+    pipe.hincrbyfloat(key, "run_ms_sum", run_ms)
+    pipe.execute()
+    logger.info(f"Ingest job ({cls}) waited {wait_ms:.0f} ms, ran {run_ms:.0f} ms")
+
+
+def queue_stats(connection: Redis) -> dict:
+    """Queue depth, running jobs and average wait/run time per size class."""
+    from rq import Queue
+
+    stats = {}
+    for cls in SIZE_CLASSES:
+        raw = connection.hgetall(_STATS_KEY.format(cls=cls))
+        data = {k.decode(): float(v) for k, v in raw.items()}
+        jobs = int(data.get("jobs", 0))
+        running_key = _RUNNING_KEY.format(cls=cls)
+        stats[cls] = {
+            "queued": Queue(queue_for(cls), connection=connection).count,
+            "running": int(connection.zcount(running_key, time.time(), "+inf")),
+            "jobs": jobs,
+            "avgWaitMs": round(data.get("wait_ms_sum", 0.0) / jobs, 2) if jobs else 0.0,
+            "avgRunMs": round(data.get("run_ms_sum", 0.0) / jobs, 2) if jobs else 0.0,
+        }
+    return stats
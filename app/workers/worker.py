@@ -1,23 +1,244 @@
 from __future__ import annotations
 
+import argparse
+import logging
+import math
+import multiprocessing as mp
 import os
+import signal
+import time
+from datetime import UTC, datetime
 
 from redis import Redis
-from rq import Connection, Worker
+from rq import SimpleWorker
 
 from app.core.config import settings
+from app.core.logging import configure_logging
+from app.workers.scheduling import FairScheduler, class_of, parse_class_map
 
+logger = logging.getLogger(__name__)
 
-def run() -> None:  # pragma: no cover - convenience
-    listen = ["ingest"]
-    redis_url = os.getenv("REDIS_URL", settings.redis_url)
+
+def warm_up(clients: bool = True) -> None:
+    """
+    Import heavy modules and load the tokenizer so jobs don't pay for it.
+
+    Module imports and the BPE table are fork-safe and are loaded once in the supervisor;
+    network clients (OpenAI, Qdrant) are built per worker process after the fork.
+    """
+    import fitz  # noqa: F401  # PyMuPDF
+    import openai  # noqa: F401
+
+    import app.workers.jobs  # noqa: F401  # pulls in parser, chunker, embedder, vector store
+    from app.services.tokenizer import get_encoding
+
+    get_encoding().encode("warm up")
+    if clients:
+        from app.deps import get_embedder, get_vectorstore
+
+        get_embedder()
+        vs = get_vectorstore()
+        try:
+            vs.client.get_collections()
+        except Exception as e:  # Qdrant may come up after the worker; connect lazily then
+            logger.warning(f"Vector store warm-up failed: {e}")
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # No /proc (macOS): fall back to peak RSS, reported in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+
+
+class WarmWorker(SimpleWorker):
+    """
+    Non-forking RQ worker that stops itself once it crosses a memory ceiling.
+
+    With a ``FairScheduler`` it drains size-class queues by weight, skips classes at their
+    concurrency cap and records queue wait and run time per class.
+    """
+
+    # Re-check caps and weights at least this often while waiting for work
+    poll_seconds = 5
+
+    def __init__(
+        self, *args, max_memory_mb: int = 0, scheduler: FairScheduler | None = None, **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_memory_mb = max_memory_mb
+        self.scheduler = scheduler
+
+    def dequeue_job_and_maintain_ttl(self, timeout, max_idle_time=None):
+        if self.scheduler is None:
+            return super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+        idle_since = time.monotonic()
+        while not self._stop_requested:
+            idle_left = math.inf
+            if max_idle_time is not None:
+                idle_left = max_idle_time - (time.monotonic() - idle_since)
+                if idle_left <= 0:
+                    return None  # rq then stops the worker (--max-idle-time)
+            self._ordered_queues = self.scheduler.order(self.queues)
+            if not self._ordered_queues:
+                # Every class is at its cap
+                self.heartbeat()
+                time.sleep(1.0)
+                continue
+            if timeout is None:  # burst mode: single pass
+                return super().dequeue_job_and_maintain_ttl(None, max_idle_time)
+            # Come back to re-order queues at least every poll_seconds
+            poll = max(1, math.ceil(min(timeout, self.poll_seconds, idle_left)))
+            result = super().dequeue_job_and_maintain_ttl(poll, max_idle_time=poll)
+            if result is not None:
+                return result
+        return None
+
+    def reorder_queues(self, reference_queue):
+        if self.scheduler is None:
+            super().reorder_queues(reference_queue)
+
+    def execute_job(self, job, queue):
+        cls = class_of(queue.name) if self.scheduler is not None else None
+        if cls and not self.scheduler.job_started(cls, job.id, job.timeout):
+            # Another worker took the class's last slot after our queues were ordered
+            logger.info(f"Ingest class {cls} at its cap, returning job {job.id} to the queue")
+            self._requeue(job, queue)
+            return
+        started = time.time()
+        try:
+            super().execute_job(job, queue)
+        finally:
+            if cls:
+                enqueued = job.enqueued_at or datetime.now(UTC)
+                if enqueued.tzinfo is None:
+                    enqueued = enqueued.replace(tzinfo=UTC)
+                self.scheduler.job_finished(
+                    cls,
+                    job.id,
+                    wait_ms=max(0.0, (started - enqueued.timestamp()) * 1000),
+                    run_ms=(time.time() - started) * 1000,
+                )
+        if self.max_memory_mb and rss_mb() > self.max_memory_mb:
+            logger.info(f"Worker {self.name} above {self.max_memory_mb} MB, recycling")
+            self._stop_requested = True
+
+    def _requeue(self, job, queue) -> None:
+        """Put a dequeued, not yet started job back at the head of its queue."""
+        with self.connection.pipeline() as pipe:
+            pipe.lrem(queue.intermediate_queue_key, 1, job.id)
+            queue.push_job_id(job.id, pipeline=pipe, at_front=True)
+            pipe.execute()
+
+
+def _child_main(queues: list[str], redis_url: str, max_jobs: int, max_memory_mb: int) -> None:
+    configure_logging()
+    warm_up(clients=True)
     conn = Redis.from_url(redis_url)
-    with Connection(conn):
-        worker = Worker(list(map(str, listen)))
-        worker.work()
+    scheduler = FairScheduler(
+        conn,
+        weights=parse_class_map(settings.ingest_queue_weights),
+        caps=parse_class_map(settings.ingest_class_max_concurrency),
+    )
+    worker = WarmWorker(queues, connection=conn, max_memory_mb=max_memory_mb, scheduler=scheduler)
+    worker.work(max_jobs=max_jobs or None)
 
 
-if __name__ == "__main__":  # pragma: no cover
-    run()
+class WorkerPool:
+    """
+    Keeps ``concurrency`` worker processes running, respawning any that exit.
+
+    Workers exit after ``max_jobs`` jobs or when they cross ``max_memory_mb``; the
+    replacement forks from the warmed supervisor. After ``stop`` exited workers are only
+    reaped.
+    """
+
+    def __init__(self, ctx, target, args: tuple, concurrency: int) -> None:
+        self.ctx = ctx
+        self.target = target
+        self.args = args
+        self.concurrency = concurrency
+        self.procs: dict[int, mp.process.BaseProcess] = {}
+        self.stopping = False
+
+    def start(self) -> None:
+        for slot in range(self.concurrency):
+            self._spawn(slot)
+
+    def _spawn(self, slot: int) -> None:
+        p = self.ctx.Process(target=self.target, args=self.args, name=f"warm-worker-{slot}")
+        p.start()
+        self.procs[slot] = p
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+        # Ctrl+C already reaches the whole process group; only forward SIGTERM so workers
+        # get exactly one signal (a second one would cold-kill the running job)
+        if signum == signal.SIGTERM:
+            for p in self.procs.values():
+                if p.is_alive() and p.pid:
+                    os.kill(p.pid, signal.SIGTERM)
+
+    def reap(self) -> None:
+        """Join exited workers and, unless stopping, start replacements in their slots."""
+        for slot, p in list(self.procs.items()):
+            if p.is_alive():
+                continue
+            p.join()
+            del self.procs[slot]
+            if not self.stopping:
+                logger.info(f"Worker slot {slot} exited ({p.exitcode}), respawning")
+                self._spawn(slot)
+
+    def run(self, poll_s: float = 1.0) -> None:
+        self.start()
+        while self.procs:
+            time.sleep(poll_s)
+            self.reap()
 
 
+def run_pool(
+    queues: list[str],
+    redis_url: str,
+    concurrency: int,
+    max_jobs: int,
+    max_memory_mb: int,
+) -> None:
+    """Warm up once, then supervise ``concurrency`` warm worker processes."""
+    warm_up(clients=False)
+    methods = mp.get_all_start_methods()
+    ctx = mp.get_context("fork" if "fork" in methods else "spawn")
+    pool = WorkerPool(ctx, _child_main, (queues, redis_url, max_jobs, max_memory_mb), concurrency)
+    signal.signal(signal.SIGTERM, pool.stop)
+    signal.signal(signal.SIGINT, pool.stop)
+
+    logger.info(f"Starting {concurrency} warm workers on {queues}")
+    pool.run()
+
+
+def run() -> None:  # pragma: no cover - convenience
+    parser = argparse.ArgumentParser(description="Run warm, non-forking ingest workers")
+    parser.add_argument("--queues", default=settings.worker_queues)
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency)
+    parser.add_argument("--max-jobs", type=int, default=settings.worker_max_jobs)
+    parser.add_argument("--max-memory-mb", type=int, default=settings.worker_max_memory_mb)
+    args = parser.parse_args()
+
+    configure_logging()
+    run_pool(
+        queues=[q.strip() for q in args.queues.split(",") if q.strip()],
+        redis_url=os.getenv("REDIS_URL", settings.redis_url),
+        concurrency=max(1, args.concurrency),
+        max_jobs=args.max_jobs,
+        max_memory_mb=args.max_memory_mb,
+    )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    run()
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 """
 Simple RQ Worker Starter Script
+
+Starts the warm worker pool (see app/workers/worker.py); accepts the same flags,
+e.g. --concurrency 4 --max-jobs 200.
 """
-import os
 import sys
 from pathlib import Path
 
@@ -10,23 +12,12 @@ from pathlib import Path
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
-from rq import Worker, Queue
-from redis import Redis
+from app.workers.worker import run  # noqa: E402 - needs the path above
+
 
 def main():
-    # Connect to Redis
-    redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
-    redis_conn = Redis.from_url(redis_url)
-    
-    # Create queue
-    queue = Queue('ingest', connection=redis_conn)
-    
-    # Create and start worker
-    print(f"Starting RQ worker for queue 'ingest' on {redis_url}")
-    print("Press Ctrl+C to stop")
-    
-    worker = Worker([queue], connection=redis_conn)
-    worker.work()
+    print("Starting warm RQ workers (Press Ctrl+C to stop)")
+    run()
 
 if __name__ == "__main__":
     main()
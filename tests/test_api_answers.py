@@ -5,3 +5,93 @@ def test_system_prompt_contains_rules():
     s = build_system_prompt()
     assert "ONLY" in s and "[page" in s
 
+
+
+def test_batch_answers_share_retrieval(monkeypatch):
+    import json
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services.answerer.answerer import Answer
+
+    calls = {"embed": 0, "search": 0}
+
+    class FakeEmbedder:
+        def embed_texts(self, texts):
+            calls["embed"] += 1
+            return [[0.1, 0.2, 0.3] for _ in texts]
+
+    class FakeVectorStore:
+        def search_batch(self, namespace, query_vectors, k):
+            calls["search"] += 1
+            payload = {"chunk_id": "c1", "text": "Hello world.", "page_start": 1, "page_end": 1}
+            return [[{"id": "c1", "score": 0.9, "payload": payload}] for _ in query_vectors]
+
+    monkeypatch.setattr("app.api.routes.answers.get_embedder", lambda: FakeEmbedder())
+    monkeypatch.setattr("app.api.routes.answers.get_vectorstore", lambda: FakeVectorStore())
+    used = [{"page": 1, "chunk_id": "c1", "text": "Hello world."}]
+    monkeypatch.setattr(
+        "app.api.routes.answers.build_context",
+        lambda hits, max_tokens: ("[page 1]\nHello world.\n\n", used),
+    )
+    monkeypatch.setattr(
+        "app.api.routes.answers.generate_answer",
+        lambda **kw: Answer(
+            text=f"{kw['question']} [page 1]",
+            citations=[{"page": 1, "chunk_id": "c1"}],
+            snippets=None,
+            confidence=1.0,
+        ),
+    )
+
+    client = TestClient(app)
+    questions = ["What is it?", "Where is it?", "Why?"]
+    r = client.post(
+        "/v1/answers/batch",
+        json={"questions": questions, "docIds": ["00000000-0000-0000-0000-000000000001"]},
+    )
+    assert r.status_code == 200, r.text
+    lines = [json.loads(line) for line in r.text.splitlines() if line]
+    assert sorted(item["index"] for item in lines) == [0, 1, 2]
+    assert all(item["result"]["answer"].startswith(item["question"]) for item in lines)
+    assert all("totalMs" in item["timings"] for item in lines)
+    assert calls == {"embed": 1, "search": 1}
+
+
+def test_identical_concurrent_questions_are_answered_once(monkeypatch):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from fastapi.testclient import TestClient
+
+    from app.api.routes import answers
+    from app.api.schemas.answers import AnswerResponse
+    from app.main import app
+
+    calls = []
+    started = threading.Event()
+
+    def slow_answer(question, doc_id, top_k, quote_mode):
+        calls.append(question)
+        started.set()
+        time.sleep(0.3)
+        return AnswerResponse(answer="42", citations=[], confidence=1.0, metrics={})
+
+    monkeypatch.setattr(answers, "_answer", slow_answer)
+    client = TestClient(app)
+    doc = "00000000-0000-0000-0000-000000000001"
+
+    def ask(question):
+        return client.post("/v1/answers", json={"question": question, "docIds": [doc]}).json()
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        first = pool.submit(ask, "What is the answer?")
+        started.wait(5)
+        others = [pool.submit(ask, q) for q in ("what is  the answer?", "WHAT IS THE ANSWER? ")]
+        results = [first.result()] + [f.result() for f in others]
+
+    assert len(calls) == 1
+    assert [r["answer"] for r in results] == ["42"] * 3
+    assert [r["metrics"].get("singleFlight") for r in results] == [None, "local", "local"]
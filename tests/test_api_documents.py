@@ -2,6 +2,7 @@ import io
 import json
 from uuid import UUID
 
+import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -35,7 +36,7 @@ def test_upload_document_and_ingest(monkeypatch, tmp_path):
         def enqueue(self, fn_name, doc_id):
             return fake_enqueue(fn_name, doc_id)
 
-    monkeypatch.setattr("app.api.routes.documents.get_redis_queue", lambda: FakeQ())
+    monkeypatch.setattr("app.api.routes.documents.get_redis_queue", lambda *a: FakeQ())
 
     # Monkeypatch parser to bypass real PDF parsing
     fake_pages = ([{"page": 1, "text": "Hello world.", "blocks": [], "lang": None}], {"total_pages": 1})
@@ -73,3 +74,354 @@ def test_upload_document_and_ingest(monkeypatch, tmp_path):
     r2 = client.get(f"/v1/documents/{doc_id}")
     assert r2.status_code in (200, 404)
 
+
+
+def test_duplicate_upload_creates_alias_without_ingest(monkeypatch, tmp_path):
+    from app.core.config import settings
+    from app.db.models import Document
+    from app.deps import sanitize_namespace
+
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "dedupe_policy", "alias")
+    content = _make_pdf_bytes()
+    source = Document(
+        name="a.pdf", sha256="x", bytes=len(content), pages=3, chunks=7, status="ready"
+    )
+    (tmp_path / "blobs").mkdir()
+    (tmp_path / "blobs" / f"{source.id}.pdf").write_bytes(content)
+
+    def create_alias(src, name, batch_id=None):
+        return Document(
+            name=name,
+            sha256=src.sha256,
+            bytes=src.bytes,
+            pages=src.pages,
+            chunks=src.chunks,
+            status="ready",
+            source_id=src.id,
+        )
+
+    aliased = []
+
+    class FakeVectorStore:
+        def alias_namespace(self, namespace, target):
+            aliased.append((namespace, target))
+
+    class FailQ:
+        def enqueue(self, *args, **kwargs):
+            raise AssertionError("duplicate upload must not be ingested")
+
+    monkeypatch.setattr("app.db.repo.find_ready_by_sha256", lambda sha: source)
+    monkeypatch.setattr("app.db.repo.create_alias", create_alias)
+    monkeypatch.setattr("app.api.routes.documents.get_vectorstore", lambda: FakeVectorStore())
+    monkeypatch.setattr("app.api.routes.documents.get_redis_queue", lambda *a: FailQ())
+
+    r = client.post("/v1/documents", files={"file": ("b.pdf", content, "application/pdf")})
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["status"] == "ready" and data["docId"] != str(source.id)
+    assert aliased == [(sanitize_namespace(data["docId"]), sanitize_namespace(str(source.id)))]
+    assert (tmp_path / "blobs" / f"{data['docId']}.pdf").read_bytes() == content
+
+    monkeypatch.setattr(settings, "dedupe_policy", "existing")
+    r = client.post("/v1/documents", files={"file": ("b.pdf", content, "application/pdf")})
+    assert r.json()["docId"] == str(source.id)
+
+
+def test_delete_forgets_the_alias_namespace_mapping(monkeypatch, tmp_path):
+    from uuid import uuid4
+
+    from app.core.config import settings
+    from app.db.models import Document
+    from app.deps import canonical_namespace, sanitize_namespace
+
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    source_id = uuid4()
+    alias = Document(name="b.pdf", sha256="x", bytes=1, status="ready", source_id=source_id)
+    rows = {alias.id: alias}
+
+    class FakeVectorStore:
+        def delete_namespace(self, namespace):
+            pass
+
+    monkeypatch.setattr("app.db.repo.get_document", lambda doc_id: rows.get(doc_id))
+    monkeypatch.setattr("app.db.repo.count_aliases", lambda doc_id: 1)
+    monkeypatch.setattr("app.db.repo.delete_document", lambda doc_id: rows.pop(doc_id))
+    monkeypatch.setattr("app.api.routes.documents.get_vectorstore", lambda: FakeVectorStore())
+
+    namespace = sanitize_namespace(str(alias.id))
+    canonical_namespace.cache_clear()
+    assert canonical_namespace(namespace) == sanitize_namespace(str(source_id))
+    assert client.delete(f"/v1/documents/{alias.id}").status_code == 200
+    assert canonical_namespace(namespace) == namespace
+
+
+def test_bulk_upload_archive_inserts_batch_and_enqueues_once(monkeypatch, tmp_path):
+    import zipfile
+
+    from app.core.config import settings
+    from app.db.models import Document
+
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "dedupe_policy", "off")
+    (tmp_path / "blobs").mkdir()
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("docs/a.pdf", b"%PDF-1.4\n%a\n")
+        zf.writestr("docs/b.pdf", b"%PDF-1.4\n%b\n")
+        zf.writestr("docs/readme.txt", b"not a pdf")
+
+    created = []
+
+    def create_documents(items, batch_id=None):
+        docs = [Document(**item, status="queued", batch_id=batch_id) for item in items]
+        created.extend(docs)
+        return docs
+
+    def batch_status_counts(batch_id):
+        return {"queued": sum(1 for d in created if str(d.batch_id) == str(batch_id))}
+
+    enqueued = []
+    monkeypatch.setattr("app.db.repo.create_documents", create_documents)
+    monkeypatch.setattr("app.db.repo.batch_status_counts", batch_status_counts)
+    monkeypatch.setattr(
+        "app.api.routes.documents._enqueue_ingest_many", lambda jobs: enqueued.append(jobs)
+    )
+
+    r = client.post(
+        "/v1/documents/bulk",
+        files=[
+            ("archive", ("docs.zip", buf.getvalue(), "application/zip")),
+            ("files", ("c.pdf", b"%PDF-1.4\n%c\n", "application/pdf")),
+        ],
+    )
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert len(data["documents"]) == 3 and data["errors"] == []
+    assert len(enqueued) == 1 and len(enqueued[0]) == 3
+    assert all(queue == "ingest-small" for _, queue in enqueued[0])
+    for doc in data["documents"]:
+        assert (tmp_path / "blobs" / f"{doc['docId']}.pdf").exists()
+
+    r = client.get(f"/v1/documents/batches/{data['batchId']}")
+    assert r.status_code == 200, r.text
+    assert r.json()["total"] == 3 and r.json()["counts"] == {"queued": 3}
+    assert r.json()["done"] is False
+
+
+def test_bulk_upload_dedupes_within_upload_and_aliases_in_one_insert(monkeypatch, tmp_path):
+    from app.core.config import settings
+    from app.db.models import Document
+
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "dedupe_policy", "alias")
+    (tmp_path / "blobs").mkdir()
+    known = b"%PDF-1.4\n%known\n"
+    source = Document(name="k.pdf", sha256="k", bytes=len(known), status="ready", chunks=2)
+    (tmp_path / "blobs" / f"{source.id}.pdf").write_bytes(known)
+
+    inserts = []
+
+    class FakeVectorStore:
+        def alias_namespace(self, namespace, target):
+            pass
+
+    monkeypatch.setattr(
+        "app.db.repo.find_ready_by_sha256s",
+        lambda shas: {sha: source for sha in shas if sha == _sha(known)},
+    )
+    monkeypatch.setattr(
+        "app.db.repo.create_documents", lambda items, batch_id=None: inserts.append(items)
+    )
+    monkeypatch.setattr("app.api.routes.documents.get_vectorstore", lambda: FakeVectorStore())
+    enqueued = []
+    monkeypatch.setattr(
+        "app.api.routes.documents._enqueue_ingest_many", lambda jobs: enqueued.extend(jobs)
+    )
+
+    new = b"%PDF-1.4\n%new\n"
+    r = client.post(
+        "/v1/documents/bulk",
+        files=[
+            ("files", ("a.pdf", new, "application/pdf")),
+            ("files", ("a-copy.pdf", new, "application/pdf")),
+            ("files", ("known.pdf", known, "application/pdf")),
+        ],
+    )
+    assert r.status_code == 200, r.text
+    a, a_copy, alias = r.json()["documents"]
+    assert a == a_copy and a["status"] == "queued"
+    assert alias["status"] == "ready" and alias["docId"] != str(source.id)
+    assert [doc_id for doc_id, _ in enqueued] == [a["docId"]]
+
+    # New document and alias rows go in together
+    (rows,) = inserts
+    assert [(row["name"], row.get("status")) for row in rows] == [
+        ("a.pdf", None),
+        ("known.pdf", "ready"),
+    ]
+    assert rows[1]["source_id"] == source.id
+    assert (tmp_path / "blobs" / f"{alias['docId']}.pdf").read_bytes() == known
+
+
+def test_bulk_insert_failure_removes_linked_aliases(monkeypatch, tmp_path):
+    from app.core.config import settings
+    from app.db.models import Document
+
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "dedupe_policy", "alias")
+    (tmp_path / "blobs").mkdir()
+    known = b"%PDF-1.4\n%known\n"
+    source = Document(name="k.pdf", sha256="k", bytes=len(known), status="ready", chunks=2)
+    (tmp_path / "blobs" / f"{source.id}.pdf").write_bytes(known)
+    aliases = set()
+
+    class FakeVectorStore:
+        def alias_namespace(self, namespace, target):
+            aliases.add(namespace)
+
+        def delete_namespace(self, namespace):
+            aliases.remove(namespace)
+
+    def locked(items, batch_id=None):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr("app.db.repo.find_ready_by_sha256s", lambda shas: {_sha(known): source})
+    monkeypatch.setattr("app.db.repo.create_documents", locked)
+    monkeypatch.setattr("app.api.routes.documents.get_vectorstore", lambda: FakeVectorStore())
+
+    with pytest.raises(RuntimeError, match="locked"):
+        client.post("/v1/documents/bulk", files=[("files", ("known.pdf", known, "application/pdf"))])
+    assert aliases == set()
+    assert [p.name for p in (tmp_path / "blobs").iterdir()] == [f"{source.id}.pdf"]
+
+
+def _sha(data: bytes) -> str:
+    import hashlib
+
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_list_documents_keyset_cursor(monkeypatch):
+    from datetime import datetime
+
+    from app.db.models import Document
+
+    docs = [
+        Document(name=f"{i}.pdf", sha256="x", bytes=1, created_at=datetime(2024, 1, 10 - i))
+        for i in range(5)
+    ]
+    calls = []
+
+    def list_documents(limit, status=None, after=None):
+        calls.append(after)
+        rest = [d for d in docs if after is None or (d.created_at, d.id) < after]
+        return rest[:limit]
+
+    monkeypatch.setattr("app.db.repo.list_documents", list_documents)
+
+    r = client.get("/v1/documents", params={"limit": 2})
+    assert [d["name"] for d in r.json()] == ["0.pdf", "1.pdf"]
+    cursor = r.headers["X-Next-Cursor"]
+
+    r = client.get("/v1/documents", params={"limit": 2, "cursor": cursor})
+    assert [d["name"] for d in r.json()] == ["2.pdf", "3.pdf"]
+    assert calls[-1] == (docs[1].created_at, docs[1].id)
+
+    assert client.get("/v1/documents", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def _fake_subscription(monkeypatch, latest, published):
+    import asyncio
+
+    class FakeHub:
+        async def latest(self, doc_id):
+            return latest
+
+        async def subscribe(self, doc_id):
+            queue = asyncio.Queue()
+            for event in published:
+                queue.put_nowait(event)
+            return queue
+
+        async def unsubscribe(self, doc_id, queue):
+            pass
+
+    monkeypatch.setattr("app.api.routes.documents.get_event_hub", lambda: FakeHub())
+
+
+def test_document_events_stream_until_terminal(monkeypatch):
+    doc_id = "6f1c1f4e-8f7e-4a53-9d7c-0a4c1b0e2d11"
+    latest = {"docId": doc_id, "seq": 2, "stage": "parsed", "pages": 10, "shards": 1}
+    published = [
+        {"docId": doc_id, "seq": 2, "stage": "parsed"},  # already sent as the latest event
+        {"docId": doc_id, "seq": 3, "stage": "embedding", "chunksEmbedded": 5, "chunks": 9},
+        {"docId": doc_id, "seq": 4, "stage": "ready", "pages": 10, "chunks": 9},
+    ]
+    _fake_subscription(monkeypatch, latest, published)
+    monkeypatch.setattr(
+        "app.db.repo.get_document", lambda _id: (_ for _ in ()).throw(AssertionError("no DB"))
+    )
+
+    r = client.get(f"/v1/documents/{doc_id}/events")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    stages = [line.split(": ", 1)[1] for line in r.text.splitlines() if line.startswith("event:")]
+    assert stages == ["parsed", "embedding", "ready"]
+
+    # Long-poll returns the first event newer than `since`
+    _fake_subscription(monkeypatch, latest, published)
+    r = client.get(f"/v1/documents/{doc_id}/events", params={"since": 2, "wait": 5})
+    assert r.json()["seq"] == 3 and r.json()["stage"] == "embedding"
+
+
+def test_event_streams_share_one_subscription(monkeypatch):
+    import asyncio
+
+    from app.workers import events
+
+    class FakePubSub:
+        def __init__(self):
+            self.channels = []
+            self.messages = asyncio.Queue()
+
+        async def subscribe(self, name):
+            self.channels.append(name)
+
+        async def unsubscribe(self, name):
+            self.channels.remove(name)
+
+        async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+            try:
+                return await asyncio.wait_for(self.messages.get(), timeout)
+            except TimeoutError:
+                return None
+
+    pubsub = FakePubSub()
+    monkeypatch.setattr(
+        "redis.asyncio.Redis.from_url",
+        lambda url: type("FakeRedis", (), {"pubsub": lambda self, **kw: pubsub})(),
+    )
+
+    async def scenario():
+        hub = events.EventHub("redis://unused")
+        first, second = await hub.subscribe("a"), await hub.subscribe("a")
+        other = await hub.subscribe("b")
+        assert pubsub.channels == [events.channel("a"), events.channel("b")]
+
+        event = {"docId": "a", "seq": 1, "stage": "parsed"}
+        await pubsub.messages.put(
+            {"channel": events.channel("a").encode(), "data": json.dumps(event).encode()}
+        )
+        assert await asyncio.wait_for(first.get(), 1) == event
+        assert await asyncio.wait_for(second.get(), 1) == event
+        assert other.empty()
+
+        await hub.unsubscribe("a", first)
+        assert events.channel("a") in pubsub.channels
+        await hub.unsubscribe("a", second)
+        await hub.unsubscribe("b", other)
+        assert pubsub.channels == []
+
+    asyncio.run(scenario())
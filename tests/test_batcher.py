@@ -0,0 +1,112 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import deadline
+from app.bench.stubs import StubEmbedder, StubVectorStore
+from app.core.config import settings
+from app.services.retriever.batcher import Activity, MicroBatcher, retrievals
+from app.services.retriever.retriever import Retriever
+
+
+class RecordingEmbedder(StubEmbedder):
+    def __init__(self) -> None:
+        super().__init__(dim=32)
+        self.calls: list[int] = []
+
+    def embed_texts(self, texts):
+        self.calls.append(len(texts))
+        return super().embed_texts(texts)
+
+
+def test_concurrent_searches_share_embedding_and_search_calls(monkeypatch):
+    monkeypatch.setattr(settings, "query_batch_window_ms", 2000.0)
+    monkeypatch.setattr(settings, "query_batch_max_size", 8)
+    embedder = RecordingEmbedder()
+    store = StubVectorStore()
+    texts = [f"chunk {i} about topic {i % 5}" for i in range(20)]
+    store.upsert(
+        "doc",
+        [
+            {"id": i, "vector": v, "payload": {"chunk_id": str(i), "text": t}}
+            for i, (t, v) in enumerate(zip(texts, embedder.embed_texts(texts), strict=True))
+        ],
+    )
+    searches = []
+    search_batch = store.search_batch
+
+    def recording_search_batch(**kw):
+        searches.append(len(kw["query_vectors"]))
+        return search_batch(**kw)
+
+    monkeypatch.setattr(store, "search_batch", recording_search_batch)
+    retriever = Retriever(embedder=embedder, vectorstore=store)
+
+    # A lone search is not held back by the window
+    embedder.calls.clear()
+    start = time.perf_counter()
+    retriever.search(texts[0], "doc", 5, 3)
+    assert time.perf_counter() - start < 1.0
+    assert embedder.calls == [1]
+
+    embedder.calls.clear()
+    with retrievals, ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(retriever.search, t, "doc", 5, 3) for t in texts[:8]]
+        results = [f.result(timeout=10) for f in futures]
+    assert embedder.calls == [8]
+    assert searches == [8]
+    for text, result in zip(texts[:8], results, strict=True):
+        assert result.hits[0].chunk["text"] == text
+
+
+def test_batch_errors_reach_every_caller(monkeypatch):
+    monkeypatch.setattr(settings, "query_batch_window_ms", 2000.0)
+    monkeypatch.setattr(settings, "query_batch_max_size", 3)
+    activity = Activity()
+    batcher = MicroBatcher("test", activity)
+
+    def failing(items):
+        raise ValueError(f"upstream down for {len(items)}")
+
+    def call(i):
+        with activity:
+            return batcher.submit("k", i, failing)
+
+    with activity, ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(call, i) for i in range(3)]
+        for fut in futures:
+            with pytest.raises(ValueError, match="upstream down for 3"):
+                fut.result(timeout=10)
+
+
+def test_batch_runs_under_the_latest_callers_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "query_batch_window_ms", 2000.0)
+    monkeypatch.setattr(settings, "query_batch_max_size", 2)
+    activity = Activity()
+    batcher = MicroBatcher("test", activity)
+    budgets = []
+
+    def record(items):
+        budgets.append(deadline.remaining())
+        return items
+
+    def call(i, seconds):
+        with activity, deadline.scope(seconds):
+            return batcher.submit("k", i, record)
+
+    with activity, ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(call, 0, 1.0)
+        time.sleep(0.05)
+        follower = pool.submit(call, 1, 30.0)
+        assert [leader.result(timeout=10), follower.result(timeout=10)] == [0, 1]
+    # The call gets the follower's 30s, not the leader's 1s
+    assert budgets[0] > 20
+
+    budgets.clear()
+    with activity, ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(call, 0, 1.0)
+        time.sleep(0.05)
+        follower = pool.submit(call, 1, None)
+        assert [leader.result(timeout=10), follower.result(timeout=10)] == [0, 1]
+    assert budgets == [None]
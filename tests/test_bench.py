@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import re
+
+import numpy as np
+import pytest
+
+from app.bench import ingest, load, retrieval
+from app.bench.synthetic import PdfSpec, make_pdf
+from app.core.config import settings
+from app.services.chunker.chunker import Chunk
+from app.services.parser.pdf_pymupdf import parse_pdf_pymupdf
+from app.services.retriever.retriever import Hit
+
+DOC_ID = "00000000-0000-0000-0000-0000000000e1"
+
+
+def test_synthetic_pdf_is_deterministic_and_has_tables(tmp_path):
+    spec = PdfSpec(pages=4, words_per_page=200, table_ratio=1.0, seed=7)
+    a = parse_pdf_pymupdf(make_pdf(str(tmp_path / "a.pdf"), spec))[0]
+    b = parse_pdf_pymupdf(make_pdf(str(tmp_path / "b.pdf"), spec))[0]
+    assert len(a) == 4 and [p["text"] for p in a] == [p["text"] for p in b]
+    assert all(" | " in p["text"] for p in a)
+
+
+def test_ingest_benchmark_reports_rates_and_flags_regressions(monkeypatch):
+    def chunk_pages(doc_id, pages):
+        chunks = [
+            Chunk(f"{doc_id}-{p['page']}", doc_id, p["page"], p["page"], None, "text", p["text"])
+            for p in pages
+        ]
+        return chunks, {"chunks": len(chunks), "type_breakdown": {"text": len(chunks)}}
+
+    monkeypatch.setattr(ingest, "chunk_pages", chunk_pages)
+    result = ingest.run(
+        ingest.specs_from_args([3], [100], [0.0, 0.5]), repeats=2, dim=8, isolate=False
+    )
+
+    assert [c["case"] for c in result["cases"]] == ["p3-w100-t0", "p3-w100-t0.5"]
+    case = result["cases"][0]
+    assert case["pages"] == 3 and case["chunks"] == 3 and case["repeats"] == 2
+    assert set(case["stageSeconds"]) == {"parse", "chunk", "embed", "upsert"}
+    assert case["pagesPerS"] > 0 and case["peakRssMb"] > 0
+
+    assert ingest.compare(result, result) == []
+    faster = {"cases": [dict(case, parsePagesPerS=case["parsePagesPerS"] * 2, chunks=4)]}
+    regressions = ingest.compare(result, faster)
+    assert len(regressions) == 2 and regressions[0].startswith("p3-w100-t0 parsePagesPerS")
+
+
+@pytest.mark.parametrize("mode", ["asgi", "uvicorn"])
+def test_load_sweep_reports_latency_and_saturation(monkeypatch, mode):
+    used = [{"page": 1, "chunk_id": "bench-0", "text": "Revenue grew."}]
+    monkeypatch.setattr(
+        "app.api.routes.answers.build_context",
+        lambda hits, max_tokens: ("[page 1]\nRevenue grew.\n\n", used),
+    )
+    result = load.run(
+        [1, 4],
+        duration_s=0.4,
+        warmup_s=0.1,
+        latency=load.StubLatency(embed_ms=1, search_ms=1, chat_ms=5),
+        mode=mode,
+        chunks=50,
+        dim=16,
+    )
+
+    assert [level["concurrency"] for level in result["levels"]] == [1, 4]
+    for level in result["levels"]:
+        assert level["errors"] == {} and level["requests"] > 0
+        assert 5 <= level["latencyMs"]["p50"] <= level["latencyMs"]["p99"]
+        assert level["threadpool"]["size"] > 0 and level["threadpool"]["busyMax"] >= 1
+        assert level["loopLagMs"]["max"] >= 0
+
+    assert load.compare(result, result) == []
+    slower = {"levels": [dict(level, rps=level["rps"] * 2) for level in result["levels"]]}
+    assert [r.split()[1] for r in load.compare(result, slower)] == ["rps:", "rps:"]
+
+
+def test_load_level_logs_the_first_failure_of_each_kind(caplog):
+    class Failing:
+        async def post_json(self, path, body):
+            raise RuntimeError("Could not load the cl100k_base tokenizer")
+
+        def close(self):
+            pass
+
+    async def level():
+        monitor = load.LoopMonitor(asyncio.get_running_loop())
+        return await load.run_level(Failing, monitor, 2, duration_s=0.05, warmup_s=0)
+
+    with caplog.at_level("WARNING", logger="app.bench.load"):
+        result = asyncio.run(level())
+    assert result["requests"] == 0 and result["errors"]["RuntimeError"] > 1
+    assert [r.getMessage() for r in caplog.records] == [
+        "c=2: first RuntimeError: Could not load the cl100k_base tokenizer"
+    ]
+
+
+class BagOfWordsEmbedder:
+    model = "bow"
+
+    def embed_texts(self, texts):
+        out = np.zeros((len(texts), 64), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                out[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+        return out.tolist()
+
+    def embed_query(self, text):
+        return self.embed_texts([text])[0]
+
+
+def _hit(page):
+    return Hit(chunk={"page_start": page, "page_end": page, "text": ""}, score=1.0)
+
+
+def test_score_hits_counts_each_relevant_page_once():
+    scores = retrieval.score_hits([_hit(3), _hit(2), _hit(2), _hit(7)], {2, 7}, k=3)
+    assert scores["recall"] == 0.5 and scores["mrr"] == 0.5
+    assert round(scores["ndcg"], 4) == round((1 / np.log2(3)) / (1 + 1 / np.log2(3)), 4)
+    assert retrieval.score_hits([], {1}, k=5) == {"recall": 0.0, "mrr": 0.0, "ndcg": 0.0}
+
+
+def test_grid_over_memory_index_reports_quality_and_calls(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    topics = ["invoice payment due", "liability clause", "revenue growth quarter", "storage"]
+    pages = [
+        {"page": i, "text": f"The {t} section.", "blocks": [], "lang": None}
+        for i, t in enumerate(topics, start=1)
+    ]
+    with open(retrieval.parsed_path(DOC_ID), "w", encoding="utf-8") as f:
+        json.dump({"pages": pages, "meta": {}}, f)
+
+    def chunk_pages(doc_id, pages):
+        chunks = [
+            Chunk(f"{doc_id}-{p['page']}", doc_id, p["page"], p["page"], None, "text", p["text"])
+            for p in pages
+        ]
+        return chunks, {"chunks": len(chunks)}
+
+    monkeypatch.setattr(retrieval, "chunk_pages", chunk_pages)
+    # Listwise LLM rerank that prefers the storage page, whatever the question
+    class FakeClient:
+        def with_options(self, **kwargs):
+            return self
+
+    monkeypatch.setattr(retrieval.llm_score, "OpenAI", lambda **kw: FakeClient())
+    monkeypatch.setattr(
+        retrieval.llm_score, "chat_completion", lambda *a, **kw: '{"1": 0, "2": 0, "3": 0, "4": 5}'
+    )
+    questions = [
+        retrieval.LabelledQuestion("When is the invoice payment due?", DOC_ID, {1}),
+        retrieval.LabelledQuestion("What about revenue growth?", DOC_ID, {3}),
+    ]
+
+    grid = retrieval.parse_grid(["enable_rerank=false,true", "chunk_target_tokens=200,400"])
+    assert len(grid) == 4 and grid[0] == {"enable_rerank": False, "chunk_target_tokens": 200}
+    result = retrieval.run(
+        questions, grid, cutoff=1, index="memory", embedder=BagOfWordsEmbedder()
+    )
+
+    by_config = {tuple(c["config"].values()): c for c in result["configs"]}
+    plain, reranked = by_config[(False, 200)], by_config[(True, 200)]
+    assert plain["recall@1"] == 1.0 and plain["mrr"] == 1.0 and plain["llmCallsPerQuery"] == 0
+    assert reranked["recall@1"] == 0.0 and reranked["llmCallsPerQuery"] == 1
+    assert plain["embeddingCallsPerQuery"] == 1
+    # One index per chunking configuration, shared by the rerank on/off grid points
+    assert result["indexEmbeddingCalls"] == 2
+    assert settings.enable_rerank is False  # overrides are restored
+
+    best = retrieval.cheapest(result, min_recall=0.9)
+    assert best["config"]["enable_rerank"] is False
+    assert "recall@1" in retrieval.format_table(result)
@@ -0,0 +1,133 @@
+import numpy as np
+
+from app import cli
+
+
+def test_ingest_dir_shares_embedding_batches_and_resumes(monkeypatch, tmp_path):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path / "data"))
+    src = tmp_path / "pdfs"
+    src.mkdir()
+    for name in ("a", "b", "c"):
+        (src / f"{name}.pdf").write_bytes(f"%PDF-1.4 {name}".encode())
+    (src / "dup.pdf").write_bytes(b"%PDF-1.4 a")
+
+    pages = [{"page": i, "text": f"Page {i}.", "blocks": [], "lang": None} for i in (1, 2, 3)]
+    monkeypatch.setattr(cli, "parse_pdf_pymupdf", lambda path: (pages, {"total_pages": 3}))
+
+    def chunk_pages(doc_id, pages):
+        chunks = [
+            cli.Chunk(f"{doc_id}-{p['page']}", doc_id, p["page"], p["page"], None, "text", p["text"])
+            for p in pages
+        ]
+        return chunks, {"chunks": len(chunks)}
+
+    monkeypatch.setattr(cli, "chunk_pages", chunk_pages)
+
+    committed = []
+
+    def create_documents(items, batch_id=None):
+        committed.extend(items)
+        return items
+
+    monkeypatch.setattr(cli.repo, "create_documents", create_documents)
+    monkeypatch.setattr(
+        cli.repo,
+        "find_ready_by_sha256s",
+        lambda hashes: {d["sha256"]: d for d in committed if d["sha256"] in hashes},
+    )
+
+    batches = []
+    upserts = []
+
+    class FakeEmbedder:
+        def embed_texts(self, texts):
+            batches.append(len(texts))
+            return [[0.1, 0.2] for _ in texts]
+
+    class FakeVectorStore:
+        def upsert(self, namespace, vectors):
+            upserts.append((namespace, len(vectors)))
+
+    report = cli.ingest_dir(
+        str(src),
+        workers=0,
+        batch_size=4,
+        commit_every=2,
+        embedder=FakeEmbedder(),
+        vectorstore=FakeVectorStore(),
+    )
+    # 3 unique docs x 3 chunks = 9 chunks, embedded in full batches across documents
+    assert batches == [4, 4, 1]
+    assert report["docs"] == 3 and report["vectors"] == 9 and report["skipped"] == 1
+    assert sum(n for _, n in upserts) == 9
+    assert len(committed) == 3 and all(d["status"] == "ready" for d in committed)
+    assert report["vectorsPerS"] > 0
+    for d in committed:
+        vectors = np.load(tmp_path / "data" / "chunks" / f"{d['id']}.vectors.npy")
+        assert vectors.shape == (3, 2)
+
+    # Re-running resumes: everything is already ingested
+    batches.clear()
+    report = cli.ingest_dir(
+        str(src), workers=0, batch_size=4, embedder=FakeEmbedder(), vectorstore=FakeVectorStore()
+    )
+    assert report["docs"] == 0 and report["skipped"] == 4 and batches == []
+
+
+def test_failed_embedding_batch_fails_only_its_documents(monkeypatch, tmp_path):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path / "data"))
+    src = tmp_path / "pdfs"
+    src.mkdir()
+    for name in ("a", "b", "c"):
+        (src / f"{name}.pdf").write_bytes(f"%PDF-1.4 {name}".encode())
+
+    def parse(path):
+        name = path.rsplit("/", 1)[-1][0]
+        return [{"page": i, "text": f"{name}{i}"} for i in (1, 2, 3)], {"total_pages": 3}
+
+    def chunk_pages(doc_id, pages):
+        chunks = [
+            cli.Chunk(f"{doc_id}-{p['page']}", doc_id, p["page"], p["page"], None, "text", p["text"])
+            for p in pages
+        ]
+        return chunks, {"chunks": len(chunks)}
+
+    monkeypatch.setattr(cli, "parse_pdf_pymupdf", parse)
+    monkeypatch.setattr(cli, "chunk_pages", chunk_pages)
+    committed = []
+    monkeypatch.setattr(cli.repo, "create_documents", lambda items: committed.extend(items))
+    monkeypatch.setattr(cli.repo, "find_ready_by_sha256s", lambda hashes: {})
+
+    class FlakyEmbedder:
+        def embed_texts(self, texts):
+            if "b1" in texts:
+                raise RuntimeError("upstream 503")
+            return [[0.1, 0.2] for _ in texts]
+
+    upserted, dropped = [], []
+
+    class FakeVectorStore:
+        def upsert(self, namespace, vectors):
+            upserted.extend(p["payload"]["text"] for p in vectors)
+
+        def delete_namespace(self, namespace):
+            dropped.append(namespace)
+
+    # a1 a2 a3 b1 fails as one batch: a and b fail, b's remaining chunks are not embedded
+    report = cli.ingest_dir(
+        str(src),
+        workers=0,
+        batch_size=4,
+        embedder=FlakyEmbedder(),
+        vectorstore=FakeVectorStore(),
+    )
+    assert report["docs"] == 1 and report["failed"] == 2 and report["vectors"] == 3
+    assert upserted == ["c1", "c2", "c3"]
+    assert [d["name"] for d in committed] == ["c.pdf"]
+    assert len(dropped) == 2
+    blobs = list((tmp_path / "data" / "blobs").iterdir())
+    assert [b.name for b in blobs] == [f"{committed[0]['id']}.pdf"]
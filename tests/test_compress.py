@@ -0,0 +1,37 @@
+from app.services.answerer import compress
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def test_compress_keeps_relevant_sentences_with_pages(monkeypatch):
+    monkeypatch.setattr(compress, "_num_tokens", _words)
+    chunks = [
+        {"page": 1, "chunk_id": "a", "text": "The sky was grey. Filler sentence about nothing."},
+        {
+            "page": 4,
+            "chunk_id": "b",
+            "text": "Unrelated words here. The invoice total is 420 dollars.",
+        },
+    ]
+    context, kept, stats = compress.compress_context(
+        "What is the invoice total?", chunks, max_tokens=10
+    )
+    assert context == "[page 4]\nThe invoice total is 420 dollars.\n\n"
+    assert kept == [{"page": 4, "chunk_id": "b", "text": "The invoice total is 420 dollars."}]
+    assert stats["tokensAfter"] < stats["tokensBefore"]
+
+
+def test_compress_uses_query_embedding(monkeypatch):
+    monkeypatch.setattr(compress, "_num_tokens", _words)
+
+    class FakeEmbedder:
+        def embed_texts(self, texts):
+            return [[1.0, 0.0] if "revenue" in t.lower() else [0.0, 1.0] for t in texts]
+
+    chunks = [{"page": 2, "chunk_id": "a", "text": "Sales grew strongly. Revenue hit a record."}]
+    context, _, _ = compress.compress_context(
+        "How did sales do?", chunks, max_tokens=8, query_vector=[1.0, 0.0], embedder=FakeEmbedder()
+    )
+    assert context == "[page 2]\nRevenue hit a record.\n\n"
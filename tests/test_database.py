@@ -0,0 +1,9 @@
+from sqlalchemy import text
+
+from app.db.database import engine
+
+
+def test_engine_uses_wal_and_busy_timeout():
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
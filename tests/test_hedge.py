@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from app import deadline
+from app.core.config import settings
+from app.core.errors import DeadlineExceededError
+from app.services.llm import hedge
+
+
+def _prime(name, seconds, n=20):
+    for _ in range(n):
+        hedge.tracker(name).record(seconds)
+
+
+def _first_slow(slow_s):
+    calls = []
+    lock = threading.Lock()
+
+    def fn(timeout):
+        with lock:
+            calls.append(timeout)
+            first = len(calls) == 1
+        if first:
+            time.sleep(slow_s)
+            return "primary"
+        return "hedge"
+
+    return fn, calls
+
+
+def test_slow_call_is_hedged_and_the_faster_attempt_wins(monkeypatch):
+    monkeypatch.setattr(hedge, "budget", hedge.HedgeBudget())
+    _prime("test-hedge-wins", 0.01)
+    fn, calls = _first_slow(1.0)
+
+    start = time.perf_counter()
+    with deadline.scope(5):
+        assert hedge.call("test-hedge-wins", fn) == "hedge"
+    assert time.perf_counter() - start < 0.5
+    assert len(calls) == 2 and all(0 < t <= 5 for t in calls)
+
+
+def test_budget_caps_hedges(monkeypatch):
+    monkeypatch.setattr(hedge, "budget", hedge.HedgeBudget())
+    monkeypatch.setattr(settings, "hedge_budget_burst", 1.0)
+    monkeypatch.setattr(settings, "hedge_budget_ratio", 0.0)
+    _prime("test-hedge-budget", 0.01)
+
+    with deadline.scope(5):
+        fn, calls = _first_slow(0.1)
+        assert hedge.call("test-hedge-budget", fn) == "hedge"
+        fn, calls = _first_slow(0.1)
+        assert hedge.call("test-hedge-budget", fn) == "primary"
+    assert len(calls) == 1
+
+
+def test_no_deadline_runs_directly_and_expired_deadline_raises():
+    assert hedge.call("test-hedge-direct", lambda timeout: timeout, cap=3.0) == 3.0
+
+    _prime("test-hedge-deadline", 0.01)
+    with deadline.scope(0.2), pytest.raises(DeadlineExceededError):
+        hedge.call("test-hedge-deadline", lambda timeout: time.sleep(2))
+
+
+def test_answer_route_returns_504_once_the_deadline_passes(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.api.routes import answers
+    from app.main import app
+
+    class SlowEmbedder:
+        def embed_query(self, text):
+            time.sleep(0.3)
+            return [0.0, 1.0]
+
+    monkeypatch.setattr(settings, "query_batching_enabled", False)
+    monkeypatch.setattr(answers, "get_embedder", lambda: SlowEmbedder())
+    monkeypatch.setattr(answers, "get_vectorstore", lambda: None)
+    r = TestClient(app).post(
+        "/v1/answers",
+        json={"question": "q", "docIds": ["00000000-0000-0000-0000-000000000001"]},
+        headers={deadline.TIMEOUT_HEADER: "100"},
+    )
+    assert r.status_code == 504
+    assert r.json()["code"] == "deadline_exceeded"
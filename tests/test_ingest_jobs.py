@@ -0,0 +1,121 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.core.errors import IngestionError
+from app.services.chunker.chunker import Chunk
+from app.services.vectorstore.artifacts import reindex_document
+from app.workers import jobs
+
+
+def _fake_chunk_pages(doc_id, pages):
+    chunks = [
+        Chunk(
+            id=str(uuid.uuid4()),
+            doc_id=doc_id,
+            page_start=p["page"],
+            page_end=p["page"],
+            section=None,
+            type="text",
+            text=p["text"],
+        )
+        for p in pages
+    ]
+    return chunks, {"chunks": len(chunks), "type_breakdown": {"text": len(chunks)}}
+
+
+def test_ingest_resumes_at_failed_embedding_batch(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "ingest_shard_pages", 3)
+    monkeypatch.setattr(settings, "embedding_batch_size", 2)
+
+    pages = [{"page": i, "text": f"page {i}", "blocks": [], "lang": None} for i in range(1, 7)]
+    monkeypatch.setattr(jobs, "parse_pdf_pymupdf", lambda path: (pages, {"total_pages": 6}))
+    monkeypatch.setattr(jobs, "chunk_pages", _fake_chunk_pages)
+
+    statuses = []
+    monkeypatch.setattr(
+        jobs.repo, "update_status", lambda doc_id, status, **kw: statuses.append((status, kw))
+    )
+
+    published = []
+    monkeypatch.setattr(jobs, "publish_event", lambda doc_id, stage, **kw: published.append(stage))
+
+    embedded: list[str] = []
+    fail_on = {"page 3"}
+
+    class FlakyEmbedder:
+        def embed_texts(self, texts):
+            if fail_on & set(texts):
+                raise RuntimeError("upstream 503")
+            embedded.extend(texts)
+            return [[float(t.split()[1]), 0.5] for t in texts]
+
+    class FakeVectorStore:
+        def upsert(self, namespace, vectors):
+            return None
+
+    monkeypatch.setattr(jobs, "get_embedder", lambda: FlakyEmbedder())
+    monkeypatch.setattr(jobs, "get_vectorstore", lambda: FakeVectorStore())
+
+    doc_id = str(uuid.uuid4())
+    jobs.ingest(doc_id)
+    assert statuses[-1][0] == "failed"
+    assert embedded == ["page 1", "page 2"]
+    assert published == ["processing", "parsed", "chunked", "embedding", "failed"]
+
+    fail_on.clear()
+    jobs.ingest(doc_id)
+    assert statuses[-1] == ("ready", {"pages": 6, "chunks": 6})
+    assert published[-1] == "ready" and published.count("embedding") == 4
+    # Batch 1 of shard 0 was not re-embedded
+    assert embedded == [f"page {i}" for i in range(1, 7)]
+    assert not (tmp_path / "checkpoints" / doc_id).exists()
+
+    # The vector artifact follows chunks.json order and rebuilds the store without embedding
+    vectors = np.load(tmp_path / "chunks" / f"{doc_id}.vectors.npy")
+    assert vectors.dtype == np.float16 and vectors.shape == (6, 2)
+    assert vectors[:, 0].tolist() == [1, 2, 3, 4, 5, 6]
+
+    class RecordingStore:
+        points: list[dict] = []
+
+        def upsert(self, namespace, vectors):
+            self.points.extend(vectors)
+
+    store = RecordingStore()
+    written = reindex_document(
+        store,
+        "doc_x",
+        str(tmp_path / "chunks" / f"{doc_id}.chunks.json"),
+        str(tmp_path / "chunks" / f"{doc_id}.vectors.npy"),
+        batch_size=4,
+    )
+    assert written == 6
+    assert [(p["payload"]["text"], p["vector"][0]) for p in store.points] == [
+        (f"page {i}", float(i)) for i in range(1, 7)
+    ]
+
+
+@pytest.mark.parametrize("stage", [jobs.chunk_shard, jobs.embed_shard, jobs.finalize_ingest])
+def test_stage_without_its_checkpoint_fails_the_document(monkeypatch, tmp_path, stage):
+    # e.g. a fan-out job picked up by a worker that does not share data_dir
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    statuses = []
+    monkeypatch.setattr(
+        jobs.repo, "update_status", lambda doc_id, status, **kw: statuses.append(status)
+    )
+    monkeypatch.setattr(jobs, "publish_event", lambda doc_id, stage, **kw: None)
+
+    args = () if stage is jobs.finalize_ingest else (0,)
+    with pytest.raises(IngestionError, match="checkpoint"):
+        stage(str(uuid.uuid4()), *args)
+    assert statuses == ["failed"]
+
+
+@pytest.mark.parametrize("total,size,expected", [(5, 2, [(0, 2), (2, 4), (4, 5)]), (0, 2, [])])
+def test_shard_ranges(monkeypatch, total, size, expected):
+    monkeypatch.setattr(settings, "ingest_shard_pages", size)
+    assert jobs._shard_ranges(total) == expected
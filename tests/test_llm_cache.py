@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+from app.services.llm import chat
+from app.services.llm.cache import LLMCache, make_key
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.db"), max_entries=2)
+    cache.put("a", "A", latency_ms=10)
+    cache.put("b", "B", latency_ms=10)
+    assert cache.get("a") == "A"  # touch a so b is the LRU entry
+    cache.put("c", "C", latency_ms=10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["savedMs"] == 30
+
+
+def test_chat_completion_memoizes_deterministic_calls(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / "llm.db"))
+    monkeypatch.setattr(chat, "get_llm_cache", lambda: cache)
+
+    calls = []
+
+    def create(**kw):
+        calls.append(kw)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="42"))])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    messages = [{"role": "user", "content": "q"}]
+
+    for _ in range(3):
+        assert chat.chat_completion(client, model="m", messages=messages, temperature=0) == "42"
+    assert len(calls) == 1
+
+    chat.chat_completion(client, model="m", messages=messages, use_cache=False, temperature=0)
+    chat.chat_completion(client, model="m", messages=messages, temperature=0.7)
+    assert len(calls) == 3
+    assert make_key("m", messages, {"temperature": 0}) != make_key("n", messages, {"temperature": 0})
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.telemetry import install_telemetry
+
+
+def test_histogram_buckets_are_cumulative_and_rendered_in_order():
+    registry = metrics.MetricsRegistry()
+    registry._ensure_flusher = lambda: None  # keep samples local
+    registry.observe(metrics.STAGE_DURATION, 30.0, pipeline="query", stage="embed")
+    registry.observe(metrics.STAGE_DURATION, 700.0, pipeline="query", stage="embed")
+    registry.inc(metrics.LLM_CACHE, result="hit")
+
+    text = metrics.render(dict(registry._pending))
+    series = 'contextforge_stage_duration_ms_bucket{pipeline="query",stage="embed",le="%s"}'
+    assert f"{series % '25'} 0.0" not in text  # only buckets that saw a sample are stored
+    assert f"{series % '50'} 1.0" in text
+    assert f"{series % '1000'} 2.0" in text
+    assert f"{series % '+Inf'} 2.0" in text
+    assert text.index(series % "50") < text.index(series % "1000") < text.index(series % "+Inf")
+    assert "# TYPE contextforge_stage_duration_ms histogram" in text
+    assert 'contextforge_llm_cache_requests_total{result="hit"} 1.0' in text
+
+
+def test_server_timing_header_and_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(metrics.registry, "snapshot", lambda: dict(metrics.registry._pending))
+    app = FastAPI()
+    install_telemetry(app)
+
+    @app.get("/_timed")
+    def timed() -> dict:
+        with metrics.stage("query", "embed"):
+            pass
+        return {}
+
+    client = TestClient(app)
+    r = client.get("/_timed")
+    assert r.headers["server-timing"].startswith("embed;dur=")
+    assert "total;dur=" in r.headers["server-timing"]
+
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    assert 'contextforge_http_request_duration_ms_count{method="GET",route="/_timed"' in r.text
+
+
+def test_repeated_flush_failures_warn_once(monkeypatch, caplog):
+    registry = metrics.MetricsRegistry()
+    registry._ensure_flusher = lambda: None
+    down = [True]
+
+    class FakePipeline:
+        def hincrbyfloat(self, key, field, value):
+            pass
+
+        def execute(self):
+            if down[0]:
+                raise ConnectionError("Connection refused")
+
+    monkeypatch.setattr(
+        "app.deps.get_redis", lambda: SimpleNamespace(pipeline=lambda transaction: FakePipeline())
+    )
+    registry.inc(metrics.LLM_CACHE, result="hit")
+    with caplog.at_level("DEBUG", logger="app.metrics"):
+        registry.flush()
+        registry.flush()
+        down[0] = False
+        registry.flush()
+        down[0] = True
+        registry.inc(metrics.LLM_CACHE, result="hit")
+        registry.flush()
+    assert [r.levelname for r in caplog.records] == ["WARNING", "DEBUG", "WARNING"]
+    assert registry._pending  # kept for the next flush
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.api.routes import admin
+from app.core.config import settings
+from app.telemetry import install_telemetry
+
+
+def test_authorised_request_is_profiled_and_downloadable(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+    monkeypatch.setattr(settings, "profiling_interval_ms", 1.0)
+    app = FastAPI()
+    install_telemetry(app)
+    app.include_router(admin.router)
+
+    @app.get("/_slow")
+    def slow() -> dict:
+        time.sleep(0.02)
+        return {}
+
+    client = TestClient(app)
+    assert "x-profile-id" not in client.get("/_slow", headers={"x-profile-token": "wrong"}).headers
+    profile_id = client.get("/_slow", headers={"x-profile-token": "secret"}).headers["x-profile-id"]
+
+    assert client.get("/v1/admin/profiles").status_code == 403
+    assert client.delete("/v1/admin/llm-cache").status_code == 403
+    for path in ("/v1/admin/llm-cache", "/v1/admin/queues", "/v1/admin/tiers"):
+        assert client.get(path).status_code == 403
+    auth = {"x-profile-token": "secret"}
+    listed = client.get("/v1/admin/profiles", headers=auth).json()
+    assert [p["id"] for p in listed] == [profile_id]
+    assert listed[0]["kind"] == "http" and listed[0]["format"] == "folded"
+    assert listed[0]["wallMs"] >= 20
+
+    summary = client.get(f"/v1/admin/profiles/{profile_id}", headers=auth).json()
+    assert "peakMemoryKb" in summary and "top" in summary
+    assert client.get(f"/v1/admin/profiles/{profile_id}/download").status_code == 403
+    download = client.get(f"/v1/admin/profiles/{profile_id}/download", headers=auth)
+    assert download.status_code == 200
+    assert client.get("/v1/admin/profiles/..%2Fmeta.db", headers=auth).status_code == 404
+
+
+def test_request_profile_samples_only_its_own_thread(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+    monkeypatch.setattr(settings, "profiling_interval_ms", 1.0)
+    app = FastAPI()
+    install_telemetry(app)
+    app.include_router(admin.router)
+    stop = threading.Event()
+
+    def spin_in_profiled_request():
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+
+    def spin_in_other_request():
+        while not stop.is_set():
+            pass
+
+    @app.get("/_profiled")
+    def profiled() -> dict:
+        spin_in_profiled_request()
+        return {}
+
+    @app.get("/_other")
+    def other() -> dict:
+        spin_in_other_request()
+        return {}
+
+    client = TestClient(app)
+    background = threading.Thread(target=client.get, args=("/_other",))
+    background.start()
+    try:
+        time.sleep(0.05)
+        r = client.get("/_profiled", headers={"x-profile-token": "secret"})
+    finally:
+        stop.set()
+        background.join()
+
+    files = profiling.profile_files(r.headers["x-profile-id"])
+    folded = next(p for p in files if p.suffix == ".folded").read_text(encoding="utf-8")
+    assert "spin_in_profiled_request" in folded
+    assert "spin_in_other_request" not in folded
+
+
+def test_profiled_job_writes_pstats_and_prunes(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profiling_max_files", 2)
+
+    ids = []
+    for i in range(3):
+        with profiling.profile("ingest", f"doc-{i}", sampling=False) as info:
+            sum(range(10_000))
+        ids.append(info["id"])
+        time.sleep(0.01)  # distinct mtimes for pruning order
+
+    assert [p["id"] for p in profiling.list_profiles()] == ids[:0:-1]
+    assert profiling.profile_files(ids[0]) == []
+    assert [p.suffix for p in profiling.profile_files(ids[2])] == [".json", ".prof"]
+    assert profiling.profile_files("../x") == []
@@ -0,0 +1,130 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from app import deadline
+from app.core.config import settings
+from app.services.llm import ratelimit
+from app.services.llm.ratelimit import INTERACTIVE, RateLimiter, RateLimitTimeoutError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeBucketScript:
+    """Python rendering of the Lua script, against the fake clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.buckets = {}
+
+    def __call__(self, keys, args):
+        now = self.clock.now * 1000
+        levels, wait = [], 0
+        for i, key in enumerate(keys):
+            rate, cap, cost, floor = args[i * 4 : i * 4 + 4]
+            level, ts = self.buckets.get(key, (cap, now))
+            level = min(cap, level + max(0, now - ts) * rate)
+            levels.append(level)
+            need = min(cost, cap - floor) + floor - level
+            if need > 0:
+                wait = max(wait, math.ceil(need / rate))
+        if wait:
+            return wait
+        for i, key in enumerate(keys):
+            self.buckets[key] = (levels[i] - args[i * 4 + 2], now)
+        return 0
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    clock = FakeClock()
+    fake_time = SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep)
+    monkeypatch.setattr(ratelimit, "time", fake_time)
+    monkeypatch.setattr(ratelimit.random, "uniform", lambda a, b: a)
+    monkeypatch.setattr(settings, "ratelimit_enabled", True)
+    monkeypatch.setattr(settings, "chat_rpm_limit", 60)  # 1/s, bucket of 10 with burst 10s
+    monkeypatch.setattr(settings, "chat_tpm_limit", 0)
+    monkeypatch.setattr(settings, "ratelimit_burst_s", 10.0)
+    monkeypatch.setattr(settings, "ratelimit_background_share", 0.8)
+    limiter = RateLimiter()
+    limiter._script = FakeBucketScript(clock)
+    return limiter, clock
+
+
+def test_background_calls_leave_headroom_for_interactive(limiter):
+    limiter, clock = limiter
+    assert [limiter.acquire("chat", 100) for _ in range(8)] == [0.0] * 8
+
+    # Interactive calls can use the reserved share right away
+    with ratelimit.priority(INTERACTIVE):
+        assert limiter.acquire("chat", 100) == 0.0
+        assert limiter.acquire("chat", 100) == 0.0
+    assert clock.sleeps == []
+
+    # Background waits until the bucket refilled above the reserve again
+    assert limiter.acquire("chat", 100) == pytest.approx(3.0)
+
+
+def test_background_gives_up_after_max_wait(limiter, monkeypatch):
+    limiter, clock = limiter
+    monkeypatch.setattr(settings, "ratelimit_max_wait_s", 0.5)
+    for _ in range(8):
+        limiter.acquire("chat", 1)
+    with pytest.raises(RateLimitTimeoutError):
+        limiter.acquire("chat", 1)
+
+
+def test_unreachable_redis_does_not_block_calls(limiter):
+    limiter, _ = limiter
+
+    def broken(keys, args):
+        raise ConnectionError("redis down")
+
+    limiter._script = broken
+    assert limiter.acquire("chat", 1) == 0.0
+
+
+def test_interactive_waits_are_bounded_without_a_deadline(limiter, monkeypatch):
+    limiter, clock = limiter
+    monkeypatch.setattr(settings, "ratelimit_max_wait_s", 0.5)
+    with ratelimit.priority(INTERACTIVE):
+        for _ in range(10):
+            limiter.acquire("chat", 1)  # drains the bucket, reserve included
+        with pytest.raises(RateLimitTimeoutError):
+            limiter.acquire("chat", 1)
+        # Under a deadline the wait is bounded by it instead
+        with deadline.scope(60):
+            assert limiter.acquire("chat", 1) == pytest.approx(1.0)
+
+
+def test_background_embedding_waits_out_a_saturated_limiter(limiter, monkeypatch):
+    from app.services.embeddings import openai_embedder
+
+    limiter, clock = limiter
+    monkeypatch.setattr(ratelimit, "limiter", limiter)
+    monkeypatch.setattr(openai_embedder, "time", SimpleNamespace(sleep=clock.sleep))
+    monkeypatch.setattr(settings, "embedding_rpm_limit", 60)
+    monkeypatch.setattr(settings, "embedding_tpm_limit", 0)
+    monkeypatch.setattr(settings, "ratelimit_max_wait_s", 0.5)
+    for _ in range(8):
+        limiter.acquire("embedding", 1)  # the background share is used up
+
+    embedder = openai_embedder.OpenAIEmbedder(api_key="x", base_url="http://x", model="m")
+    response = SimpleNamespace(data=[SimpleNamespace(embedding=[0.1])], usage=None)
+    embedder._client = SimpleNamespace(embeddings=SimpleNamespace(create=lambda **kw: response))
+
+    # The limiter gives up after 0.5s; the embedder backs off and tries again
+    assert embedder.embed_texts(["chunk"]) == [[0.1]]
+    assert clock.sleeps
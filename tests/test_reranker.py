@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.reranker import llm_score
+from app.services.reranker.llm_score import UNSCORED, LLMReranker, parse_listwise_scores
+
+
+def test_parse_listwise_scores_variants():
+    assert parse_listwise_scores('{"1": 4, "3": 9}', 3) == [4.0, UNSCORED, 5.0]
+    assert parse_listwise_scores("Sure! [2, 0.5]", 2) == [2.0, 0.5]
+    assert parse_listwise_scores("1: 3\n[2] - 1.5\nSnippet 4: 2", 3) == [3.0, 1.5, UNSCORED]
+    assert parse_listwise_scores("no idea", 2) == [UNSCORED, UNSCORED]
+
+
+def test_unknown_mode_is_rejected(monkeypatch):
+    monkeypatch.setattr(llm_score, "OpenAI", lambda **kw: None)
+    with pytest.raises(ValueError, match="listwse"):
+        LLMReranker(mode="listwse")
+
+
+def test_concurrent_mode_falls_back_after_budget(monkeypatch):
+    monkeypatch.setattr(llm_score, "OpenAI", lambda **kw: None)
+    monkeypatch.setattr(settings, "rerank_timeout_s", 0.2)
+
+    def fake_score_one(self, question, snippet):
+        if snippet == "slow":
+            time.sleep(1.0)
+        return 4.0
+
+    monkeypatch.setattr(LLMReranker, "_score_one", fake_score_one)
+    reranker = LLMReranker(mode="concurrent")
+    start = time.perf_counter()
+    scores = reranker.score("q", ["a", "slow", "b"])
+    assert time.perf_counter() - start < 0.9
+    assert scores == [4.0, UNSCORED, 4.0]
+    assert reranker.last_stats["scored"] == 2
+
+
+def test_cascade_prunes_before_second_stage():
+    from app.services.reranker.cascade import CascadeReranker, LexicalScorer
+
+    class FakeLLM:
+        def __init__(self):
+            self.seen = []
+            self.last_stats = {}
+
+        def score(self, question, snippets):
+            self.seen = list(snippets)
+            return [5.0 if "invoice total" in s else 1.0 for s in snippets]
+
+    snippets = [
+        "Weather was sunny all week.",
+        "The total on the invoice is due in 30 days.",
+        "The invoice total is 420 dollars.",
+        "Unrelated appendix text.",
+    ]
+    llm = FakeLLM()
+    reranker = CascadeReranker(first=LexicalScorer(), second=llm, top_m=2)
+    scores = reranker.score("What is the invoice total?", snippets)
+
+    assert sorted(llm.seen) == sorted(snippets[1:3])
+    order = sorted(range(len(snippets)), key=lambda i: scores[i], reverse=True)
+    assert order[:2] == [2, 1]
+    assert reranker.last_stats["pruned"] == 2
+    assert [s["name"] for s in reranker.last_stats["stages"]][0] == "lexical"
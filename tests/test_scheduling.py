@@ -0,0 +1,74 @@
+from collections import Counter
+from types import SimpleNamespace
+
+from app.workers.scheduling import FairScheduler, class_of, parse_class_map, size_class
+
+
+class FakeRedis:
+    def __init__(self, running=None):
+        # class -> {job id: expiry}
+        self.zsets = {
+            cls: {f"{cls}-{i}": float("inf") for i in range(n)}
+            for cls, n in (running or {}).items()
+        }
+
+    def _zset(self, key):
+        return self.zsets.setdefault(key.rsplit(":", 1)[-1], {})
+
+    def zremrangebyscore(self, key, lo, hi):
+        zset = self._zset(key)
+        for member in [m for m, score in zset.items() if score <= hi]:
+            del zset[member]
+
+    def zcard(self, key):
+        return len(self._zset(key))
+
+    def zadd(self, key, mapping):
+        self._zset(key).update(mapping)
+
+    def register_script(self, source):
+        def reserve(keys, args):
+            now, expires, cap, job_id = args
+            self.zremrangebyscore(keys[0], "-inf", now)
+            if self.zcard(keys[0]) >= cap:
+                return 0
+            self.zadd(keys[0], {job_id: expires})
+            return 1
+
+        return reserve
+
+
+def _queues():
+    return [SimpleNamespace(name=f"ingest-{c}") for c in ("small", "medium", "large")]
+
+
+def test_size_class_by_bytes_and_pages():
+    assert size_class(100_000, pages=2) == "small"
+    assert size_class(100_000, pages=120) == "medium"
+    assert size_class(100_000, pages=3000) == "large"
+    assert size_class(200 * 1024 * 1024) == "large"
+    assert class_of("ingest-medium") == "medium" and class_of("ingest") is None
+
+
+def test_weighted_order_drains_by_weight():
+    weights = parse_class_map("small:6,medium:3,large:1")
+    scheduler = FairScheduler(FakeRedis(), weights=weights, caps={})
+    picks = Counter(scheduler.order(_queues())[0].name for _ in range(100))
+    assert picks == {"ingest-small": 60, "ingest-medium": 30, "ingest-large": 10}
+
+
+def test_capped_class_is_skipped():
+    scheduler = FairScheduler(FakeRedis({"large": 2}), weights={}, caps={"large": 2})
+    assert [q.name for q in scheduler.order(_queues())] == ["ingest-small", "ingest-medium"]
+
+
+def test_cap_slot_is_taken_atomically_at_job_start():
+    conn = FakeRedis()
+    workers = [FairScheduler(conn, weights={}, caps={"large": 1}) for _ in range(2)]
+    # Both workers see a free slot and both dequeue a large job...
+    assert all("ingest-large" in [q.name for q in w.order(_queues())] for w in workers)
+    # ...but only one of them gets to run it
+    assert workers[0].job_started("large", "a", timeout=60) is True
+    assert workers[1].job_started("large", "b", timeout=60) is False
+    assert workers[1].running("large") == 1
+    assert workers[1].job_started("small", "c", timeout=60) is True
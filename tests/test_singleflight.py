@@ -0,0 +1,168 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.config import settings
+from app.core.errors import DeadlineExceededError
+from app.services.singleflight import LEADER, LOCAL, REMOTE, SingleFlight
+
+
+class FakeLock:
+    def __init__(self, redis, name):
+        self.redis = redis
+        self.name = name
+
+    def acquire(self, blocking=True):
+        with self.redis.mutex:
+            if self.name in self.redis.values:
+                return False
+            self.redis.values[self.name] = b"token"
+            return True
+
+    def release(self):
+        self.redis.values.pop(self.name, None)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.redis.subscribers.setdefault(channel, []).append(self.messages)
+
+    def get_message(self, timeout):
+        try:
+            return {"type": "message", "data": self.messages.get(timeout=timeout)}
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def set(self, key, value, px=None):
+        self.ops.append(lambda: self.redis.values.__setitem__(key, value.encode()))
+
+    def publish(self, channel, payload):
+        self.ops.append(lambda: self.redis.publish(channel, payload))
+
+    def execute(self):
+        for op in self.ops:
+            op()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.values = {}
+        self.subscribers = {}
+
+    def lock(self, name, timeout=None):
+        return FakeLock(self, name)
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def publish(self, channel, payload):
+        for messages in self.subscribers.get(channel, []):
+            messages.put(payload.encode())
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    flight = SingleFlight("test", encode=str, decode=int)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, "k", compute)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "k", compute) for _ in range(3)]
+        time.sleep(0.05)
+        release.set()
+        assert leader.result(timeout=5) == (42, LEADER)
+        assert [f.result(timeout=5) for f in followers] == [(42, LOCAL)] * 3
+    assert len(calls) == 1
+    # Once finished, the next call computes again
+    assert flight.do("k", lambda: 7) == (7, LEADER)
+
+
+def test_replicas_share_results_through_redis(monkeypatch):
+    monkeypatch.setattr(settings, "singleflight_redis", True)
+    redis = FakeRedis()
+    replica_a = SingleFlight("test", encode=str, decode=int, connection=lambda: redis)
+    replica_b = SingleFlight("test", encode=str, decode=int, connection=lambda: redis)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(replica_a.do, "k", slow)
+        started.wait(5)
+        follower = pool.submit(replica_b.do, "k", lambda: -1)
+        time.sleep(0.05)
+        release.set()
+        assert leader.result(timeout=5) == (42, LEADER)
+        assert follower.result(timeout=5) == (42, REMOTE)
+
+    # A leader that fails lets the waiting replica compute it itself
+    redis.values.clear()
+    started.clear()
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(replica_a.do, "k", failing)
+        started.wait(5)
+        follower = pool.submit(replica_b.do, "k", lambda: 7)
+        assert follower.result(timeout=5) == (7, LEADER)
+
+
+def test_followers_do_not_share_the_leaders_deadline():
+    flight = SingleFlight("test", encode=str, decode=int)
+    started, release = threading.Event(), threading.Event()
+
+    def out_of_time():
+        started.set()
+        release.wait(5)
+        raise DeadlineExceededError("Deadline exceeded before generation")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "k", out_of_time)
+        started.wait(5)
+        follower = pool.submit(flight.do, "k", lambda: 7)
+        time.sleep(0.05)
+        release.set()
+        with pytest.raises(DeadlineExceededError):
+            leader.result(timeout=5)
+        # The follower still has time of its own, so it computes the result itself
+        assert follower.result(timeout=5) == (7, LEADER)
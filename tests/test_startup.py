@@ -0,0 +1,43 @@
+import hashlib
+
+import pytest
+
+from app import warmup
+from app.bench.startup import HEAVY_MODULES, import_report
+from app.core.config import settings
+from app.services import tokenizer
+
+
+def test_importing_app_skips_heavy_modules():
+    report = import_report("app.main", repeats=1)
+    assert report["heavyImported"] == []
+    assert set(HEAVY_MODULES) >= {"openai", "qdrant_client", "tiktoken"}
+
+
+def test_seed_cache_copies_verified_local_file(tmp_path, monkeypatch):
+    source = tmp_path / "cl100k_base.tiktoken"
+    source.write_bytes(b"fake bpe")
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "tokenizer_file", str(source))
+
+    with pytest.raises(ValueError, match="hash mismatch"):
+        tokenizer._seed_cache()
+    assert not tokenizer.cached_bpe_path().exists()
+
+    monkeypatch.setattr(tokenizer, "BPE_SHA256", hashlib.sha256(b"fake bpe").hexdigest())
+    tokenizer._seed_cache()
+    assert tokenizer.cached_bpe_path().read_bytes() == b"fake bpe"
+
+
+def test_warm_up_failures_are_not_fatal(monkeypatch):
+    calls = []
+
+    def broken():
+        raise ConnectionError("qdrant is down")
+
+    monkeypatch.setattr(
+        warmup, "STEPS", {"ok": lambda: calls.append("ok"), "vectorstore": broken}
+    )
+    timings = warmup.warm_up()
+    assert calls == ["ok"]
+    assert set(timings) == {"ok", "vectorstore"}
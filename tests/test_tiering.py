@@ -0,0 +1,116 @@
+import contextlib
+
+from app.services.vectorstore.tiering import COLD, HOT, UNLOADED, TierManager
+
+
+class FakeRedis:
+    def __init__(self):
+        self.zsets: dict[str, dict[bytes, float]] = {}
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update({k.encode(): v for k, v in mapping.items()})
+
+    def zrange(self, key, start, end, withscores=False):
+        return sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1])
+
+    def zrem(self, key, name):
+        self.zsets.get(key, {}).pop(name.encode(), None)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def hget(self, key, name):
+        return self.hashes.get(key, {}).get(name.encode())
+
+    def hset(self, key, name, value):
+        self.hashes.setdefault(key, {})[name.encode()] = value.encode()
+
+    def hdel(self, key, name):
+        self.hashes.get(key, {}).pop(name.encode(), None)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hvals(self, key):
+        return list(self.hashes.get(key, {}).values())
+
+    def set(self, *args, **kwargs):
+        return False  # never start a background sweep
+
+    def lock(self, name, timeout=None):
+        return contextlib.nullcontext()
+
+
+class FakePipeline:
+    def __init__(self, conn):
+        self.conn = conn
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *a, **kw: self.calls.append((name, a, kw))
+
+    def execute(self):
+        return [getattr(self.conn, name)(*a, **kw) for name, a, kw in self.calls]
+
+
+class FakeStore:
+    def __init__(self, names):
+        self.names = set(names)
+        self.on_disk: dict[str, bool] = {}
+
+    def list_namespaces(self):
+        return sorted(self.names)
+
+    def set_on_disk(self, name, on_disk):
+        self.on_disk[name] = on_disk
+
+    def drop_collection(self, name):
+        self.names.discard(name)
+
+
+def _manager(store, restorable=()):
+    def restore(name):
+        store.names.add(name)
+
+    return TierManager(
+        store,
+        FakeRedis(),
+        restore=restore,
+        can_restore=lambda name: name in restorable,
+        hot_max=1,
+        demote_after_s=100,
+        unload_after_s=1000,
+        sweep_interval_s=0,
+    )
+
+
+def test_sweep_demotes_and_unloads_then_access_promotes():
+    store = FakeStore(["a", "b", "c", "old"])
+    manager = _manager(store, restorable={"old"})
+    manager.connection.zadd(
+        "contextforge:vectors:access", {"a": 990.0, "b": 980.0, "c": 850.0, "old": -500.0}
+    )
+
+    result = manager.sweep(now=1000.0)
+    # "a" is the single hot slot, "b" is over capacity, "c" is idle, "old" is unloaded
+    assert result == {"demoted": 2, "unloaded": 1, "forgotten": 0}
+    assert [manager.tier(n) for n in ("a", "b", "c", "old")] == [HOT, COLD, COLD, UNLOADED]
+    assert store.on_disk == {"b": True, "c": True} and "old" not in store.names
+
+    manager.ensure_hot("c")
+    assert manager.tier("c") == HOT and store.on_disk["c"] is False
+    manager.ensure_hot("old")
+    assert manager.tier("old") == HOT and "old" in store.names
+    assert manager.stats() == {"tracked": 4, HOT: 3, COLD: 1, UNLOADED: 0}
+
+
+def test_idle_collection_without_artifact_is_only_demoted():
+    store = FakeStore(["x"])
+    manager = _manager(store)
+    manager.connection.zadd("contextforge:vectors:access", {"x": 0.0})
+    assert manager.sweep(now=10_000.0)["unloaded"] == 0
+    assert manager.tier("x") == COLD and "x" in store.names
@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+from redis import Redis
+from rq import SimpleWorker
+
+from app.workers import worker
+from app.workers.worker import WarmWorker, WorkerPool
+
+
+class FakeProcess:
+    def __init__(self, target, args, name):
+        self.name = name
+        self.alive = False
+        self.exitcode = None
+        self.pid = None
+
+    def start(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self):
+        pass
+
+    def exit(self, code=0):
+        self.alive, self.exitcode = False, code
+
+
+def _job():
+    return SimpleNamespace(id="job", timeout=60, enqueued_at=None)
+
+
+def test_worker_recycles_above_memory_ceiling(monkeypatch):
+    monkeypatch.setattr(SimpleWorker, "execute_job", lambda self, job, queue: None)
+    w = WarmWorker(["ingest"], connection=Redis(), max_memory_mb=100, prepare_for_work=False)
+    queue = w.queues[0]
+
+    monkeypatch.setattr(worker, "rss_mb", lambda: 80.0)
+    w.execute_job(_job(), queue)
+    assert not w._stop_requested
+
+    monkeypatch.setattr(worker, "rss_mb", lambda: 120.0)
+    w.execute_job(_job(), queue)
+    assert w._stop_requested
+
+
+def test_scheduled_dequeue_keeps_max_idle_time(monkeypatch):
+    clock = [0.0]
+    polls = []
+
+    def fake_dequeue(self, timeout, max_idle_time=None):
+        polls.append(timeout)
+        clock[0] += timeout
+        return None
+
+    monkeypatch.setattr(worker, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    monkeypatch.setattr(SimpleWorker, "dequeue_job_and_maintain_ttl", fake_dequeue)
+    scheduler = SimpleNamespace(order=lambda queues: queues)
+    w = WarmWorker(["ingest"], connection=Redis(), scheduler=scheduler, prepare_for_work=False)
+
+    # Polls every poll_seconds to re-order queues, but still goes idle after 12s
+    assert w.dequeue_job_and_maintain_ttl(405, max_idle_time=12) is None
+    assert polls == [5, 5, 2]
+
+
+def test_job_is_returned_to_its_queue_when_the_class_is_full(monkeypatch):
+    executed, ops = [], []
+    monkeypatch.setattr(SimpleWorker, "execute_job", lambda self, job, q: executed.append(job))
+
+    class FakePipeline:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def lrem(self, key, count, value):
+            ops.append(("lrem", key, value))
+
+        def execute(self):
+            ops.append(("execute",))
+
+    scheduler = SimpleNamespace(job_started=lambda cls, job_id, timeout: False)
+    w = WarmWorker(["ingest"], connection=Redis(), scheduler=scheduler, prepare_for_work=False)
+    w.connection = SimpleNamespace(pipeline=FakePipeline)
+    queue = SimpleNamespace(
+        name="ingest-large",
+        intermediate_queue_key="ingest-large:intermediate",
+        push_job_id=lambda job_id, pipeline, at_front: ops.append(("push", job_id, at_front)),
+    )
+
+    w.execute_job(_job(), queue)
+    assert executed == []
+    assert ops == [
+        ("lrem", "ingest-large:intermediate", "job"),
+        ("push", "job", True),
+        ("execute",),
+    ]
+
+
+def test_child_passes_job_limit_to_rq(monkeypatch):
+    limits = []
+    monkeypatch.setattr(worker, "warm_up", lambda clients: None)
+    monkeypatch.setattr(worker, "configure_logging", lambda: None)
+    monkeypatch.setattr(WarmWorker, "__init__", lambda self, *a, **kw: None)
+    monkeypatch.setattr(WarmWorker, "work", lambda self, max_jobs: limits.append(max_jobs))
+
+    worker._child_main(["ingest"], "redis://localhost:6379/0", max_jobs=3, max_memory_mb=0)
+    worker._child_main(["ingest"], "redis://localhost:6379/0", max_jobs=0, max_memory_mb=0)
+    assert limits == [3, None]
+
+
+def test_pool_replaces_exited_workers_until_stopped():
+    pool = WorkerPool(SimpleNamespace(Process=FakeProcess), target=None, args=(), concurrency=2)
+    pool.start()
+    first = dict(pool.procs)
+
+    first[1].exit(0)  # recycled after max_jobs / memory ceiling
+    pool.reap()
+    assert pool.procs[0] is first[0]
+    assert pool.procs[1] is not first[1] and pool.procs[1].is_alive()
+    assert pool.procs[1].name == "warm-worker-1"
+
+    pool.stop(worker.signal.SIGINT, None)
+    for p in pool.procs.values():
+        p.exit(0)
+    pool.reap()
+    assert pool.procs == {}